@@ -5,34 +5,32 @@ Created on Mon Jul 27 15:09:01 2020
 """
 
 # Import required packages
+import argparse
 import pandas as pd
 import gurobipy
-from typing import List, Dict
+from typing import List, Dict, Optional
 import altair as alt
 import datapane as dp
 
+from production_plan_optimization.allocation import solve_allocation
+from production_plan_optimization.decomposition import solve_by_day
+from production_plan_optimization.solvers import SOLVERS, solve
 
-def optimize_planning(
+
+def build_model(
     timeline: List[str],
     workcenters: List[str],
     needs: Dict[str, int],
     wc_cost_reg: Dict[str, int],
-) -> pd.DataFrame:
+    opening_formulation: str = "linear",
+) -> gurobipy.Model:
+    if opening_formulation not in ("linear", "bilinear"):
+        raise ValueError("Unknown line opening formulation: " + opening_formulation)
 
     # Initiate optimization model
     model = gurobipy.Model("Optimize production planning")
 
     # DEFINE VARIABLES
-    # Variable total load (hours)
-    working_hours = model.addVars(
-        timeline,
-        workcenters,
-        lb=7,
-        ub=12,
-        vtype=gurobipy.GRB.INTEGER,
-        name="Working hours",
-    )
-
     # Status of the line (0 = closed, 1 = opened)
     line_opening = model.addVars(
         timeline, workcenters, vtype=gurobipy.GRB.BINARY, name="Open status"
@@ -54,27 +52,67 @@ def optimize_planning(
     )
 
     # CONSTRAINTS
-    # Set the value of total load
-    model.addConstrs(
-        (
-            total_hours[(date, wc)]
-            == working_hours[(date, wc)] * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="Link total hours - reg/ot hours",
-    )
+    if opening_formulation == "bilinear":
+        # Variable working hours if the line is opened
+        working_hours = model.addVars(
+            timeline,
+            workcenters,
+            lb=7,
+            ub=12,
+            vtype=gurobipy.GRB.INTEGER,
+            name="Working hours",
+        )
 
-    # Set the value of cost (hours * hourly cost)
-    model.addConstrs(
-        (
-            labor_cost[(date, wc)]
-            == total_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="Link labor cost - working hours",
-    )
+        # Set the value of total load
+        model.addConstrs(
+            (
+                total_hours[(date, wc)]
+                == working_hours[(date, wc)] * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link total hours - reg/ot hours",
+        )
+
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == total_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours",
+        )
+    else:
+        # An opened line works between 7 and 12 hours, a closed line does not work
+        model.addConstrs(
+            (
+                total_hours[(date, wc)] >= 7 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Min total hours - open status",
+        )
+
+        model.addConstrs(
+            (
+                total_hours[(date, wc)] <= 12 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Max total hours - open status",
+        )
+
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)] == total_hours[(date, wc)] * wc_cost_reg[wc]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours",
+        )
 
     # Total load = requirement
     model.addConstrs(
@@ -92,13 +130,63 @@ def optimize_planning(
     objective = 0
     objective += optimization_var
 
-    # SOLVE MODEL
     model.setObjective(objective)
-    model.optimize()
 
-    sol = pd.DataFrame(data={"Solution": model.X}, index=model.VarName)
+    return model
+
+
+def optimize_planning(
+    timeline: List[str],
+    workcenters: List[str],
+    needs: Dict[str, int],
+    wc_cost_reg: Dict[str, int],
+    opening_formulation: str = "linear",
+    solver: str = "gurobi",
+    decompose: bool = False,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    if solver == "dp":
+        # Exact allocation of the hours of each day to the lines by dynamic programming,
+        # without building the model
+        if opening_formulation != "linear":
+            raise ValueError('The dp solver only gives the opening_formulation="linear" variables')
+        result = solve_allocation(
+            timeline,
+            workcenters,
+            needs,
+            ["Open status", "Total hours", "Labor cost"],
+            wc_cost_reg,
+        )
+        print("Total cost = $" + str(result.objective))
+        return result.solution
+
+    # SOLVE MODEL
+    if decompose:
+        # No inventory between dates, each day is solved as its own model
+        result = solve_by_day(
+            build_model,
+            timeline,
+            needs,
+            solver,
+            workers,
+            workcenters=workcenters,
+            wc_cost_reg=wc_cost_reg,
+            opening_formulation=opening_formulation,
+        )
+    else:
+        model = build_model(
+            timeline,
+            workcenters,
+            needs,
+            wc_cost_reg,
+            opening_formulation,
+        )
+
+        result = solve(model, solver)
+
+    sol = result.solution
 
-    print("Total cost = $" + str(model.ObjVal))
+    print("Total cost = $" + str(result.objective))
 
     # model.write("Planning_optimization.lp")
     # file = open("Planning_optimization.lp", 'r')
@@ -195,13 +283,24 @@ reg_costs_per_line = {"Line_1": 245, "Line_2": 315, "Line_3": 245}
 # List of production lines available
 lines: List[str] = list(reg_costs_per_line.keys())
 
-# Optimize planning
-solution = optimize_planning(
-    calendar,
-    lines,
-    daily_requirements,
-    reg_costs_per_line,
-)
+if __name__ == "__main__":
+    # Solver picked on the command line
+    parser = argparse.ArgumentParser(description="Optimize the production planning")
+    parser.add_argument("--solver", choices=["gurobi", "dp"] + list(SOLVERS), default="gurobi")
+    parser.add_argument("--decompose", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Optimize planning
+    solution = optimize_planning(
+        calendar,
+        lines,
+        daily_requirements,
+        reg_costs_per_line,
+        solver=args.solver,
+        decompose=args.decompose,
+        workers=args.workers,
+    )
 
-# Plot the new planning
-plot_planning(solution, daily_requirements_df, calendar)
+    # Plot the new planning
+    plot_planning(solution, daily_requirements_df, calendar)
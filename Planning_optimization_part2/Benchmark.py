@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the Model2 and Model3 solves on long calendars
+"""
+
+# Import required packages
+import argparse
+import datetime
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import pandas as pd
+
+from production_plan_optimization.allocation import solve_allocation
+from production_plan_optimization.solvers import SOLVERS, solve
+from Model2 import (
+    build_model,
+    optimize_planning,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    lines,
+)
+import Model3
+
+
+def daily_requirements(horizon: int, seed: int = 0) -> Dict[str, int]:
+    # Random requirement between 14 and 34 hours per day, loading two or three lines (13 hours
+    # cannot be met with at least 7 hours per opened line)
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 7, 13)
+    return {
+        (start + datetime.timedelta(days=k)).strftime("%Y/%m/%d"): rng.randint(14, 34)
+        for k in range(horizon)
+    }
+
+
+def benchmark_dp(n_costs: int, seed: int = 0) -> pd.DataFrame:
+    # Time per day of the dynamic programming allocation against Gurobi for every requirement
+    # from 0 to 36 hours, on a weekday and on a weekend day, with random line costs
+    rng = random.Random(seed)
+    variables = ["Regular hours", "Overtime hours", "Open status", "Total hours", "Labor cost"]
+    results = []
+    for _ in range(n_costs):
+        reg_costs = {wc: rng.randrange(150, 400, 5) for wc in lines}
+        costs = (
+            reg_costs,
+            {wc: cost * rng.uniform(0.8, 2) for wc, cost in reg_costs.items()},
+            {wc: cost * rng.uniform(1, 3) for wc, cost in reg_costs.items()},
+        )
+        for date in ["2020/07/13", "2020/07/18"]:
+            for need in range(37):
+                row = {"Date": date, "Need": need}
+                for engine in ("dp", "gurobi"):
+                    start = time.perf_counter()
+                    try:
+                        if engine == "dp":
+                            result = solve_allocation([date], lines, {date: need}, variables, *costs)
+                        else:
+                            model = build_model([date], lines, {date: need}, *costs)
+                            model.Params.OutputFlag = 0
+                            result = solve(model)
+                        row[engine] = result.objective
+                    except RuntimeError:
+                        row[engine] = None
+                    row[engine + " time (ms)"] = 1000 * (time.perf_counter() - start)
+                results.append(row)
+
+    df = pd.DataFrame(results)
+    feasible = df["gurobi"].notna()
+    return pd.DataFrame(
+        [
+            {
+                "Days": len(df),
+                "Infeasible days": int((~feasible).sum()),
+                "DP time per day (ms)": round(df["dp time (ms)"].mean(), 4),
+                "Gurobi time per day (ms)": round(df["gurobi time (ms)"].mean(), 4),
+            }
+        ]
+    )
+
+
+def benchmark_decomposition(
+        horizons: List[int], workers: List[int], solver: str
+) -> pd.DataFrame:
+    # Wall time of the full model and of the day-by-day solve per number of worker processes
+    results = []
+    for horizon in horizons:
+        needs = daily_requirements(horizon)
+        calendar = list(needs)
+        costs = (reg_costs_per_line, ot_costs_per_line, we_costs_per_line)
+
+        start = time.perf_counter()
+        full = optimize_planning(calendar, lines, needs, *costs, solver=solver)
+        full_time = time.perf_counter() - start
+        results.append({"Days": horizon, "Run": "full", "Wall time (s)": round(full_time, 3)})
+
+        for n_workers in workers:
+            start = time.perf_counter()
+            days = optimize_planning(
+                calendar, lines, needs, *costs, solver=solver, decompose=True, workers=n_workers
+            )
+            wall_time = time.perf_counter() - start
+            results.append(
+                {
+                    "Days": horizon,
+                    "Run": str(n_workers) + " workers",
+                    "Wall time (s)": round(wall_time, 3),
+                    # Lines with the same costs can swap their hours, the costs are compared
+                    "Cost gap": round(
+                        days.filter(like="Labor cost", axis=0)["Solution"].sum()
+                        - full.filter(like="Labor cost", axis=0)["Solution"].sum(),
+                        6,
+                    ),
+                }
+            )
+
+    return pd.DataFrame(results)
+
+
+def solve_model3(horizon: int, solver: str) -> dict:
+    # Wall time and cost of Model3 on a random calendar, run in a separate process
+    needs = daily_requirements(horizon)
+    costs = (reg_costs_per_line, ot_costs_per_line, we_costs_per_line, Model3.storage_cost)
+    start = time.perf_counter()
+    solution = Model3.optimize_planning(list(needs), lines, needs, *costs, solver=solver)
+    wall_time = time.perf_counter() - start
+    return {
+        "Days": horizon,
+        "Solver": solver,
+        "Wall time (s)": round(wall_time, 3),
+        "Total cost": solution.filter(like="Labor cost", axis=0)["Solution"].sum()
+        + solution.filter(like="early prod", axis=0)["Solution"].sum() * Model3.storage_cost,
+    }
+
+
+def benchmark_flow(horizons: List[int], solver: str) -> pd.DataFrame:
+    # Wall time and cost of the Model3 MIP and of the min-cost flow engine. OR-Tools and highspy
+    # cannot be loaded in the same process, each solve runs in its own process.
+    results = []
+    for horizon in horizons:
+        for engine in (solver, "flow"):
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results.append(pool.submit(solve_model3, horizon, engine).result())
+        results[-1]["Cost gap"] = "{0:.3%}".format(
+            results[-1]["Total cost"] / results[-2]["Total cost"] - 1
+        )
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the solves of Model2 and Model3")
+    parser.add_argument("benchmark", choices=["decomposition", "dp", "flow"])
+    parser.add_argument("--horizons", type=int, nargs="+", default=[7, 90, 365])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, multiprocessing.cpu_count()])
+    parser.add_argument("--solver", choices=["gurobi", "dp"] + list(SOLVERS), default="highs")
+    parser.add_argument("--costs", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.benchmark == "dp":
+        result = benchmark_dp(args.costs)
+    elif args.benchmark == "flow":
+        result = benchmark_flow(args.horizons, args.solver)
+    else:
+        result = benchmark_decomposition(args.horizons, args.workers, args.solver)
+    print(result.to_string(index=False))
@@ -5,22 +5,30 @@ Created on Mon Jul 27 15:09:01 2020
 """
 
 # Import required packages
+import argparse
 import pandas as pd
 import gurobipy
 import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import altair as alt
 import datapane as dp
 
+from production_plan_optimization.allocation import solve_allocation
+from production_plan_optimization.decomposition import solve_by_day
+from production_plan_optimization.solvers import SOLVERS, solve
 
-def optimize_planning(
+
+def build_model(
     timeline: List[str],
     workcenters: List[str],
     needs: Dict[str, int],
     wc_cost_reg: Dict[str, int],
     wc_cost_ot: Dict[str, int],
     wc_cost_we: Dict[str, int],
-) -> pd.DataFrame:
+    opening_formulation: str = "linear",
+) -> gurobipy.Model:
+    if opening_formulation not in ("linear", "bilinear"):
+        raise ValueError("Unknown line opening formulation: " + opening_formulation)
 
     # Split weekdays/weekends
     weekdays = []
@@ -40,7 +48,7 @@ def optimize_planning(
     reg_hours = model.addVars(
         timeline,
         workcenters,
-        lb=7,
+        lb=7 if opening_formulation == "bilinear" else 0,
         ub=8,
         vtype=gurobipy.GRB.INTEGER,
         name="Regular hours",
@@ -75,28 +83,80 @@ def optimize_planning(
     )
 
     # CONSTRAINTS
-    # Set the value of total load (regular + overtime)
-    model.addConstrs(
-        (
-            total_hours[(date, wc)]
-            == (reg_hours[(date, wc)] + ot_hours[(date, wc)]) * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="Link total hours - reg/ot hours",
-    )
+    if opening_formulation == "bilinear":
+        # Set the value of total load (regular + overtime)
+        model.addConstrs(
+            (
+                total_hours[(date, wc)]
+                == (reg_hours[(date, wc)] + ot_hours[(date, wc)]) * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link total hours - reg/ot hours",
+        )
 
-    # Set the value of cost (hours * hourly cost)
-    model.addConstrs(
-        (
-            labor_cost[(date, wc)]
-            == reg_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
-            + ot_hours[(date, wc)] * wc_cost_ot[wc] * line_opening[(date, wc)]
-            for date in weekdays
-            for wc in workcenters
-        ),
-        name="Link labor cost - working hours - wd",
-    )
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == reg_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
+                + ot_hours[(date, wc)] * wc_cost_ot[wc] * line_opening[(date, wc)]
+                for date in weekdays
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours - wd",
+        )
+    else:
+        # An opened line works between 7 and 8 regular hours and up to 4 overtime hours,
+        # a closed line does not work
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] >= 7 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Min regular hours - open status",
+        )
+
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] <= 8 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Max regular hours - open status",
+        )
+
+        model.addConstrs(
+            (
+                ot_hours[(date, wc)] <= 4 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Max overtime hours - open status",
+        )
+
+        # Set the value of total load (regular + overtime)
+        model.addConstrs(
+            (
+                total_hours[(date, wc)] == reg_hours[(date, wc)] + ot_hours[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link total hours - reg/ot hours",
+        )
+
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == reg_hours[(date, wc)] * wc_cost_reg[wc]
+                + ot_hours[(date, wc)] * wc_cost_ot[wc]
+                for date in weekdays
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours - wd",
+        )
 
     model.addConstrs(
         (
@@ -122,13 +182,71 @@ def optimize_planning(
         labor_cost[(date, wc)] for date in timeline for wc in workcenters
     )
 
-    # SOLVE MODEL
     model.setObjective(objective)
-    model.optimize()
 
-    sol = pd.DataFrame(data={"Solution": model.X}, index=model.VarName)
+    return model
+
+
+def optimize_planning(
+    timeline: List[str],
+    workcenters: List[str],
+    needs: Dict[str, int],
+    wc_cost_reg: Dict[str, int],
+    wc_cost_ot: Dict[str, int],
+    wc_cost_we: Dict[str, int],
+    opening_formulation: str = "linear",
+    solver: str = "gurobi",
+    decompose: bool = False,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    if solver == "dp":
+        # Exact allocation of the hours of each day to the lines by dynamic programming,
+        # without building the model
+        if opening_formulation != "linear":
+            raise ValueError('The dp solver only gives the opening_formulation="linear" variables')
+        result = solve_allocation(
+            timeline,
+            workcenters,
+            needs,
+            ["Regular hours", "Overtime hours", "Open status", "Total hours", "Labor cost"],
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+        )
+        print("Total cost = $" + str(result.objective))
+        return result.solution
+
+    # SOLVE MODEL
+    if decompose:
+        # No inventory between dates, each day is solved as its own model
+        result = solve_by_day(
+            build_model,
+            timeline,
+            needs,
+            solver,
+            workers,
+            workcenters=workcenters,
+            wc_cost_reg=wc_cost_reg,
+            wc_cost_ot=wc_cost_ot,
+            wc_cost_we=wc_cost_we,
+            opening_formulation=opening_formulation,
+        )
+    else:
+        model = build_model(
+            timeline,
+            workcenters,
+            needs,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+            opening_formulation,
+        )
 
-    print("Total cost = $" + str(model.ObjVal))
+        result = solve(model, solver)
+
+    sol = result.solution
+
+    print("Total cost = $" + str(result.objective))
     return sol
 
 
@@ -223,15 +341,26 @@ we_costs_per_line = {
 
 lines: List[str] = list(reg_costs_per_line.keys())
 
-# Optimize planning
-solution = optimize_planning(
-    calendar,
-    lines,
-    daily_requirements,
-    reg_costs_per_line,
-    ot_costs_per_line,
-    we_costs_per_line,
-)
-
-# Plot the new planning
-plot_planning(solution, daily_requirements_df, calendar)
+if __name__ == "__main__":
+    # Solver picked on the command line
+    parser = argparse.ArgumentParser(description="Optimize the production planning")
+    parser.add_argument("--solver", choices=["gurobi", "dp"] + list(SOLVERS), default="gurobi")
+    parser.add_argument("--decompose", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Optimize planning
+    solution = optimize_planning(
+        calendar,
+        lines,
+        daily_requirements,
+        reg_costs_per_line,
+        ot_costs_per_line,
+        we_costs_per_line,
+        solver=args.solver,
+        decompose=args.decompose,
+        workers=args.workers,
+    )
+
+    # Plot the new planning
+    plot_planning(solution, daily_requirements_df, calendar)
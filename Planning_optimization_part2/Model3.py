@@ -5,6 +5,7 @@ Created on Mon Jul 27 15:09:01 2020
 """
 
 # Import required packages
+import argparse
 import pandas as pd
 import gurobipy
 import datetime
@@ -12,6 +13,9 @@ from typing import List, Dict
 import altair as alt
 import datapane as dp
 
+from production_plan_optimization.flow import solve_flow
+from production_plan_optimization.solvers import SOLVERS, solve
+
 
 def optimize_planning(
     timeline: List[str],
@@ -21,7 +25,36 @@ def optimize_planning(
     wc_cost_ot: Dict[str, int],
     wc_cost_we: Dict[str, int],
     inventory_carrying_cost: int,
+    opening_formulation: str = "linear",
+    solver: str = "gurobi",
 ) -> pd.DataFrame:
+    if opening_formulation not in ("linear", "bilinear"):
+        raise ValueError("Unknown line opening formulation: " + opening_formulation)
+
+    if solver == "flow":
+        # Min-cost flow of the hours for fixed line openings, inside a local search over the
+        # line openings, without building the model
+        if opening_formulation != "linear":
+            raise ValueError('The flow solver only gives the opening_formulation="linear" variables')
+        result = solve_flow(
+            timeline,
+            workcenters,
+            needs,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+            inventory_carrying_cost,
+            [
+                "Regular hours",
+                "Overtime hours",
+                "Open status",
+                "Total hours",
+                "Labor cost",
+                "early prod",
+            ],
+        )
+        print("Total cost = $" + str(result.objective))
+        return result.solution
 
     # Split weekdays/weekends
     weekdays = []
@@ -41,7 +74,7 @@ def optimize_planning(
     reg_hours = model.addVars(
         timeline,
         workcenters,
-        lb=7,
+        lb=7 if opening_formulation == "bilinear" else 0,
         ub=8,
         vtype=gurobipy.GRB.INTEGER,
         name="Regular hours",
@@ -75,28 +108,80 @@ def optimize_planning(
         timeline, workcenters, lb=0, vtype=gurobipy.GRB.CONTINUOUS, name="Labor cost"
     )
 
-    # Set the value of total load (regular + overtime)
-    model.addConstrs(
-        (
-            total_hours[(date, wc)]
-            == (reg_hours[(date, wc)] + ot_hours[(date, wc)]) * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="Link total hours - reg/ot hours",
-    )
+    if opening_formulation == "bilinear":
+        # Set the value of total load (regular + overtime)
+        model.addConstrs(
+            (
+                total_hours[(date, wc)]
+                == (reg_hours[(date, wc)] + ot_hours[(date, wc)]) * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link total hours - reg/ot hours",
+        )
 
-    # Set the value of cost (hours * hourly cost)
-    model.addConstrs(
-        (
-            labor_cost[(date, wc)]
-            == reg_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
-            + ot_hours[(date, wc)] * wc_cost_ot[wc] * line_opening[(date, wc)]
-            for date in weekdays
-            for wc in workcenters
-        ),
-        name="Link labor cost - working hours - wd",
-    )
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == reg_hours[(date, wc)] * wc_cost_reg[wc] * line_opening[(date, wc)]
+                + ot_hours[(date, wc)] * wc_cost_ot[wc] * line_opening[(date, wc)]
+                for date in weekdays
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours - wd",
+        )
+    else:
+        # An opened line works between 7 and 8 regular hours and up to 4 overtime hours,
+        # a closed line does not work
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] >= 7 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Min regular hours - open status",
+        )
+
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] <= 8 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Max regular hours - open status",
+        )
+
+        model.addConstrs(
+            (
+                ot_hours[(date, wc)] <= 4 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Max overtime hours - open status",
+        )
+
+        # Set the value of total load (regular + overtime)
+        model.addConstrs(
+            (
+                total_hours[(date, wc)] == reg_hours[(date, wc)] + ot_hours[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="Link total hours - reg/ot hours",
+        )
+
+        # Set the value of cost (hours * hourly cost)
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == reg_hours[(date, wc)] * wc_cost_reg[wc]
+                + ot_hours[(date, wc)] * wc_cost_ot[wc]
+                for date in weekdays
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours - wd",
+        )
 
     model.addConstrs(
         (
@@ -145,11 +230,11 @@ def optimize_planning(
 
     # SOLVE MODEL
     model.setObjective(objective)
-    model.optimize()
+    result = solve(model, solver)
 
-    sol = pd.DataFrame(data={"Solution": model.X}, index=model.VarName)
+    sol = result.solution
 
-    print("Total cost = $" + str(model.ObjVal))
+    print("Total cost = $" + str(result.objective))
 
     # model.write("Planning_optimization.lp")
     # file = open("Planning_optimization.lp", 'r')
@@ -252,16 +337,23 @@ storage_cost = 25
 
 lines: List[str] = list(reg_costs_per_line.keys())
 
-# Optimize planning
-solution = optimize_planning(
-    calendar,
-    lines,
-    daily_requirements,
-    reg_costs_per_line,
-    ot_costs_per_line,
-    we_costs_per_line,
-    storage_cost,
-)
-
-# Plot the new planning
-plot_planning(solution, daily_requirements_df, calendar)
+if __name__ == "__main__":
+    # Solver picked on the command line
+    parser = argparse.ArgumentParser(description="Optimize the production planning")
+    parser.add_argument("--solver", choices=["gurobi", "flow"] + list(SOLVERS), default="gurobi")
+    args = parser.parse_args()
+
+    # Optimize planning
+    solution = optimize_planning(
+        calendar,
+        lines,
+        daily_requirements,
+        reg_costs_per_line,
+        ot_costs_per_line,
+        we_costs_per_line,
+        storage_cost,
+        solver=args.solver,
+    )
+
+    # Plot the new planning
+    plot_planning(solution, daily_requirements_df, calendar)
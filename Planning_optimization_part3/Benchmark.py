@@ -0,0 +1,1129 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of Model4 on synthetic order books
+"""
+
+# Import required packages
+import argparse
+import datetime
+import itertools
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import gurobipy
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.aggregation import aggregate_families, optimize_families
+from production_plan_optimization.buckets import bucket_calendar, bucket_days, bucket_needs
+from production_plan_optimization.cache import InputCache, ModelCache
+from production_plan_optimization.changeover import ChangeoverMatrix
+from production_plan_optimization.inputs import (
+    Requirements,
+    order_calendar,
+    order_cycle_times,
+    order_requirements,
+    stream_order_book,
+)
+from production_plan_optimization.dimensions import Dimensions
+from production_plan_optimization.instances import Instance, generate_instance
+from production_plan_optimization.rolling import plan_cost, rolling_horizon
+from production_plan_optimization.scenarios import (
+    objective_coefficients,
+    run_multiscenario,
+    run_scenarios,
+    scenario_grid,
+)
+from production_plan_optimization.solvers import SOLVERS, solve
+from production_plan_optimization.symmetry import SYMMETRY_BREAKING, identical_lines
+from production_plan_optimization.validation import validate_inputs
+from Planner import Planner
+from Model4 import (
+    build_model,
+    optimize_planning,
+    recover_auxiliaries,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    storage_cost,
+    late_prod_cost,
+    lines,
+)
+
+
+def line_costs(workcenters: List[str]) -> Tuple[Dict[str, float], ...]:
+    # Regular, overtime and weekend costs of any number of lines, cycling over the plant lines
+    return tuple(
+        dict(zip(workcenters, itertools.cycle(costs[wc] for wc in lines)))
+        for costs in (reg_costs_per_line, ot_costs_per_line, we_costs_per_line)
+    )
+
+
+def build_instance(instance: Instance, **options) -> gurobipy.Model:
+    model = build_model(
+        instance.timeline,
+        instance.workcenters,
+        instance.needs,
+        *line_costs(instance.workcenters),
+        storage_cost,
+        instance.customer_orders,
+        instance.cycle_times,
+        late_prod_cost,
+        **options,
+    )
+    model.update()
+    return model
+
+
+def benchmark_gap_formulation(horizons: List[int], n_orders: int) -> pd.DataFrame:
+    # Build time and matrix size of both gap formulations against horizon length
+    results = []
+    for horizon in horizons:
+        instance = generate_instance(n_orders, horizon, lines)
+        for formulation in ("cumulative", "recursive"):
+            start = time.perf_counter()
+            model = build_instance(instance, gap_formulation=formulation)
+            results.append(
+                {
+                    "Horizon": horizon,
+                    "Formulation": formulation,
+                    "Build time (s)": round(time.perf_counter() - start, 3),
+                    "Variables": model.NumVars,
+                    "Constraints": model.NumConstrs,
+                    "Nonzeros": model.NumNZs,
+                }
+            )
+            model.dispose()
+
+    return pd.DataFrame(results)
+
+
+def benchmark_lean(orders: List[int], horizon: int, time_limit: float) -> pd.DataFrame:
+    # Build and solve time of the full and lean models against the number of orders
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines)
+        for lean in (False, True):
+            start = time.perf_counter()
+            model = build_instance(instance, lean=lean)
+            build_time = time.perf_counter() - start
+
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = time_limit
+            model.optimize()
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Model": "lean" if lean else "full",
+                    "Variables": model.NumVars,
+                    "Constraints": model.NumConstrs,
+                    "Build time (s)": round(build_time, 3),
+                    "Solve time (s)": round(model.Runtime, 3),
+                    "Total cost": model.ObjVal if model.SolCount else None,
+                    "MIP gap": model.MIPGap if model.SolCount else None,
+                }
+            )
+            model.dispose()
+
+    results = pd.DataFrame(results)
+
+    # Reduction of the lean model compared to the full one
+    full = results[results["Model"] == "full"].set_index("Orders")
+    lean = results[results["Model"] == "lean"].set_index("Orders")
+    for column in ("Variables", "Constraints", "Build time (s)", "Solve time (s)"):
+        results.loc[results["Model"] == "lean", column + " reduction"] = (
+            1 - lean[column] / full[column]
+        ).map("{0:.0%}".format).to_list()
+
+    return results
+
+
+def benchmark_builder(
+        orders: List[int], horizon: int, n_lines: int, builders: List[str]
+) -> pd.DataFrame:
+    # Build time of the loop and matrix builders against the number of orders
+    workcenters = ["Line_" + str(k + 1) for k in range(n_lines)]
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, workcenters)
+        for builder in builders:
+            start = time.perf_counter()
+            model = build_instance(instance, builder=builder)
+            build_time = time.perf_counter() - start
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Builder": builder,
+                    "Variables": model.NumVars,
+                    "Nonzeros": model.NumNZs,
+                    "Build time (s)": round(build_time, 3),
+                    "Time per nonzero (us)": round(build_time / model.NumNZs * 1e6, 3),
+                }
+            )
+            model.dispose()
+
+    return pd.DataFrame(results)
+
+
+def benchmark_window(
+        orders: List[int], horizon: int, n_lines: int, window: Tuple[int, int], builder: str
+) -> pd.DataFrame:
+    # Size and build time of the dense model and of the model restricted to production windows
+    workcenters = ["Line_" + str(k + 1) for k in range(n_lines)]
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, workcenters)
+        for production_window in (None, window):
+            start = time.perf_counter()
+            model = build_instance(instance, builder=builder, production_window=production_window)
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Window": "dense" if production_window is None else str(production_window),
+                    "Variables": model.NumVars,
+                    "Constraints": model.NumConstrs,
+                    "Nonzeros": model.NumNZs,
+                    "Build time (s)": round(time.perf_counter() - start, 3),
+                }
+            )
+            model.dispose()
+
+    results = pd.DataFrame(results)
+
+    # Reduction of the windowed model compared to the dense one
+    dense = results[results["Window"] == "dense"].set_index("Orders")
+    windowed = results[results["Window"] != "dense"].set_index("Orders")
+    for column in ("Variables", "Constraints", "Nonzeros"):
+        results.loc[results["Window"] != "dense", column + " reduction"] = (
+            1 - windowed[column] / dense[column]
+        ).map("{0:.0%}".format).to_list()
+
+    return results
+
+
+def solve_instance(instance: Instance, solver: str, time_limit: float) -> dict:
+    start = time.perf_counter()
+    model = build_instance(instance)
+    build_time = time.perf_counter() - start
+    model.Params.OutputFlag = 0
+    try:
+        result = solve(model, solver, time_limit=time_limit)
+    except (gurobipy.GurobiError, RuntimeError) as error:
+        # e.g. model too large for the Gurobi license
+        return {"Build time (s)": round(build_time, 3), "Status": str(error)}
+    return {
+        "Build time (s)": round(build_time, 3),
+        "Load time (s)": round(result.load_time, 3),
+        "Solve time (s)": round(result.solve_time, 3),
+        "Total cost": result.objective,
+        "Status": "solved",
+    }
+
+
+def benchmark_solver(
+        orders: List[int], horizon: int, solvers: List[str], time_limit: float
+) -> pd.DataFrame:
+    # Build, load and solve time of the same model with each solver backend
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines)
+        for solver in solvers:
+            # One process per run, the HiGHS and OR-Tools libraries cannot be loaded together
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                run = pool.submit(solve_instance, instance, solver, time_limit).result()
+            results.append({"Orders": n_orders, "Solver": solver, **run})
+
+    return pd.DataFrame(results)
+
+
+def benchmark_rolling(
+        n_orders: int, horizon: int, window: int, freeze: int, solver: str, time_limit: float
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Wall time per window of the rolling-horizon solve and cost gap against the full solve
+    instance = generate_instance(n_orders, horizon, lines)
+    reg_costs, ot_costs, we_costs = line_costs(instance.workcenters)
+    model_args = dict(
+        workcenters=instance.workcenters,
+        wc_cost_reg=reg_costs,
+        wc_cost_ot=ot_costs,
+        wc_cost_we=we_costs,
+        inventory_carrying_cost=storage_cost,
+        cycle_times=instance.cycle_times,
+        delay_cost=late_prod_cost,
+        solver=solver,
+        time_limit=time_limit,
+    )
+    costs = (reg_costs, ot_costs, we_costs, storage_cost, late_prod_cost)
+
+    start = time.perf_counter()
+    full = optimize_planning(
+        timeline=instance.timeline,
+        needs=instance.needs,
+        customer_orders=instance.customer_orders,
+        **model_args,
+    )
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rolling, windows = rolling_horizon(
+        optimize_planning,
+        instance.timeline,
+        instance.needs,
+        instance.customer_orders,
+        window,
+        freeze,
+        **model_args,
+    )
+    rolling_time = time.perf_counter() - start
+
+    full_cost = plan_cost(full, *costs)
+    rolling_cost = plan_cost(rolling, *costs)
+    summary = pd.DataFrame(
+        [
+            {"Solve": "full", "Wall time (s)": round(full_time, 3), "Total cost": full_cost},
+            {
+                "Solve": "rolling",
+                "Wall time (s)": round(rolling_time, 3),
+                "Total cost": rolling_cost,
+                "Cost gap": "{0:.2%}".format(rolling_cost / full_cost - 1),
+            },
+        ]
+    )
+    return windows, summary
+
+
+def benchmark_planner(n_orders: int, horizon: int, solver: str) -> pd.DataFrame:
+    # Latency of single-order edits re-optimized by the persistent planner, against a rebuild
+    instance = generate_instance(n_orders + 1, horizon, lines)
+    reg_costs, ot_costs, we_costs = line_costs(instance.workcenters)
+    *orders, new_order = instance.customer_orders
+    needs = {(date, mo): qty for (date, mo), qty in instance.needs.items() if mo != new_order}
+    planner = Planner(
+        instance.timeline,
+        instance.workcenters,
+        needs,
+        reg_costs,
+        ot_costs,
+        we_costs,
+        storage_cost,
+        orders,
+        instance.cycle_times,
+        late_prod_cost,
+        solver=solver,
+    )
+    planner.optimize()
+
+    edits = [
+        ("change quantity", planner.change_quantity, (orders[0], planner.quantity[orders[0]] + 100)),
+        ("change due date", planner.change_due_date, (orders[1], instance.timeline[-1])),
+        ("change line cost", planner.change_line_cost, (instance.workcenters[0], 300, 450, 600)),
+        (
+            "add order",
+            planner.add_order,
+            (
+                new_order,
+                instance.needs[(instance.orders["Delivery_Date"].iloc[-1], new_order)],
+                instance.orders["Delivery_Date"].iloc[-1],
+                {wc: instance.cycle_times[(new_order, wc)] for wc in instance.workcenters},
+            ),
+        ),
+        ("cancel order", planner.cancel_order, (orders[2],)),
+    ]
+    results = []
+    for operation, edit, edit_args in edits:
+        start = time.perf_counter()
+        edit(*edit_args)
+        planner.optimize()
+        incremental_time = time.perf_counter() - start
+
+        # Same edited instance rebuilt and solved from scratch
+        needs = {
+            (date, mo): planner.quantity[mo] if planner.due_date[mo] == date else 0
+            for date in instance.timeline
+            for mo in planner.quantity
+        }
+        start = time.perf_counter()
+        optimize_planning(
+            instance.timeline,
+            instance.workcenters,
+            needs,
+            planner.wc_cost_reg,
+            planner.wc_cost_ot,
+            planner.wc_cost_we,
+            storage_cost,
+            list(planner.quantity),
+            planner.cycle_times,
+            late_prod_cost,
+            solver=solver,
+        )
+        rebuild_time = time.perf_counter() - start
+
+        update, solve_step = planner.log[-2:]
+        results.append(
+            {
+                "Operation": operation,
+                "Update (ms)": round(1000 * update["Update time (s)"], 2),
+                "Re-optimize (ms)": round(
+                    1000 * (solve_step["Update time (s)"] + solve_step["Solve time (s)"]), 2
+                ),
+                "Incremental (ms)": round(1000 * incremental_time, 2),
+                "Rebuild (ms)": round(1000 * rebuild_time, 2),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_scenarios(
+        n_orders: int, horizon: int, workers: List[int], solver: str
+) -> pd.DataFrame:
+    # Throughput of a 16 scenarios cost grid per number of worker processes, and as one
+    # Gurobi multi-scenario model
+    instance = generate_instance(n_orders, horizon, lines)
+    reg_costs, ot_costs, we_costs = line_costs(instance.workcenters)
+    model_args = dict(
+        timeline=instance.timeline,
+        workcenters=instance.workcenters,
+        needs=instance.needs,
+        wc_cost_reg=reg_costs,
+        wc_cost_ot=ot_costs,
+        wc_cost_we=we_costs,
+        inventory_carrying_cost=storage_cost,
+        customer_orders=instance.customer_orders,
+        cycle_times=instance.cycle_times,
+        delay_cost=late_prod_cost,
+    )
+    scenarios = scenario_grid(
+        inventory_carrying_cost=[storage_cost, 2 * storage_cost],
+        delay_cost=[late_prod_cost / 2, late_prod_cost],
+        wc_cost_ot_factor=[1, 1.5],
+        wc_cost_we_factor=[1, 2],
+    )
+
+    results = []
+    for n_workers in workers:
+        start = time.perf_counter()
+        run_scenarios(optimize_planning, scenarios, n_workers, solver=solver, **model_args)
+        wall_time = time.perf_counter() - start
+        results.append(
+            {
+                "Run": str(n_workers) + " workers",
+                "Wall time (s)": round(wall_time, 3),
+                "Scenarios/s": round(len(scenarios) / wall_time, 2),
+            }
+        )
+    if solver == "gurobi":
+        start = time.perf_counter()
+        run_multiscenario(build_model, scenarios, **model_args)
+        wall_time = time.perf_counter() - start
+        results.append(
+            {
+                "Run": "multi-scenario",
+                "Wall time (s)": round(wall_time, 3),
+                "Scenarios/s": round(len(scenarios) / wall_time, 2),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_families(
+        orders: List[int], horizon: int, n_families: int, solver: str, time_limit: float
+) -> pd.DataFrame:
+    # Size, wall time and cost of Model4 per order and per product family, the family
+    # production being split back to the orders in earliest-due-date order
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines, n_families=n_families)
+        reg_costs, ot_costs, we_costs = line_costs(instance.workcenters)
+        costs = (reg_costs, ot_costs, we_costs, storage_cost, late_prod_cost)
+        order_family = dict(zip(instance.orders["Order"], instance.orders["Product_Family"]))
+        model_args = dict(
+            timeline=instance.timeline,
+            workcenters=instance.workcenters,
+            wc_cost_reg=reg_costs,
+            wc_cost_ot=ot_costs,
+            wc_cost_we=we_costs,
+            inventory_carrying_cost=storage_cost,
+            delay_cost=late_prod_cost,
+            solver=solver,
+            time_limit=time_limit,
+        )
+        families, family_needs, family_cycle_times = aggregate_families(
+            instance.timeline,
+            instance.workcenters,
+            instance.needs,
+            instance.customer_orders,
+            instance.cycle_times,
+            order_family,
+        )
+        family_instance = instance._replace(
+            customer_orders=families, cycle_times=family_cycle_times, needs=family_needs
+        )
+
+        start = time.perf_counter()
+        full = optimize_planning(
+            needs=instance.needs,
+            customer_orders=instance.customer_orders,
+            cycle_times=instance.cycle_times,
+            **model_args,
+        )
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        aggregated = optimize_families(
+            optimize_planning,
+            needs=instance.needs,
+            customer_orders=instance.customer_orders,
+            cycle_times=instance.cycle_times,
+            order_family=order_family,
+            **model_args,
+        )
+        family_time = time.perf_counter() - start
+
+        full_cost = plan_cost(full, *costs)
+        family_cost = plan_cost(aggregated, *costs)
+        results.append(
+            {
+                "Orders": n_orders,
+                "Families": len(families),
+                "Order variables": build_instance(instance).NumVars,
+                "Family variables": build_instance(family_instance).NumVars,
+                "Order time (s)": round(full_time, 3),
+                "Family time (s)": round(family_time, 3),
+                "Speed-up": round(full_time / family_time, 1),
+                "Order cost": full_cost,
+                "Family cost": family_cost,
+                "Cost loss": "{0:.2%}".format(family_cost / full_cost - 1),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_buckets(
+        horizons: List[int], n_orders: int, solver: str, time_limit: float
+) -> pd.DataFrame:
+    # Size, wall time and cost of Model4 on the daily calendar and on the bucketed calendar
+    # (daily for 2 weeks, weekly until 13 weeks, monthly after)
+    results = []
+    for horizon in horizons:
+        instance = generate_instance(n_orders, horizon, lines)
+        buckets = bucket_calendar(instance.timeline)
+        bucketed = instance._replace(
+            timeline=list(buckets),
+            needs=bucket_needs(buckets, instance.needs, instance.customer_orders),
+        )
+        for calendar, run, options in (
+                ("daily", instance, {}),
+                ("bucketed", bucketed, {"bucket_days": bucket_days(buckets)}),
+        ):
+            start = time.perf_counter()
+            model = build_instance(run, builder="matrix", lean=True, **options)
+            result = solve(model, solver, time_limit=time_limit)
+            results.append(
+                {
+                    "Days": horizon,
+                    "Calendar": calendar,
+                    "Periods": len(run.timeline),
+                    "Variables": model.NumVars,
+                    "Constraints": model.NumConstrs,
+                    "Wall time (s)": round(time.perf_counter() - start, 3),
+                    "Total cost": result.objective,
+                }
+            )
+            model.dispose()
+        results[-1]["Cost gap"] = "{0:.2%}".format(
+            results[-1]["Total cost"] / results[-2]["Total cost"] - 1
+        )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_symmetry(
+        orders: List[int], horizon: int, n_lines: int, solver: str, time_limit: float
+) -> pd.DataFrame:
+    # Branch-and-bound nodes (Gurobi only) and solve time to optimality without and with each
+    # symmetry breaking mode, the lines with the same costs getting the same cycle times
+    results = []
+    for n_orders in orders:
+        workcenters = ["Line_" + str(k + 1) for k in range(n_lines)]
+        instance = generate_instance(n_orders, horizon, workcenters)
+        costs = line_costs(workcenters)
+        first_line = {}
+        for wc in workcenters:
+            first_line.setdefault(tuple(cost[wc] for cost in costs), wc)
+        instance = instance._replace(
+            cycle_times={
+                (mo, wc): instance.cycle_times[(mo, first_line[tuple(cost[wc] for cost in costs)])]
+                for mo, wc in instance.cycle_times
+            }
+        )
+        groups = identical_lines(workcenters, instance.customer_orders, instance.cycle_times, *costs)
+        for symmetry_breaking in [None] + list(SYMMETRY_BREAKING):
+            model = build_instance(
+                instance, builder="matrix", lean=True, symmetry_breaking=symmetry_breaking
+            )
+            if solver == "gurobi":
+                model.Params.OutputFlag = 0
+                model.Params.TimeLimit = time_limit
+                model.Params.MIPGap = 0
+                model.optimize()
+                nodes, solve_time, cost = int(model.NodeCount), model.Runtime, model.ObjVal
+            else:
+                result = solve(model, solver, time_limit=time_limit, mip_gap=0)
+                nodes, solve_time, cost = None, result.solve_time, result.objective
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Identical lines": " / ".join("=".join(group) for group in groups),
+                    "Symmetry breaking": symmetry_breaking or "none",
+                    "Nodes": nodes,
+                    "Solve time (s)": round(solve_time, 3),
+                    "Total cost": cost,
+                }
+            )
+            model.dispose()
+
+    return pd.DataFrame(results)
+
+
+def benchmark_model_cache(
+        orders: List[int], horizon: int, builders: List[str], directory: str
+) -> pd.DataFrame:
+    # Time to build the lean model against the time to read it from the model cache and patch
+    # its objective with other costs
+    results = []
+    cache = ModelCache(directory)
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines)
+        for builder in builders:
+            key = builder + "-" + str(n_orders) + "-" + str(horizon)
+            start = time.perf_counter()
+            model = build_instance(instance, builder=builder, lean=True)
+            build_time = time.perf_counter() - start
+            cache.put(key, model)
+
+            start = time.perf_counter()
+            cached = cache.get(key)
+            reg_costs, ot_costs, we_costs = line_costs(instance.workcenters)
+            cached.setAttr(
+                "Obj",
+                cached.getVars(),
+                objective_coefficients(
+                    cached, reg_costs, ot_costs, we_costs, storage_cost, late_prod_cost
+                ),
+            )
+            load_time = time.perf_counter() - start
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Builder": builder,
+                    "Variables": model.NumVars,
+                    "Build time (s)": round(build_time, 3),
+                    "Cached load time (s)": round(load_time, 3),
+                    "Speed-up": round(build_time / load_time, 1),
+                }
+            )
+            model.dispose()
+            cached.dispose()
+
+    return pd.DataFrame(results)
+
+
+def order_book(instance: Instance) -> pd.DataFrame:
+    # Order book of an instance merged with the cycle times of its families, as in read_inputs
+    family = dict(zip(instance.orders["Order"], instance.orders["Product_Family"]))
+    cycle_time = pd.DataFrame(
+        {
+            wc: {family[mo]: instance.cycle_times[(mo, wc)] for mo in instance.customer_orders}
+            for wc in instance.workcenters
+        }
+    )
+    customer_orders = instance.orders.merge(
+        cycle_time, left_on="Product_Family", right_index=True
+    )
+    return customer_orders.sort_values(by=["Delivery_Date", "Order"])
+
+
+def per_cell_inputs(customer_orders: pd.DataFrame, workcenters: List[str]) -> tuple:
+    # Cycle times, calendar and daily requirements built day by day and looked up cell by cell,
+    # as read_inputs used to
+    order_list = customer_orders["Order"].to_list()
+    cycle_times = {
+        (order, line): customer_orders[line][customer_orders.Order == order].item()
+        for order in order_list
+        for line in workcenters
+    }
+    start_date = datetime.datetime.strptime(customer_orders["Delivery_Date"].min(), "%Y/%m/%d")
+    end_date = datetime.datetime.strptime(customer_orders["Delivery_Date"].max(), "%Y/%m/%d")
+    date_modified = start_date
+    calendar = [start_date.strftime("%Y/%m/%d")]
+    while date_modified < end_date:
+        date_modified += datetime.timedelta(days=1)
+        calendar.append(date_modified.strftime("%Y/%m/%d"))
+    daily_requirements = {}
+    for day in calendar:
+        for order in order_list:
+            try:
+                daily_requirements[(day, order)] = customer_orders[
+                    (customer_orders.Order == order)
+                    & (customer_orders.Delivery_Date == day)
+                    ]["Quantity"].item()
+            except ValueError:
+                daily_requirements[(day, order)] = 0
+    return cycle_times, calendar, daily_requirements
+
+
+def benchmark_inputs(orders: List[int], horizon: int, per_cell_limit: int) -> pd.DataFrame:
+    # Time to build the cycle times, calendar and daily requirements from the order book, cell
+    # by cell (up to per_cell_limit orders) and in one vectorized pass
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines)
+        customer_orders = order_book(instance)
+
+        start = time.perf_counter()
+        order_cycle_times(customer_orders, instance.workcenters)
+        calendar = order_calendar(customer_orders)
+        daily_requirements = order_requirements(customer_orders)
+        vectorized_time = time.perf_counter() - start
+
+        per_cell_time = None
+        if n_orders <= per_cell_limit:
+            start = time.perf_counter()
+            per_cell_inputs(customer_orders, instance.workcenters)
+            per_cell_time = time.perf_counter() - start
+        results.append(
+            {
+                "Orders": n_orders,
+                "Days": len(calendar),
+                "Stored requirements": len(daily_requirements),
+                "Per-cell time (s)": per_cell_time and round(per_cell_time, 3),
+                "Vectorized time (s)": round(vectorized_time, 3),
+                "Speed-up": per_cell_time and round(per_cell_time / vectorized_time, 1),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_input_cache(orders: List[int], horizon: int) -> pd.DataFrame:
+    # Time to parse the order book workbook against the time to read it from the input cache:
+    # first run (conversion), repeat run, and run after the workbook was touched (hashed again)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = InputCache(os.path.join(directory, "cache"))
+        for n_orders in orders:
+            orders_file = os.path.join(directory, "orders-" + str(n_orders) + ".xlsx")
+            generate_instance(n_orders, horizon, lines).orders.to_excel(orders_file, index=False)
+            times = {}
+            for run in ["Excel", "First run", "Repeat run", "Touched"]:
+                if run == "Touched":
+                    os.utime(orders_file)
+                start = time.perf_counter()
+                (pd.read_excel if run == "Excel" else cache.read_excel)(orders_file)
+                times[run] = time.perf_counter() - start
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Excel time (s)": round(times["Excel"], 3),
+                    "First run (s)": round(times["First run"], 3),
+                    "Repeat run (s)": round(times["Repeat run"], 3),
+                    "Touched (s)": round(times["Touched"], 3),
+                    "Speed-up": round(times["Excel"] / times["Repeat run"], 1),
+                }
+            )
+
+    return pd.DataFrame(results)
+
+
+def write_order_export(
+        path: str, n_orders: int, horizon: int, n_families: int = 11, chunksize: int = 100000
+) -> pd.DataFrame:
+    # Synthetic order export (CSV or Parquet) written by chunks of rows, returns the cycle times
+    # of its product families per line
+    rng = np.random.default_rng(0)
+    families = np.array(["Model_" + str(k + 1) for k in range(n_families)])
+    timeline = pd.date_range("2020/07/13", periods=horizon).strftime("%Y/%m/%d")
+    writer = None
+    for start in range(0, n_orders, chunksize):
+        size = min(chunksize, n_orders - start)
+        chunk = pd.DataFrame(
+            {
+                "Order": ["O" + str(k).zfill(len(str(n_orders))) for k in range(start, start + size)],
+                "Product_Family": families[rng.integers(n_families, size=size)],
+                "Quantity": rng.integers(1, 13, size=size) * 50,
+                "Delivery_Date": timeline[rng.integers(horizon, size=size)],
+            }
+        )
+        if path.endswith(".csv"):
+            chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    if writer is not None:
+        writer.close()
+    capacity = rng.choice([300, 320, 330, 350], size=(n_families, len(lines)))
+    return pd.DataFrame(8 / capacity, index=families, columns=lines)
+
+
+def ingestion_run(path: str, cycle_time: pd.DataFrame, method: str, chunksize: int) -> dict:
+    # Ingestion of an order export in a fresh process, with the growth of its peak memory
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "In memory":
+        read = pd.read_csv if path.endswith(".csv") else pd.read_parquet
+        customer_orders = read(path)
+        if customer_orders["Order"].duplicated().any():
+            raise ValueError("Duplicate order, please check the requirements file")
+        customer_orders = customer_orders.merge(
+            cycle_time, left_on="Product_Family", right_index=True
+        )
+        customer_orders["Delivery_Date"] = pd.to_datetime(
+            customer_orders["Delivery_Date"]
+        ).dt.strftime("%Y/%m/%d")
+        order_cycle_times(customer_orders, lines)
+        order_calendar(customer_orders)
+        needs = order_requirements(customer_orders)
+    else:
+        needs = stream_order_book(
+            path,
+            cycle_time,
+            lines,
+            by="Order" if method == "Streamed per order" else "Product_Family",
+            chunksize=chunksize,
+        ).needs
+    return {
+        "Time (s)": round(time.perf_counter() - start, 3),
+        "Peak memory growth (MB)": round(
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+        ),
+        "Stored requirements": len(needs),
+    }
+
+
+def benchmark_streaming(
+        orders: List[int], horizon: int, export_format: str, chunksize: int
+) -> pd.DataFrame:
+    # Time and peak memory of the ingestion of an order export read at once against streamed
+    # by chunks, with the demand aggregated per order or per product family
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_orders in orders:
+            path = os.path.join(directory, "orders-" + str(n_orders) + "." + export_format)
+            cycle_time = write_order_export(path, n_orders, horizon)
+            for method in ["In memory", "Streamed per order", "Streamed per family"]:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    run = executor.submit(ingestion_run, path, cycle_time, method, chunksize)
+                    results.append(
+                        {
+                            "Orders": n_orders,
+                            "File (MB)": round(os.path.getsize(path) / 2 ** 20),
+                            "Ingestion": method,
+                            **run.result(),
+                        }
+                    )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_validation(orders: List[int], horizon: int, error_rate: float) -> pd.DataFrame:
+    # Time to validate an order book with a share of faulty rows (duplicate orders, unknown
+    # families, negative quantities, unparseable dates), against the former duplicate check
+    results = []
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for n_orders in orders:
+            path = os.path.join(directory, "orders.csv")
+            cycle_time = write_order_export(path, n_orders, horizon)
+            customer_orders = pd.read_csv(path)
+            for column, value in [
+                ("Order", customer_orders["Order"].iloc[0]),
+                ("Product_Family", "Unknown"),
+                ("Quantity", -1),
+                ("Delivery_Date", "2020/02/30"),
+            ]:
+                faulty = rng.random(n_orders) < error_rate / 4
+                customer_orders.loc[faulty, column] = value
+            capacity = cycle_time.rdiv(8)
+
+            start = time.perf_counter()
+            order_list = customer_orders["Order"].to_list()
+            duplicate = len(order_list) != len(set(order_list))
+            duplicate_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            report = validate_inputs(customer_orders, capacity, lines)
+            validation_time = time.perf_counter() - start
+            results.append(
+                {
+                    "Orders": n_orders,
+                    "Duplicate check (s)": round(duplicate_time, 3),
+                    "Duplicates found": duplicate,
+                    "Validation (s)": round(validation_time, 3),
+                    "Problems": len(report),
+                    **report["Check"].value_counts().to_dict(),
+                }
+            )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_dimensions(orders: List[int], horizon: int) -> pd.DataFrame:
+    # Time to lay out the requirements and cycle times as arrays, looked up per (date, order)
+    # and (order, line) key in the dense dicts against coded from the sparse requirements, and
+    # time to recover the auxiliaries of a lean solution from the coded solution arrays
+    results = []
+    for n_orders in orders:
+        instance = generate_instance(n_orders, horizon, lines)
+        needs = Requirements({key: qty for key, qty in instance.needs.items() if qty})
+
+        start = time.perf_counter()
+        np.array(
+            [
+                [instance.needs[(date, mo)] for mo in instance.customer_orders]
+                for date in instance.timeline
+            ],
+            dtype=float,
+        )
+        np.array(
+            [
+                [instance.cycle_times[(mo, wc)] for wc in instance.workcenters]
+                for mo in instance.customer_orders
+            ],
+            dtype=float,
+        )
+        keyed_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dims = Dimensions(instance.timeline, instance.customer_orders, instance.workcenters)
+        dims.dense(needs, dims.dates, dims.orders)
+        dims.dense(instance.cycle_times, dims.orders, dims.lines, required=True)
+        coded_time = time.perf_counter() - start
+
+        model = build_instance(instance, builder="matrix", lean=True)
+        model.update()
+        planning = pd.DataFrame(data={"Solution": 1.0}, index=model.VarName)
+        start = time.perf_counter()
+        recover_auxiliaries(
+            planning,
+            instance.timeline,
+            instance.workcenters,
+            *line_costs(instance.workcenters),
+            storage_cost,
+            instance.customer_orders,
+            instance.cycle_times,
+            late_prod_cost,
+        )
+        recover_time = time.perf_counter() - start
+        results.append(
+            {
+                "Orders": n_orders,
+                "Variables": model.NumVars,
+                "Keyed arrays (s)": round(keyed_time, 3),
+                "Coded arrays (s)": round(coded_time, 3),
+                "Speed-up": round(keyed_time / coded_time, 1),
+                "Recover auxiliaries (s)": round(recover_time, 3),
+            }
+        )
+        model.dispose()
+
+    return pd.DataFrame(results)
+
+
+def benchmark_changeover(families: List[int], sequences: int, length: int) -> pd.DataFrame:
+    # Changeover sheet of random times turned into the former dict (a pandas lookup per cell)
+    # against the matrix indexed by family code, then the setup times along random sequences of
+    # families and the shortest incoming changeovers, per dict key against vectorized
+    rng = np.random.default_rng(0)
+    results = []
+    for n_families in families:
+        labels = ["Model_" + str(k + 1) for k in range(n_families)]
+        times = rng.integers(1, 30, size=(n_families, n_families))
+        np.fill_diagonal(times, 0)
+        changeover_matrix = pd.DataFrame(times, index=labels, columns=labels)
+        codes = rng.integers(0, n_families, size=(sequences, length))
+
+        start = time.perf_counter()
+        changeover = {
+            (change_from, change_to): changeover_matrix[change_to][change_from]
+            for change_from in labels
+            for change_to in labels
+        }
+        dict_build = time.perf_counter() - start
+        start = time.perf_counter()
+        matrix = ChangeoverMatrix.from_frame(changeover_matrix)
+        matrix_build = time.perf_counter() - start
+
+        sequence_labels = [[labels[code] for code in sequence] for sequence in codes]
+        start = time.perf_counter()
+        dict_times = [
+            sum(
+                changeover[(change_from, change_to)]
+                for change_from, change_to in zip(sequence, sequence[1:])
+            )
+            for sequence in sequence_labels
+        ]
+        min_incoming = {
+            change_to: min(
+                changeover[(change_from, change_to)]
+                for change_from in labels
+                if change_from != change_to
+            )
+            for change_to in labels
+        }
+        dict_lookup = time.perf_counter() - start
+        start = time.perf_counter()
+        matrix_times = matrix.sequence_time(codes)
+        matrix_min_incoming = matrix.min_incoming()
+        matrix_lookup = time.perf_counter() - start
+        if not (
+            np.array_equal(matrix_times, dict_times)
+            and np.array_equal(matrix_min_incoming, [min_incoming[label] for label in labels])
+        ):
+            raise ValueError("The changeover matrix differs from the dict")
+
+        results.append(
+            {
+                "Families": n_families,
+                "Dict build (s)": round(dict_build, 3),
+                "Matrix build (s)": round(matrix_build, 4),
+                "Dict lookups (s)": round(dict_lookup, 3),
+                "Matrix lookups (s)": round(matrix_lookup, 4),
+                "Speed-up": round((dict_build + dict_lookup) / (matrix_build + matrix_lookup), 1),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Model4 formulations")
+    parser.add_argument(
+        "benchmark",
+        choices=[
+            "gap",
+            "lean",
+            "builder",
+            "window",
+            "solver",
+            "rolling",
+            "planner",
+            "scenario",
+            "family",
+            "bucket",
+            "symmetry",
+            "modelcache",
+            "inputs",
+            "inputcache",
+            "stream",
+            "validation",
+            "dimensions",
+            "changeover",
+        ],
+    )
+    parser.add_argument("--orders", type=int, nargs="+", default=None)
+    parser.add_argument("--horizons", type=int, nargs="+", default=[7, 30, 60, 90])
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--lines", type=int, default=len(lines))
+    parser.add_argument("--families", type=int, default=11)
+    parser.add_argument("--model-cache", default="model-cache")
+    parser.add_argument("--builders", nargs="+", default=["loops", "matrix"])
+    parser.add_argument("--builder", choices=["loops", "matrix"], default="matrix")
+    parser.add_argument("--window", type=int, nargs=2, default=[14, 7])
+    parser.add_argument("--solvers", nargs="+", default=["gurobi"] + list(SOLVERS))
+    parser.add_argument("--rolling-window", type=int, default=14)
+    parser.add_argument("--freeze", type=int, default=7)
+    parser.add_argument("--time-limit", type=float, default=600)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--family-counts", type=int, nargs="+", default=[11, 100, 300])
+    parser.add_argument("--sequences", type=int, default=100000)
+    parser.add_argument("--sequence-length", type=int, default=10)
+    parser.add_argument("--per-cell-limit", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, multiprocessing.cpu_count()])
+    args = parser.parse_args()
+
+    if args.benchmark == "gap":
+        result = benchmark_gap_formulation(args.horizons, (args.orders or [30])[0])
+    elif args.benchmark == "lean":
+        result = benchmark_lean(args.orders or [50, 200, 1000], args.horizon, args.time_limit)
+    elif args.benchmark == "builder":
+        result = benchmark_builder(
+            args.orders or [100, 200, 400], args.horizon, args.lines, args.builders
+        )
+    elif args.benchmark == "rolling":
+        windows, result = benchmark_rolling(
+            (args.orders or [60])[0],
+            args.horizon,
+            args.rolling_window,
+            args.freeze,
+            args.solvers[0],
+            args.time_limit,
+        )
+        print(windows.to_string(index=False))
+    elif args.benchmark == "planner":
+        result = benchmark_planner((args.orders or [8])[0], args.horizon, args.solvers[0])
+    elif args.benchmark == "scenario":
+        result = benchmark_scenarios(
+            (args.orders or [8])[0], args.horizon, args.workers, args.solvers[0]
+        )
+    elif args.benchmark == "family":
+        result = benchmark_families(
+            args.orders or [20, 40, 80], args.horizon, args.families, args.solvers[0], args.time_limit
+        )
+    elif args.benchmark == "bucket":
+        result = benchmark_buckets(
+            args.horizons, (args.orders or [10])[0], args.solvers[0], args.time_limit
+        )
+    elif args.benchmark == "symmetry":
+        result = benchmark_symmetry(
+            args.orders or [6, 10], args.horizon, args.lines, args.solvers[0], args.time_limit
+        )
+    elif args.benchmark == "modelcache":
+        result = benchmark_model_cache(
+            args.orders or [100, 200, 400], args.horizon, args.builders, args.model_cache
+        )
+    elif args.benchmark == "inputs":
+        result = benchmark_inputs(
+            args.orders or [200, 400, 5000, 20000], args.horizon, args.per_cell_limit
+        )
+    elif args.benchmark == "inputcache":
+        result = benchmark_input_cache(args.orders or [1000, 5000, 20000], args.horizon)
+    elif args.benchmark == "stream":
+        result = benchmark_streaming(
+            args.orders or [100000, 1000000], args.horizon, args.format, args.chunksize
+        )
+    elif args.benchmark == "validation":
+        result = benchmark_validation(
+            args.orders or [10000, 100000, 1000000], args.horizon, args.error_rate
+        )
+    elif args.benchmark == "dimensions":
+        result = benchmark_dimensions(args.orders or [500, 2000, 5000], args.horizon)
+    elif args.benchmark == "changeover":
+        result = benchmark_changeover(args.family_counts, args.sequences, args.sequence_length)
+    elif args.benchmark == "solver":
+        result = benchmark_solver(
+            args.orders or [10, 20, 40], args.horizon, args.solvers, args.time_limit
+        )
+    else:
+        result = benchmark_window(
+            args.orders or [100, 200, 400],
+            args.horizon,
+            args.lines,
+            tuple(args.window),
+            args.builder,
+        )
+    print(result.to_string(index=False))
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Model4 kept in memory and updated in place when the order book changes
+"""
+
+# Import required packages
+import datetime
+import time
+from typing import Dict, List, Optional
+
+import gurobipy
+import pandas as pd
+
+from production_plan_optimization.solvers import solve
+from Model4 import build_model
+
+# Position of the order in the indices of the variables and constraints of an order
+ORDER_INDEX = {
+    "plannedQty": 1,
+    "plannedTime": 1,
+    "early prod": 1,
+    "late prod": 1,
+    "gapProd": 1,
+    "inventory costs": 1,
+    "x_time_constr": 1,
+    "early late prod": 1,
+    "delay costs": 1,
+    "gap_prod": 0,
+}
+
+
+class Planner:
+    # Full Model4 (recursive gap, linear opening status) built once. The update operations only
+    # change the right-hand sides, coefficients and variables of the edited order or line, and
+    # optimize() restarts from the previous plan.
+    # Every operation is timed in self.log.
+
+    def __init__(
+            self,
+            timeline: List[str],
+            workcenters: List[str],
+            needs,
+            wc_cost_reg: Dict[str, int],
+            wc_cost_ot: Dict[str, int],
+            wc_cost_we: Dict[str, int],
+            inventory_carrying_cost: int,
+            customer_orders: List[str],
+            cycle_times,
+            delay_cost: int,
+            solver: str = "gurobi",
+    ):
+        self.timeline = list(timeline)
+        self.workcenters = list(workcenters)
+        self.customer_orders = list(customer_orders)
+        self.cycle_times = dict(cycle_times)
+        self.wc_cost_reg = dict(wc_cost_reg)
+        self.wc_cost_ot = dict(wc_cost_ot)
+        self.wc_cost_we = dict(wc_cost_we)
+        self.inventory_carrying_cost = inventory_carrying_cost
+        self.delay_cost = delay_cost
+        self.solver = solver
+        self.log = []
+        self.solution: Optional[pd.DataFrame] = None
+
+        # Requirement and due date of each order
+        self.quantity = {}
+        self.due_date = {}
+        for (date, mo), qty in needs.items():
+            if qty:
+                self.quantity[mo] = qty
+                self.due_date[mo] = date
+
+        start = time.perf_counter()
+        self.model = build_model(
+            self.timeline,
+            self.workcenters,
+            needs,
+            self.wc_cost_reg,
+            self.wc_cost_ot,
+            self.wc_cost_we,
+            inventory_carrying_cost,
+            self.customer_orders,
+            self.cycle_times,
+            delay_cost,
+        )
+        self.model.update()
+
+        # Handles on the variables and constraints that the updates touch
+        self.variables = dict(zip(self.model.VarName, self.model.getVars()))
+        constraints = self.model.getConstrs()
+        self.constraints = dict(zip(self.model.ConstrName, constraints))
+        # The recursive gap constraints are all named gap_prod[order], day after day
+        gap_constraints = [c for c in constraints if c.ConstrName.startswith("gap_prod[")]
+        self.gap_constraints = dict(
+            zip(
+                [(date, mo) for date in self.timeline for mo in self.customer_orders],
+                gap_constraints,
+            )
+        )
+        # Variables and constraints of each order, removed with the order when it is cancelled
+        self.order_variables = {mo: [] for mo in self.customer_orders}
+        self.order_constraints = {mo: [] for mo in self.customer_orders}
+        for handles, items, names in (
+                (self.order_variables, self.model.getVars(), self.model.VarName),
+                (self.order_constraints, constraints, self.model.ConstrName),
+        ):
+            for item, name in zip(items, names):
+                prefix, _, index = name[:-1].partition("[")
+                if prefix in ORDER_INDEX:
+                    handles[index.split(",")[ORDER_INDEX[prefix]]].append(item)
+        self.log_operation("build", time.perf_counter() - start)
+
+    def log_operation(self, operation: str, update_time: float, solve_time: float = None) -> None:
+        self.log.append(
+            {"Operation": operation, "Update time (s)": update_time, "Solve time (s)": solve_time}
+        )
+
+    def check_order(self, order: str) -> None:
+        if order not in self.quantity:
+            raise ValueError("Unknown order: " + order)
+
+    def check_date(self, date: str) -> None:
+        if date not in self.timeline:
+            raise ValueError("Date out of the planning horizon: " + date)
+
+    def set_requirement(self, order: str, date: str, qty: float) -> None:
+        # The gap constraint of a day reads gap - previous gap - production = -requirement
+        self.gap_constraints[(date, order)].RHS = -qty
+
+    def set_total_requirement(self) -> None:
+        # Set from the orders kept here, the attributes read back from Gurobi miss pending updates
+        self.constraints["total_req"].RHS = sum(self.quantity.values())
+
+    def change_quantity(self, order: str, qty: float) -> None:
+        start = time.perf_counter()
+        self.check_order(order)
+        self.set_requirement(order, self.due_date[order], qty)
+        self.quantity[order] = qty
+        self.set_total_requirement()
+        self.log_operation("change quantity", time.perf_counter() - start)
+
+    def change_due_date(self, order: str, date: str) -> None:
+        start = time.perf_counter()
+        self.check_order(order)
+        self.check_date(date)
+        self.set_requirement(order, self.due_date[order], 0)
+        self.set_requirement(order, date, self.quantity[order])
+        self.due_date[order] = date
+        self.log_operation("change due date", time.perf_counter() - start)
+
+    def cancel_order(self, order: str) -> None:
+        # The variables and constraints of the order are removed (its terms in the line
+        # constraints with its variables), so that an order of the same name can be added again
+        start = time.perf_counter()
+        self.check_order(order)
+        self.model.remove(self.order_constraints.pop(order))
+        self.model.remove(self.order_variables.pop(order))
+        for date in self.timeline:
+            del self.gap_constraints[(date, order)]
+            for wc in self.workcenters:
+                del self.variables["plannedQty[" + date + "," + order + "," + wc + "]"]
+        for wc in self.workcenters:
+            del self.cycle_times[(order, wc)]
+        self.customer_orders.remove(order)
+        del self.quantity[order]
+        del self.due_date[order]
+        self.set_total_requirement()
+        self.log_operation("cancel order", time.perf_counter() - start)
+
+    def change_line_cost(
+            self,
+            wc: str,
+            reg_cost: Optional[float] = None,
+            ot_cost: Optional[float] = None,
+            we_cost: Optional[float] = None,
+    ) -> None:
+        # Coefficients of the hours in the labor cost constraints of the line
+        start = time.perf_counter()
+        for date in self.timeline:
+            key = date + "," + wc + "]"
+            weekday = datetime.datetime.strptime(date, "%Y/%m/%d").weekday() < 5
+            if weekday:
+                constraint = self.constraints["Link labor cost - working hours - wd[" + key]
+                if reg_cost is not None:
+                    self.model.chgCoeff(constraint, self.variables["Regular hours[" + key], -reg_cost)
+                if ot_cost is not None:
+                    self.model.chgCoeff(constraint, self.variables["Overtime hours[" + key], -ot_cost)
+            elif we_cost is not None:
+                constraint = self.constraints["Link labor cost - working hours - we[" + key]
+                self.model.chgCoeff(constraint, self.variables["Total hours[" + key], -we_cost)
+        for costs, cost in (
+                (self.wc_cost_reg, reg_cost),
+                (self.wc_cost_ot, ot_cost),
+                (self.wc_cost_we, we_cost),
+        ):
+            if cost is not None:
+                costs[wc] = cost
+        self.log_operation("change line cost", time.perf_counter() - start)
+
+    def add_order(
+            self, order: str, qty: float, due_date: str, cycle_times: Dict[str, float]
+    ) -> None:
+        # Variables and constraints of the new order, and its terms in the line constraints
+        start = time.perf_counter()
+        if order in self.customer_orders:
+            raise ValueError("Order already planned: " + order)
+        self.check_date(due_date)
+        model = self.model
+        variables = self.order_variables[order] = []
+        constraints = self.order_constraints[order] = []
+        previous_gap = None
+        for date in self.timeline:
+            for wc in self.workcenters:
+                key = date + "," + order + "," + wc
+                x_qty = model.addVar(vtype=gurobipy.GRB.INTEGER, name="plannedQty[" + key + "]")
+                x_time = model.addVar(name="plannedTime[" + key + "]")
+                variables += [x_qty, x_time]
+                constraints.append(
+                    model.addConstr(
+                        x_time == x_qty * cycle_times[wc], name="x_time_constr[" + key + "]"
+                    )
+                )
+                model.chgCoeff(self.constraints["wty_time_constr[" + date + "," + wc + "]"], x_qty, -1)
+                model.chgCoeff(
+                    self.constraints["total_hours_constr[" + date + "," + wc + "]"], x_time, -1
+                )
+                model.chgCoeff(self.constraints["total_req"], x_qty, 1)
+                self.variables["plannedQty[" + key + "]"] = x_qty
+
+            key = date + "," + order + "]"
+            early_prod = model.addVar(name="early prod[" + key)
+            late_prod = model.addVar(name="late prod[" + key)
+            gap_prod = model.addVar(lb=-10000, ub=10000, name="gapProd[" + key)
+            inventory_costs = model.addVar(obj=1, name="inventory costs[" + key)
+            delay_costs = model.addVar(obj=1, name="delay costs[" + key)
+            variables += [early_prod, late_prod, gap_prod, inventory_costs, delay_costs]
+            constraints.append(
+                model.addConstr(gap_prod == early_prod - late_prod, name="early late prod[" + key)
+            )
+            production = gurobipy.quicksum(
+                self.variables["plannedQty[" + date + "," + order + "," + wc + "]"]
+                for wc in self.workcenters
+            )
+            self.gap_constraints[(date, order)] = model.addConstr(
+                gap_prod
+                == (previous_gap if previous_gap is not None else 0)
+                + production
+                - (qty if date == due_date else 0),
+                name="gap_prod[" + order + "]",
+            )
+            constraints += [
+                self.gap_constraints[(date, order)],
+                model.addConstr(
+                    inventory_costs == early_prod * self.inventory_carrying_cost,
+                    name="inventory costs[" + key,
+                ),
+                model.addConstr(
+                    delay_costs == late_prod * self.delay_cost, name="delay costs[" + key
+                ),
+            ]
+            previous_gap = gap_prod
+
+        self.customer_orders.append(order)
+        self.cycle_times.update({(order, wc): cycle_times[wc] for wc in self.workcenters})
+        self.quantity[order] = qty
+        self.due_date[order] = due_date
+        self.set_total_requirement()
+        self.log_operation("add order", time.perf_counter() - start)
+
+    def optimize(self, time_limit: Optional[float] = None) -> pd.DataFrame:
+        # Solve again, starting from the previous plan
+        start = time.perf_counter()
+        self.model.update()
+        update_time = time.perf_counter() - start
+        previous = None if self.solution is None else self.solution["Solution"].to_dict()
+        result = solve(self.model, self.solver, time_limit=time_limit, start=previous)
+        self.solution = result.solution
+        self.log_operation("optimize", update_time + result.load_time, result.solve_time)
+        print("Total cost = $" + str(result.objective))
+        return self.solution
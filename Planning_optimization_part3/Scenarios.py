@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Cost-sensitivity what-ifs of Model4 on the shipped Customer_orders.xlsx
+"""
+
+# Import required packages
+import argparse
+
+import pandas as pd
+
+from production_plan_optimization.scenarios import run_multiscenario, run_scenarios, scenario_grid
+from production_plan_optimization.solvers import SOLVERS
+from Model4 import (
+    build_model,
+    optimize_planning,
+    read_inputs,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    storage_cost,
+    late_prod_cost,
+    lines,
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve Model4 for a grid of cost scenarios")
+    parser.add_argument("--storage-cost", type=float, nargs="+", default=[storage_cost])
+    parser.add_argument("--late-prod-cost", type=float, nargs="+", default=[late_prod_cost])
+    parser.add_argument("--ot-factor", type=float, nargs="+", default=[1])
+    parser.add_argument("--we-factor", type=float, nargs="+", default=[1])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--multi-scenario", action="store_true")
+    parser.add_argument("--solver", choices=["gurobi"] + list(SOLVERS), default="gurobi")
+    parser.add_argument("--output", default="Scenarios_model4.csv")
+    args = parser.parse_args()
+
+    customer_orders, order_list, cycle_times, calendar, daily_requirements = read_inputs()
+    model_args = dict(
+        timeline=calendar,
+        workcenters=lines,
+        needs=daily_requirements,
+        wc_cost_reg=reg_costs_per_line,
+        wc_cost_ot=ot_costs_per_line,
+        wc_cost_we=we_costs_per_line,
+        inventory_carrying_cost=storage_cost,
+        customer_orders=order_list,
+        cycle_times=cycle_times,
+        delay_cost=late_prod_cost,
+    )
+    # The factors multiply the overtime and weekend costs per line (1.5 and 2 times the regular
+    # cost), an overtime factor of 1.5 makes overtime 2.25 times the regular cost
+    scenarios = scenario_grid(
+        inventory_carrying_cost=args.storage_cost,
+        delay_cost=args.late_prod_cost,
+        wc_cost_ot_factor=args.ot_factor,
+        wc_cost_we_factor=args.we_factor,
+    )
+
+    if args.multi_scenario:
+        result = run_multiscenario(build_model, scenarios, **model_args)
+    else:
+        result = run_scenarios(
+            optimize_planning, scenarios, args.workers, solver=args.solver, **model_args
+        )
+
+    pd.set_option("display.width", 200)
+    print(result.to_string(index=False))
+    result.to_csv(args.output, index=False)
@@ -1,29 +1,34 @@
+import argparse
 import pandas as pd
 import datetime
 from typing import List, Dict
 
+from production_plan_optimization.cache import InputCache
+from production_plan_optimization.validation import check_inputs
+
+parser = argparse.ArgumentParser(description="Read the changeovers of a planning")
+parser.add_argument("--input-cache", default=None)
+args = parser.parse_args()
+
+# Read the workbooks from the input cache when one is given
+input_cache = None if args.input_cache is None else InputCache(args.input_cache)
+read_excel = pd.read_excel if input_cache is None else input_cache.read_excel
+
 # Define hourly cost per line - regular, overtime and weekend
 reg_costs_per_line = {"Line_1": 245, "Line_2": 315, "Line_3": 245}
 lines: List[str] = list(reg_costs_per_line.keys())
 
 # Get orders
-customer_orders = pd.read_excel("Customer_orders.xlsx")
+customer_orders = read_excel("Customer_orders.xlsx")
 
 # Get cycle times
-capacity = pd.read_excel("Constraints.xlsx", sheet_name="8h capacity").set_index("Line")
+capacity = read_excel("Constraints.xlsx", sheet_name="8h capacity").set_index("Line")
 cycle_time = capacity.rdiv(8)
 
-def check_duplicates(list_to_check):
-    if len(list_to_check) == len(set(list_to_check)):
-        return
-    else:
-        print("Duplicate order, please check the requirements file")
-        exit()
-        return
-
+# Check the orders and constraints
+check_inputs(customer_orders, capacity, lines)
 
 order_list = customer_orders["Order"].to_list()
-check_duplicates(order_list)
 
 # Create cycle times dictionnary
 customer_orders = customer_orders.merge(
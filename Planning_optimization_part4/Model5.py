@@ -5,15 +5,38 @@ Created on Mon Jul 27 15:09:01 2020
 """
 
 # Import required packages
+import argparse
 import pandas as pd
 import gurobipy
 import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import altair as alt
 import datapane as dp
 
+from production_plan_optimization.cache import (
+    InputCache,
+    ModelCache,
+    SolutionCache,
+    PACKAGE_SOURCES,
+    input_key,
+    source_version,
+)
+from production_plan_optimization.changeover import ChangeoverMatrix
+from production_plan_optimization.inputs import (
+    order_calendar,
+    order_cycle_times,
+    order_requirements,
+    stream_order_book,
+)
+from production_plan_optimization.matrix import build_model_matrix, production_windows
+from production_plan_optimization.matrix import recover_auxiliaries as recover_slot_auxiliaries
+from production_plan_optimization.scenarios import COST_ARGS, objective_coefficients
+from production_plan_optimization.solvers import SOLVERS, solve
+from production_plan_optimization.symmetry import SYMMETRY_BREAKING, break_line_symmetry
+from production_plan_optimization.validation import check_inputs
 
-def optimize_planning(
+
+def build_model(
         timeline: List[str],
         workcenters: List[str],
         needs,
@@ -24,8 +47,62 @@ def optimize_planning(
         customer_orders: List[str],
         cycle_times,
         delay_cost: int,
-        changeover: Dict[str, int],
-) -> pd.DataFrame:
+        changeover: ChangeoverMatrix,
+        gap_formulation: str = "recursive",
+        opening_formulation: str = "linear",
+        lean: bool = False,
+        builder: str = "loops",
+        production_window: Optional[Tuple[int, int]] = None,
+        initial_gap: Optional[Dict[str, float]] = None,
+        bucket_days: Optional[Dict[str, int]] = None,
+        symmetry_breaking: Optional[str] = None,
+) -> gurobipy.Model:
+    if gap_formulation not in ("cumulative", "recursive"):
+        raise ValueError("Unknown gap formulation: " + gap_formulation)
+    if opening_formulation not in ("linear", "bilinear"):
+        raise ValueError("Unknown line opening formulation: " + opening_formulation)
+    if builder not in ("loops", "matrix"):
+        raise ValueError("Unknown model builder: " + builder)
+    if symmetry_breaking == "load" and bucket_days is not None:
+        # A line of a bucket is opened for a number of days: the lines ordered by their hours may
+        # not be ordered by their opening days, so the load order could cut off every optimum
+        raise ValueError("The load symmetry breaking does not support the time buckets")
+
+    if builder == "matrix":
+        if opening_formulation != "linear":
+            raise ValueError("The matrix builder only supports the linear line opening formulation")
+        model = build_model_matrix(
+            timeline,
+            workcenters,
+            needs,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+            inventory_carrying_cost,
+            customer_orders,
+            cycle_times,
+            delay_cost,
+            gap_formulation,
+            lean,
+            production_window,
+            initial_gap,
+            bucket_days,
+            slots=sequence_slots,
+        )
+        if symmetry_breaking is not None:
+            break_line_symmetry(
+                model,
+                symmetry_breaking,
+                timeline,
+                workcenters,
+                customer_orders,
+                cycle_times,
+                wc_cost_reg,
+                wc_cost_ot,
+                wc_cost_we,
+            )
+        return model
+
     # Split weekdays/weekends
     weekdays = []
     weekend = []
@@ -36,17 +113,35 @@ def optimize_planning(
         else:
             weekend.append(date)
 
+    # Gap carried from the days before the timeline
+    initial_gap = initial_gap or {}
+
+    # Days of each date of the timeline, more than 1 for the weekly/monthly buckets
+    days = bucket_days or {date: 1 for date in timeline}
+
+    # Sparse index of the production and gap variables
+    production, gap = production_windows(
+        timeline, workcenters, needs, customer_orders, cycle_times, production_window, initial_gap
+    )
+    production_index = gurobipy.tuplelist(
+        (timeline[l], customer_orders[o], workcenters[w]) for l, o, w in zip(*production.nonzero())
+    )
+    gap_index = gurobipy.tuplelist(
+        (timeline[l], customer_orders[o]) for l, o in zip(*gap.nonzero())
+    )
+    gap_orders = {date: [] for date in timeline}
+    for date, mo in gap_index:
+        gap_orders[date].append(mo)
+
     # Initiate optimization model
     model = gurobipy.Model("Optimize production planning")
 
-    sequence = list(range(1, 3))
+    sequence = sequence_slots
 
     # DEFINE VARIABLES
     # Quantity variable
     x_qty = model.addVars(
-        timeline,
-        customer_orders,
-        workcenters,
+        production_index,
         sequence,
         lb=0,
         vtype=gurobipy.GRB.INTEGER,
@@ -54,31 +149,37 @@ def optimize_planning(
     )
 
     # Time variable
-    x_time = model.addVars(
-        timeline,
-        customer_orders,
-        workcenters,
-        sequence,
-        lb=0,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="plannedTime",
-    )
+    if lean:
+        # Production time expressed directly from the planned quantity
+        x_time = gurobipy.tupledict(
+            {
+                (date, mo, wc, seq): x_qty[(date, mo, wc, seq)] * cycle_times[(mo, wc)]
+                for date, mo, wc in production_index
+                for seq in sequence
+            }
+        )
+    else:
+        x_time = model.addVars(
+            production_index,
+            sequence,
+            lb=0,
+            vtype=gurobipy.GRB.CONTINUOUS,
+            name="plannedTime",
+        )
 
-    # Set the value of x_time
-    model.addConstrs(
-        (
+        # Set the value of x_time
+        model.addConstrs(
             (
-                x_time[(date, mo, wc, seq)] == x_qty[(date, mo, wc, seq)] * cycle_times[(mo, wc)]
-                for date in timeline
-                for mo in customer_orders
-                for wc in workcenters
-                for seq in sequence
-            )
-        ),
-        name="x_time_constr",
-    )
+                (
+                    x_time[(date, mo, wc, seq)] == x_qty[(date, mo, wc, seq)] * cycle_times[(mo, wc)]
+                    for date, mo, wc in production_index
+                    for seq in sequence
+                )
+            ),
+            name="x_time_constr",
+        )
 
-    # Qty to display
+    # Qty to display, it also balances the quantity between the sequence slots
     quantity = model.addVars(
         timeline, workcenters, lb=0, vtype=gurobipy.GRB.INTEGER, name="qty"
     )
@@ -88,7 +189,7 @@ def optimize_planning(
         (
             (
                 quantity[(date, wc)]
-                == gurobipy.quicksum(x_qty[(date, mo, wc, seq)] for mo in customer_orders)
+                == x_qty.sum(date, "*", wc, seq)
                 for date in timeline
                 for wc in workcenters
                 for seq in sequence
@@ -98,8 +199,13 @@ def optimize_planning(
     )
 
     # Variable status of the line ( 0 = closed, 1 = opened)
+    # On a bucket of several days, number of days the line is opened
     line_opening = model.addVars(
-        timeline, workcenters, vtype=gurobipy.GRB.BINARY, name="Open status"
+        timeline,
+        workcenters,
+        ub=[days[date] for date in timeline for wc in workcenters],
+        vtype=gurobipy.GRB.BINARY if bucket_days is None else gurobipy.GRB.INTEGER,
+        name="Open status",
     )
 
     # Load variables (hours) - regular and overtime
@@ -117,37 +223,68 @@ def optimize_planning(
         name="Overtime hours",
     )
 
-    reg_hours_bis = model.addVars(
-        timeline,
-        workcenters,
-        lb=7,
-        ub=8,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="regHours",
-    )
-    ot_hours_bis = model.addVars(
-        timeline, workcenters, lb=0, ub=4, vtype=gurobipy.GRB.CONTINUOUS, name="OTHours"
-    )
+    if opening_formulation == "bilinear":
+        # Hours if the line is opened, multiplied by the opening status
+        reg_hours_bis = model.addVars(
+            timeline,
+            workcenters,
+            lb=7,
+            ub=8,
+            vtype=gurobipy.GRB.CONTINUOUS,
+            name="regHours",
+        )
+        ot_hours_bis = model.addVars(
+            timeline, workcenters, lb=0, ub=4, vtype=gurobipy.GRB.CONTINUOUS, name="OTHours"
+        )
 
-    # Set the value of reg and OT hours)
-    model.addConstrs(
-        (
-            reg_hours[(date, wc)]
-            == reg_hours_bis[(date, wc)] * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="total_hours_constr",
-    )
+        # Set the value of reg and OT hours)
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)]
+                == reg_hours_bis[(date, wc)] * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="total_hours_constr",
+        )
 
-    model.addConstrs(
-        (
-            ot_hours[(date, wc)] == ot_hours_bis[(date, wc)] * line_opening[(date, wc)]
-            for date in timeline
-            for wc in workcenters
-        ),
-        name="total_hours_constr",
-    )
+        model.addConstrs(
+            (
+                ot_hours[(date, wc)] == ot_hours_bis[(date, wc)] * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="total_hours_constr",
+        )
+    else:
+        # An opened line works between 7 and 8 regular hours and up to 4 overtime hours,
+        # a closed line does not work
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] >= 7 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="min_reg_hours_constr",
+        )
+
+        model.addConstrs(
+            (
+                reg_hours[(date, wc)] <= 8 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="max_reg_hours_constr",
+        )
+
+        model.addConstrs(
+            (
+                ot_hours[(date, wc)] <= 4 * line_opening[(date, wc)]
+                for date in timeline
+                for wc in workcenters
+            ),
+            name="max_ot_hours_constr",
+        )
 
     # Variable total load (hours)
     total_hours = model.addVars(
@@ -172,7 +309,7 @@ def optimize_planning(
         (
             (
                 total_hours[(date, wc)]
-                == gurobipy.quicksum(x_time[(date, mo, wc, seq)] for mo in customer_orders)
+                == x_time.sum(date, "*", wc, seq)
                 for date in timeline
                 for wc in workcenters
                 for seq in sequence
@@ -182,154 +319,170 @@ def optimize_planning(
     )
 
     # Variable cost
-    labor_cost = model.addVars(
-        timeline, workcenters, lb=0, vtype=gurobipy.GRB.CONTINUOUS, name="Labor cost"
-    )
-
-    # Set the value of cost (hours * hourly cost)
-    model.addConstrs(
-        (
-            labor_cost[(date, wc)]
-            == reg_hours[(date, wc)] * wc_cost_reg[wc]
+    if lean:
+        # Labor cost expressed directly from the working hours
+        labor_cost = {
+            (date, wc): reg_hours[(date, wc)] * wc_cost_reg[wc]
             + ot_hours[(date, wc)] * wc_cost_ot[wc]
             for date in weekdays
             for wc in workcenters
-        ),
-        name="Link labor cost - working hours - wd",
-    )
-
-    model.addConstrs(
-        (
-            labor_cost[(date, wc)]
-            == total_hours[(date, wc)] * wc_cost_we[wc]
-            for date in weekend
-            for wc in workcenters
-        ),
-        name="Link labor cost - working hours - we",
-    )
+        }
+        labor_cost.update(
+            {
+                (date, wc): total_hours[(date, wc)] * wc_cost_we[wc]
+                for date in weekend
+                for wc in workcenters
+            }
+        )
+    else:
+        labor_cost = model.addVars(
+            timeline, workcenters, lb=0, vtype=gurobipy.GRB.CONTINUOUS, name="Labor cost"
+        )
 
-    # Variable gap early/late production
-    gap_prod = model.addVars(
-        timeline,
-        customer_orders,
-        lb=-10000,
-        ub=10000,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="gapProd",
-    )
-    abs_gap_prod = model.addVars(
-        timeline,
-        customer_orders,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="absGapProd",
-    )
-    # Set the value of gap for early production
-    for l in range(len(timeline)):
+        # Set the value of cost (hours * hourly cost)
         model.addConstrs(
             (
-                gap_prod[(timeline[l], mo)]
-                == gurobipy.quicksum(
-                    x_qty[(date, mo, wc, seq)]
-                    for date in timeline[: l + 1]
-                    for wc in workcenters
-                    for seq in sequence
-                )
-                - (gurobipy.quicksum(needs[(date, mo)] for date in timeline[: l + 1]))
-                for mo in customer_orders
+                labor_cost[(date, wc)]
+                == reg_hours[(date, wc)] * wc_cost_reg[wc]
+                + ot_hours[(date, wc)] * wc_cost_ot[wc]
+                for date in weekdays
+                for wc in workcenters
             ),
-            name="gap_prod",
+            name="Link labor cost - working hours - wd",
         )
 
-    # Set the value of ABS(gap for early production)
-    model.addConstrs(
-        (
-            (abs_gap_prod[(date, mo)] == gurobipy.abs_(gap_prod[(date, mo)]))
-            for date in timeline
-            for mo in customer_orders
-        ),
-        name="abs gap prod",
-    )
+        model.addConstrs(
+            (
+                labor_cost[(date, wc)]
+                == total_hours[(date, wc)] * wc_cost_we[wc]
+                for date in weekend
+                for wc in workcenters
+            ),
+            name="Link labor cost - working hours - we",
+        )
 
-    # Create variable "early production" and "inventory costs"
+    # Create variable "early production" and "late production"
+    # The lean model has no gap variable, its ±10000 bounds are put on early and late production:
+    # at the optimum at most one of them is positive, and it is the absolute value of the gap
+    gap_bound = 10000 if lean else gurobipy.GRB.INFINITY
     early_prod = model.addVars(
-        timeline,
-        customer_orders,
+        gap_index,
+        ub=gap_bound,
         vtype=gurobipy.GRB.CONTINUOUS,
         name="early prod",
     )
-    inventory_costs = model.addVars(
-        timeline,
-        customer_orders,
+    late_prod = model.addVars(
+        gap_index,
+        ub=gap_bound,
         vtype=gurobipy.GRB.CONTINUOUS,
-        name="inventory costs",
+        name="late prod",
     )
 
-    # Set the value of early production
-    model.addConstrs(
-        (
-            early_prod[(date, m)] == (gap_prod[(date, m)] + abs_gap_prod[(date, m)]) / 2
-            for date in timeline
-            for m in customer_orders
-        ),
-        name="early prod",
-    )
+    # Variable gap early/late production
+    if lean:
+        # Gap expressed directly as early production - late production
+        gap_prod = {
+            (date, m): early_prod[(date, m)] - late_prod[(date, m)]
+            for date, m in gap_index
+        }
+    else:
+        gap_prod = model.addVars(
+            gap_index,
+            lb=-10000,
+            ub=10000,
+            vtype=gurobipy.GRB.CONTINUOUS,
+            name="gapProd",
+        )
 
-    # Set the value of inventory costs
-    model.addConstrs(
-        (
-            (inventory_costs[(date, m)] == early_prod[(date, m)] * inventory_carrying_cost)
-            for date in timeline
-            for m in customer_orders
-        ),
-        name="inventory costs",
-    )
+        # Split the gap into early production (inventory) and late production (backlog)
+        # Both are penalized, so at most one of them is positive at the optimum
+        model.addConstrs(
+            (
+                gap_prod[(date, m)] == early_prod[(date, m)] - late_prod[(date, m)]
+                for date, m in gap_index
+            ),
+            name="early late prod",
+        )
 
-    # Create variable "late production" and "delay costs"
-    late_prod = model.addVars(
-        timeline,
-        customer_orders,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="late prod",
-    )
-    delay_costs = model.addVars(
-        timeline,
-        customer_orders,
-        vtype=gurobipy.GRB.CONTINUOUS,
-        name="inventory costs",
-    )
+    # Set the value of gap for early production
+    if gap_formulation == "cumulative":
+        # Cumulated production minus cumulated requirement since the first day
+        for l in range(len(timeline)):
+            model.addConstrs(
+                (
+                    gap_prod[(timeline[l], mo)]
+                    == gurobipy.quicksum(x_qty.sum(date, mo, "*", "*") for date in timeline[: l + 1])
+                    - (gurobipy.quicksum(needs[(date, mo)] for date in timeline[: l + 1]))
+                    + initial_gap.get(mo, 0)
+                    for mo in gap_orders[timeline[l]]
+                ),
+                name="gap_prod",
+            )
+    else:
+        # Gap of the previous day + production of the day - requirement of the day
+        for l in range(len(timeline)):
+            model.addConstrs(
+                (
+                    gap_prod[(timeline[l], mo)]
+                    == (gap_prod.get((timeline[l - 1], mo), 0) if l > 0 else initial_gap.get(mo, 0))
+                    + x_qty.sum(timeline[l], mo, "*", "*")
+                    - needs[(timeline[l], mo)]
+                    for mo in gap_orders[timeline[l]]
+                ),
+                name="gap_prod",
+            )
 
-    # Set the value of late production
-    model.addConstrs(
-        (
-            late_prod[(date, m)] == (abs_gap_prod[(date, m)] - gap_prod[(date, m)]) / 2
-            for date in timeline
-            for m in customer_orders
-        ),
-        name="late prod",
-    )
+    # Create variable "inventory costs" and "delay costs"
+    if lean:
+        # Costs expressed directly from early and late production
+        inventory_costs = {
+            (date, m): early_prod[(date, m)] * inventory_carrying_cost * days[date]
+            for date, m in gap_index
+        }
+        delay_costs = {
+            (date, m): late_prod[(date, m)] * delay_cost * days[date]
+            for date, m in gap_index
+        }
+    else:
+        inventory_costs = model.addVars(
+            gap_index,
+            vtype=gurobipy.GRB.CONTINUOUS,
+            name="inventory costs",
+        )
+        delay_costs = model.addVars(
+            gap_index,
+            vtype=gurobipy.GRB.CONTINUOUS,
+            name="delay costs",
+        )
 
-    # Set the value of delay costs
-    model.addConstrs(
-        (
-            (delay_costs[(date, m)] == late_prod[(date, m)] * delay_cost)
-            for date in timeline
-            for m in customer_orders
-        ),
-        name="delay costs",
-    )
+        # Set the value of inventory costs
+        model.addConstrs(
+            (
+                (
+                    inventory_costs[(date, m)]
+                    == early_prod[(date, m)] * inventory_carrying_cost * days[date]
+                )
+                for date, m in gap_index
+            ),
+            name="inventory costs",
+        )
+
+        # Set the value of delay costs
+        model.addConstrs(
+            (
+                (delay_costs[(date, m)] == late_prod[(date, m)] * delay_cost * days[date])
+                for date, m in gap_index
+            ),
+            name="delay costs",
+        )
 
     # CONSTRAINT
     # Constraint: Total hours of production = required production time
     model.addConstr(
         (
-            gurobipy.quicksum(
-                x_qty[(date, mo, wc, seq)]
-                for date in timeline
-                for mo in customer_orders
-                for wc in workcenters
-                for seq in sequence
-            )
+            x_qty.sum()
             == (gurobipy.quicksum(needs[(date, mo)] for date in timeline for mo in customer_orders))
+            - sum(initial_gap.get(mo, 0) for mo in customer_orders)
         ),
         name="total_req",
     )
@@ -344,23 +497,125 @@ def optimize_planning(
         labor_cost[(date, wc)] for date in timeline for wc in workcenters
     )
     objective += gurobipy.quicksum(
-        inventory_costs[(date, mo)]
-        for date in timeline
-        for mo in customer_orders
+        inventory_costs[(date, mo)] for date, mo in gap_index
     )
     objective += gurobipy.quicksum(
-        delay_costs[(date, mo)]
-        for date in timeline
-        for mo in customer_orders
+        delay_costs[(date, mo)] for date, mo in gap_index
     )
 
-    # SOLVE MODEL
     model.setObjective(objective)
-    model.optimize()
 
-    sol = pd.DataFrame(data={"Solution": model.X}, index=model.VarName)
+    # Order the interchangeable lines
+    if symmetry_breaking is not None:
+        break_line_symmetry(
+            model,
+            symmetry_breaking,
+            timeline,
+            workcenters,
+            customer_orders,
+            cycle_times,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+        )
+
+    return model
+
+
+def optimize_planning(
+        timeline: List[str],
+        workcenters: List[str],
+        needs,
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        customer_orders: List[str],
+        cycle_times,
+        delay_cost: int,
+        changeover: ChangeoverMatrix,
+        gap_formulation: str = "recursive",
+        opening_formulation: str = "linear",
+        lean: bool = False,
+        builder: str = "loops",
+        production_window: Optional[Tuple[int, int]] = None,
+        solver: str = "gurobi",
+        start_plan: Optional[Dict[Tuple[str, str, str], float]] = None,
+        initial_gap: Optional[Dict[str, float]] = None,
+        time_limit: Optional[float] = None,
+        bucket_days: Optional[Dict[str, int]] = None,
+        symmetry_breaking: Optional[str] = None,
+        cache: Optional[SolutionCache] = None,
+        model_cache: Optional[ModelCache] = None,
+) -> pd.DataFrame:
+    # Arguments of the call, for the keys of the caches
+    inputs = dict(locals())
+    del inputs["cache"], inputs["model_cache"]
+
+    # Solution of the same inputs and model version from the cache, whatever the solver and
+    # the start that found it (only optimal solutions are stored)
+    if cache is not None:
+        key = input_key(
+            model=MODEL_VERSION,
+            **{name: value for name, value in inputs.items() if name not in SOLVE_ARGS}
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            sol, objective = cached
+            print("Total cost = $" + str(objective) + " (cached)")
+            return sol
+
+    if model_cache is None:
+        model = build_model(
+            timeline,
+            workcenters,
+            needs,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+            inventory_carrying_cost,
+            customer_orders,
+            cycle_times,
+            delay_cost,
+            changeover,
+            gap_formulation,
+            opening_formulation,
+            lean,
+            builder,
+            production_window,
+            initial_gap,
+            bucket_days,
+            symmetry_breaking,
+        )
+    else:
+        model = cached_model(model_cache, inputs)
+
+    # SOLVE MODEL
+    start = None
+    if start_plan is not None:
+        start = plan_start(start_plan, timeline, workcenters, cycle_times)
+    result = solve(model, solver, time_limit=time_limit, start=start)
+
+    sol = result.solution
+    if lean:
+        # Values of the variables dropped by the lean model, for the same rows as the full model
+        sol = recover_auxiliaries(
+            sol,
+            timeline,
+            workcenters,
+            wc_cost_reg,
+            wc_cost_ot,
+            wc_cost_we,
+            inventory_carrying_cost,
+            customer_orders,
+            cycle_times,
+            delay_cost,
+            bucket_days,
+        )
+    if cache is not None and result.optimal:
+        cache.put(key, sol, result.objective)
 
-    print("Total cost = $" + str(model.ObjVal))
+    print("Total cost = $" + str(result.objective))
 
     # model.write("Planning_optimization.lp")
     # file = open("Planning_optimization.lp", 'r')
@@ -370,6 +625,64 @@ def optimize_planning(
     return sol
 
 
+def cached_model(model_cache: ModelCache, inputs: Dict) -> gurobipy.Model:
+    # Lean model of the same structure from the model cache (built and stored on a miss), with
+    # the objective of the costs of the inputs. The structure is given by the inputs but the
+    # costs, except the line costs that tell the identical lines when breaking their symmetry.
+    if not inputs["lean"]:
+        raise ValueError(
+            "The model cache needs the lean model, where the costs are only in the objective"
+        )
+    model_args = {name: value for name, value in inputs.items() if name not in SOLVE_ARGS}
+    costs = COST_ARGS if inputs["symmetry_breaking"] is None else COST_ARGS[3:]
+    key = input_key(
+        model=MODEL_VERSION,
+        **{name: value for name, value in model_args.items() if name not in costs}
+    )
+    model = model_cache.get(key)
+    if model is None:
+        model = build_model(**model_args)
+        model_cache.put(key, model)
+    model.setAttr(
+        "Obj",
+        model.getVars(),
+        objective_coefficients(
+            model, *(inputs[name] for name in COST_ARGS), bucket_days=inputs["bucket_days"]
+        ),
+    )
+    return model
+
+
+def recover_auxiliaries(
+        planning: pd.DataFrame,
+        timeline: List[str],
+        workcenters: List[str],
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        customer_orders: List[str],
+        cycle_times,
+        delay_cost: int,
+        bucket_days: Optional[Dict[str, int]] = None,
+) -> pd.DataFrame:
+    # Auxiliaries of a lean solution, over the sequence slots
+    return recover_slot_auxiliaries(
+        planning,
+        timeline,
+        workcenters,
+        wc_cost_reg,
+        wc_cost_ot,
+        wc_cost_we,
+        inventory_carrying_cost,
+        customer_orders,
+        cycle_times,
+        delay_cost,
+        bucket_days,
+        slots=sequence_slots,
+    )
+
+
 def plot_load(planning: pd.DataFrame, need: pd.DataFrame, timeline: List[str]) -> None:
     # Plot graph - Requirement
     source = (
@@ -593,6 +906,117 @@ def print_planning(planning: pd.DataFrame) -> None:
     ).to_csv(r"Planning_model4v2.csv", index=True)
 
 
+def read_plan(plan_file: str = "Planning_model4_list.csv") -> Dict[Tuple[str, str, str], float]:
+    # Planned quantities written by print_planning, by (date, order, line)
+    plan = pd.read_csv(plan_file, dtype={"Date": str, "Line": str, "Customer_Order": str})
+    return dict(zip(zip(plan["Date"], plan["Customer_Order"], plan["Line"]), plan["Qty"] + 0.0))
+
+
+def plan_start(
+        plan: Dict[Tuple[str, str, str], float],
+        timeline: List[str],
+        workcenters: List[str],
+        cycle_times,
+) -> Dict[str, float]:
+    # MIP start of a prior plan: planned quantities, line opening and working hours by variable name.
+    # Orders or days missing from the plan are left to the solver to complete
+    # Every sequence slot carries the same load of a line, so the plan is shared evenly between them
+    sequence = sequence_slots
+    start = {}
+    hours = {(date, wc): 0.0 for date in timeline for wc in workcenters}
+    for (date, mo, wc), qty in plan.items():
+        for seq in sequence:
+            start["plannedQty[" + date + "," + mo + "," + wc + "," + str(seq) + "]"] = qty / len(sequence)
+        if (date, wc) in hours and (mo, wc) in cycle_times:
+            hours[(date, wc)] += qty / len(sequence) * cycle_times[(mo, wc)]
+    for (date, wc), total in hours.items():
+        key = date + "," + wc
+        start["Open status[" + key + "]"] = 1.0 if total > 0 else 0.0
+        start["Total hours[" + key + "]"] = total
+        start["Regular hours[" + key + "]"] = min(total, 8.0)
+        start["Overtime hours[" + key + "]"] = max(total - 8.0, 0.0)
+    return start
+
+
+def read_inputs(
+        orders_file: str = "Customer_orders.xlsx",
+        constraints_file: str = "Constraints.xlsx",
+        input_cache: Optional[InputCache] = None,
+):
+    # Workbooks read from the columnar cache if any
+    read_excel = pd.read_excel if input_cache is None else input_cache.read_excel
+
+    # Get orders
+    customer_orders = read_excel(orders_file)
+
+    # Get cycle times
+    capacity = read_excel(constraints_file, sheet_name="8h capacity").set_index("Line")
+    cycle_time = capacity.rdiv(8)
+
+    # Get changeover
+    changeover_matrix = read_excel(constraints_file, sheet_name="Changeover (min)").set_index("Model")
+
+    # Check the orders and constraints, every problem is reported before any model is built
+    check_inputs(customer_orders, capacity, lines, changeover_matrix)
+
+    order_list = customer_orders["Order"].to_list()
+
+    # Create cycle times dictionnary
+    customer_orders = customer_orders.merge(
+        cycle_time, left_on="Product_Family", right_index=True
+    )
+
+    customer_orders["Delivery_Date"] = pd.to_datetime(
+        customer_orders["Delivery_Date"]
+    ).dt.strftime("%Y/%m/%d")
+    customer_orders = customer_orders.sort_values(by=["Delivery_Date", "Order"])
+
+    cycle_times = order_cycle_times(customer_orders, lines)
+
+    # Changeover times indexed by family code
+    changeover = ChangeoverMatrix.from_frame(changeover_matrix)
+
+    # Define calendar
+    calendar = order_calendar(customer_orders)
+
+    # Create daily requirements dictionnary, nonzero demands only
+    daily_requirements = order_requirements(customer_orders)
+
+    return customer_orders, order_list, cycle_times, changeover, calendar, daily_requirements
+
+
+def read_order_export(
+        orders_file: str,
+        constraints_file: str = "Constraints.xlsx",
+        chunksize: int = 100000,
+        input_cache: Optional[InputCache] = None,
+):
+    # Order export (CSV or Parquet) too large for read_inputs, streamed by chunks of rows and
+    # checked chunk by chunk
+    read_excel = pd.read_excel if input_cache is None else input_cache.read_excel
+
+    # Get cycle times
+    capacity = read_excel(constraints_file, sheet_name="8h capacity").set_index("Line")
+    cycle_time = capacity.rdiv(8)
+
+    # Changeover times indexed by family code
+    changeover_matrix = read_excel(constraints_file, sheet_name="Changeover (min)").set_index("Model")
+    check_inputs(None, capacity, lines, changeover_matrix)
+    changeover = ChangeoverMatrix.from_frame(changeover_matrix)
+
+    # Orders, cycle times, calendar and nonzero daily requirements
+    stream = stream_order_book(orders_file, cycle_time, lines, chunksize=chunksize)
+
+    return (
+        stream.families,
+        stream.customer_orders,
+        stream.cycle_times,
+        changeover,
+        stream.timeline,
+        stream.needs,
+    )
+
+
 # Define hourly cost per line - regular, overtime and weekend
 reg_costs_per_line = {"Line_1": 245, "Line_2": 315, "Line_3": 245}
 ot_costs_per_line = {
@@ -605,98 +1029,63 @@ we_costs_per_line = {
 storage_cost = 5
 late_prod_cost = 1000
 
-lines: List[str] = list(reg_costs_per_line.keys())
-
-# Get orders
-customer_orders = pd.read_excel("Customer_orders.xlsx")
+# Version of the model in the keys of the solution cache
+MODEL_VERSION = source_version(__file__, *PACKAGE_SOURCES)
 
-# Get cycle times
-capacity = pd.read_excel("Constraints.xlsx", sheet_name="8h capacity").set_index("Line")
-cycle_time = capacity.rdiv(8)
+# Arguments of optimize_planning that change how the model is solved, not the model
+SOLVE_ARGS = ("solver", "start_plan", "time_limit")
 
-# Get changeover
-changeover_matrix = pd.read_excel("Constraints.xlsx", sheet_name="Changeover (min)").set_index("Model")
+lines: List[str] = list(reg_costs_per_line.keys())
 
-def check_duplicates(list_to_check):
-    if len(list_to_check) == len(set(list_to_check)):
-        return
+# Sequence slots of the production of a line in a day
+sequence_slots = list(range(1, 3))
+
+if __name__ == "__main__":
+    # Solver, start plan and caches picked on the command line
+    parser = argparse.ArgumentParser(description="Optimize the production planning")
+    parser.add_argument("--solver", choices=["gurobi"] + list(SOLVERS), default="gurobi")
+    parser.add_argument("--symmetry-breaking", choices=list(SYMMETRY_BREAKING), default=None)
+    parser.add_argument("--cache", default=None)
+    parser.add_argument("--model-cache", default=None)
+    parser.add_argument("--input-cache", default=None)
+    parser.add_argument("--orders-export", default=None)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--start-plan", default=None)
+    args = parser.parse_args()
+
+    input_cache = None if args.input_cache is None else InputCache(args.input_cache)
+    if args.orders_export is None:
+        customer_orders, order_list, cycle_times, changeover, calendar, daily_requirements = read_inputs(
+            input_cache=input_cache
+        )
     else:
-        print("Duplicate order, please check the requirements file")
-        exit()
-        return
-
-
-order_list = customer_orders["Order"].to_list()
-check_duplicates(order_list)
-
-# Create cycle times dictionnary
-customer_orders = customer_orders.merge(
-    cycle_time, left_on="Product_Family", right_index=True
-)
-
-customer_orders["Delivery_Date"] = pd.to_datetime(
-    customer_orders["Delivery_Date"]
-).dt.strftime("%Y/%m/%d")
-customer_orders = customer_orders.sort_values(by=["Delivery_Date", "Order"])
-
-cycle_times = {
-    (order, line): customer_orders[line][customer_orders.Order == order].item()
-    for order in order_list
-    for line in lines
-}
-
-# Create changeover dictionnary
-materials_list = changeover_matrix.index.to_list()
-changeover = {(change_from, change_to): changeover_matrix[change_to][change_from]
-              for change_from in materials_list
-              for change_to in materials_list
-              }
-
-
-# Define calendar
-start_date = datetime.datetime.strptime(
-    customer_orders["Delivery_Date"].min(), "%Y/%m/%d"
-)
-end_date = datetime.datetime.strptime(
-    customer_orders["Delivery_Date"].max(), "%Y/%m/%d"
-)
+        customer_orders, order_list, cycle_times, changeover, calendar, daily_requirements = read_order_export(
+            args.orders_export, chunksize=args.chunksize, input_cache=input_cache
+        )
 
-date_modified = start_date
-calendar = [start_date.strftime("%Y/%m/%d")]
-
-while date_modified < end_date:
-    date_modified += datetime.timedelta(days=1)
-    calendar.append(date_modified.strftime("%Y/%m/%d"))
-
-# Create daily requirements dictionnary
-daily_requirements = {}
-for day in calendar:
-    for order in order_list:
-        try:
-            daily_requirements[(day, order)] = customer_orders[
-                (customer_orders.Order == order)
-                & (customer_orders.Delivery_Date == day)
-                ]["Quantity"].item()
-        except ValueError:
-            daily_requirements[(day, order)] = 0
-
-# Optimize planning
-solution = optimize_planning(
-    calendar,
-    lines,
-    daily_requirements,
-    reg_costs_per_line,
-    ot_costs_per_line,
-    we_costs_per_line,
-    storage_cost,
-    order_list,
-    cycle_times,
-    late_prod_cost,
-    changeover
-)
+    # Optimize planning
+    solution = optimize_planning(
+        calendar,
+        lines,
+        daily_requirements,
+        reg_costs_per_line,
+        ot_costs_per_line,
+        we_costs_per_line,
+        storage_cost,
+        order_list,
+        cycle_times,
+        late_prod_cost,
+        changeover,
+        solver=args.solver,
+        start_plan=None if args.start_plan is None else read_plan(args.start_plan),
+        symmetry_breaking=args.symmetry_breaking,
+        lean=args.model_cache is not None,
+        cache=None if args.cache is None else SolutionCache(args.cache),
+        model_cache=None if args.model_cache is None else ModelCache(args.model_cache),
+    )
 
-# Plot the new planning
-#plot_load(solution, daily_requirements, calendar)
-#print_planning(solution)
-#plot_planning(solution, daily_requirements, calendar)
-#plot_inventory(solution, calendar, customer_orders)
+    # Plot the new planning
+    #plot_load(solution, daily_requirements, calendar)
+    #print_planning(solution)
+    #plot_planning(solution, daily_requirements, calendar)
+    #plot_inventory(solution, calendar, customer_orders)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Product-family aggregation of the order book of Model4/Model5, and split of the family
+production back to the orders
+"""
+
+# Import required packages
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.rolling import split_names
+
+# Variables indexed by order, replaced when the family production is split to the orders
+ORDER_VARIABLES = [
+    "plannedQty",
+    "plannedTime",
+    "early prod",
+    "late prod",
+    "gapProd",
+    "inventory costs",
+    "delay costs",
+]
+
+
+def aggregate_families(
+        timeline: List[str],
+        workcenters: List[str],
+        needs,
+        customer_orders: List[str],
+        cycle_times,
+        order_family: Dict[str, str],
+) -> Tuple[List[str], Dict[Tuple[str, str], int], Dict[Tuple[str, str], float]]:
+    # Families, requirement per date and family, and cycle times per family and line.
+    # The orders of a family must share their cycle times.
+    families = list(dict.fromkeys(order_family[mo] for mo in customer_orders))
+    family_cycle_times = {}
+    for mo in customer_orders:
+        for wc in workcenters:
+            cycle_time = family_cycle_times.setdefault((order_family[mo], wc), cycle_times[(mo, wc)])
+            if cycle_time != cycle_times[(mo, wc)]:
+                raise ValueError(
+                    "The orders of family " + order_family[mo] + " have different cycle times"
+                )
+    family_needs = {(date, family): 0 for date in timeline for family in families}
+    for date in timeline:
+        for mo in customer_orders:
+            family_needs[(date, order_family[mo])] += needs[(date, mo)]
+    return families, family_needs, family_cycle_times
+
+
+def split_families(
+        planning: pd.DataFrame,
+        timeline: List[str],
+        needs,
+        customer_orders: List[str],
+        cycle_times,
+        order_family: Dict[str, str],
+) -> pd.DataFrame:
+    # Give the planned quantities of each family to its orders in earliest-due-date order, day
+    # after day, and recompute the early/late production of the orders. The production left
+    # once every order of a family is complete goes to its last order.
+    df = split_names(planning)
+    df["Family"] = df["Key"].str.split(",").str[0]
+    df["Slot"] = df["Key"].str.split(",", n=1).str[1]
+    produced = df[(df["Variable"] == "plannedQty") & (df["Solution"].round(6) > 0)]
+
+    due = {}
+    quantity = {}
+    for (date, mo), qty in needs.items():
+        if qty and mo in customer_orders:
+            due[mo] = min(due.get(mo, date), date)
+            quantity[mo] = quantity.get(mo, 0) + qty
+    order_queue = {}
+    for mo in sorted(quantity, key=lambda mo: (due[mo], mo)):
+        order_queue.setdefault(order_family[mo], []).append(mo)
+
+    day = {date: k for k, date in enumerate(timeline)}
+    order_qty = []
+    for family, rows in produced.groupby("Family", sort=False):
+        queue = order_queue.get(family) or [
+            mo for mo in customer_orders if order_family[mo] == family
+        ]
+        remaining = {mo: float(quantity.get(mo, 0)) for mo in queue}
+        k = 0
+        rows = rows.sort_values("Date", key=lambda dates: dates.map(day), kind="stable")
+        for date, slot, qty in zip(rows["Date"], rows["Slot"], rows["Solution"]):
+            while qty > 1e-6:
+                while k < len(queue) - 1 and remaining[queue[k]] <= 1e-6:
+                    k += 1
+                given = qty if k == len(queue) - 1 else min(qty, remaining[queue[k]])
+                remaining[queue[k]] -= given
+                order_qty.append((date, queue[k], slot, given))
+                qty -= given
+    order_qty = (
+        pd.DataFrame(order_qty, columns=["Date", "Order", "Slot", "Qty"])
+        .groupby(["Date", "Order", "Slot"], sort=False)["Qty"]
+        .sum()
+        .reset_index()
+    )
+
+    # Planned quantities and times of the orders
+    key = order_qty["Date"] + "," + order_qty["Order"] + "," + order_qty["Slot"] + "]"
+    line = order_qty["Slot"].str.split(",").str[0]
+    cycle_time = [cycle_times[(mo, wc)] for mo, wc in zip(order_qty["Order"], line)]
+    planned = pd.concat(
+        [
+            pd.Series(order_qty["Qty"].to_numpy(), index="plannedQty[" + key),
+            pd.Series(order_qty["Qty"].to_numpy() * cycle_time, index="plannedTime[" + key),
+        ]
+    )
+
+    # Early and late production of the orders
+    production = order_qty.groupby(["Date", "Order"])["Qty"].sum()
+    gap_rows = {"gapProd": [], "early prod": [], "late prod": []}
+    index = {name: [] for name in gap_rows}
+    for mo in customer_orders:
+        gap = np.cumsum(
+            [production.get((date, mo), 0) - needs[(date, mo)] for date in timeline]
+        )
+        for name, values in (
+                ("gapProd", gap),
+                ("early prod", np.maximum(gap, 0)),
+                ("late prod", np.maximum(-gap, 0)),
+        ):
+            gap_rows[name] += list(values)
+            index[name] += [name + "[" + date + "," + mo + "]" for date in timeline]
+    gaps = pd.concat([pd.Series(gap_rows[name], index=index[name]) for name in gap_rows])
+
+    kept = planning[~df["Variable"].isin(ORDER_VARIABLES).to_numpy()]
+    return pd.concat(
+        [kept, pd.concat([planned, gaps]).astype(float).to_frame("Solution")]
+    )
+
+
+def optimize_families(
+        optimize_planning: Callable[..., pd.DataFrame],
+        timeline: List[str],
+        workcenters: List[str],
+        needs,
+        customer_orders: List[str],
+        cycle_times,
+        order_family: Dict[str, str],
+        **model_args,
+) -> pd.DataFrame:
+    # Solve Model4/Model5 on (date, family, line) with the requirement of each family, then split
+    # the production back to the orders. model_args are the other arguments of optimize_planning,
+    # by name. The order solution has no inventory/delay cost variables, plan_cost recomputes
+    # the cost from the hours and the early/late production of the orders.
+    if model_args.get("initial_gap"):
+        raise ValueError("The family aggregation does not support initial_gap")
+
+    families, family_needs, family_cycle_times = aggregate_families(
+        timeline, workcenters, needs, customer_orders, cycle_times, order_family
+    )
+    planning = optimize_planning(
+        timeline=timeline,
+        workcenters=workcenters,
+        needs=family_needs,
+        customer_orders=families,
+        cycle_times=family_cycle_times,
+        **model_args,
+    )
+    return split_families(planning, timeline, needs, customer_orders, cycle_times, order_family)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Exact dynamic programming allocation of the daily hours to the lines (Model1 and Model2)
+"""
+
+# Import required packages
+import datetime
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from production_plan_optimization.solvers import Result
+
+
+class LineLoad(NamedTuple):
+    total_hours: int
+    regular_hours: int
+    overtime_hours: int
+    cost: float
+
+
+def line_loads(
+        reg_cost: float,
+        ot_cost: Optional[float] = None,
+        we_cost: Optional[float] = None,
+        weekend: bool = False,
+        min_hours: int = 7,
+        max_reg_hours: int = 8,
+        max_ot_hours: int = 4,
+) -> List[LineLoad]:
+    # Cheapest split of each integer load of a line: closed, or opened between min_hours
+    # regular hours and max_reg_hours + max_ot_hours hours. Without overtime cost every hour is
+    # paid at the regular cost, on weekends every hour is paid at the weekend cost.
+    def cost(regular, overtime):
+        if weekend:
+            return (regular + overtime) * we_cost
+        if ot_cost is None:
+            return (regular + overtime) * reg_cost
+        return regular * reg_cost + overtime * ot_cost
+
+    loads = [LineLoad(0, 0, 0, 0.0)]
+    for hours in range(min_hours, max_reg_hours + max_ot_hours + 1):
+        splits = [
+            (regular, hours - regular)
+            for regular in range(min_hours, min(hours, max_reg_hours) + 1)
+            if hours - regular <= max_ot_hours
+        ]
+        # Most regular hours among the cheapest splits
+        regular, overtime = min(splits, key=lambda split: (cost(*split), -split[0]))
+        loads.append(LineLoad(hours, regular, overtime, cost(regular, overtime)))
+    return loads
+
+
+def allocate_day(need: int, loads: Dict[str, List[LineLoad]]) -> Optional[Dict[str, LineLoad]]:
+    # Cheapest loads of the lines adding up to the need, None if no combination meets it.
+    # best[h] is the cheapest cost of the lines seen so far for h hours in total.
+    best = {0: 0.0}
+    choices = []
+    for wc, options in loads.items():
+        new_best = {}
+        choice = {}
+        for hours, cost in best.items():
+            for load in options:
+                total = hours + load.total_hours
+                if total <= need and cost + load.cost < new_best.get(total, math.inf):
+                    new_best[total] = cost + load.cost
+                    choice[total] = load
+        best = new_best
+        choices.append((wc, choice))
+
+    if need not in best:
+        return None
+    allocation = {}
+    hours = need
+    for wc, choice in reversed(choices):
+        allocation[wc] = choice[hours]
+        hours -= choice[hours].total_hours
+    return allocation
+
+
+def solve_allocation(
+        timeline: List[str],
+        workcenters: List[str],
+        needs: Dict[str, int],
+        variables: List[str],
+        wc_cost_reg: Dict[str, float],
+        wc_cost_ot: Optional[Dict[str, float]] = None,
+        wc_cost_we: Optional[Dict[str, float]] = None,
+) -> Result:
+    # Solve each day of Model1 (regular costs only) or Model2 (overtime and weekend costs) by
+    # dynamic programming. The solution has the given variables of the linear line opening
+    # formulation, in the order of the model.
+    begin = time.perf_counter()
+    values = {
+        "Open status": {},
+        "Regular hours": {},
+        "Overtime hours": {},
+        "Total hours": {},
+        "Labor cost": {},
+    }
+    # Loads of the lines on weekdays and on weekends
+    loads = {
+        weekend: {
+            wc: line_loads(
+                wc_cost_reg[wc],
+                None if wc_cost_ot is None else wc_cost_ot[wc],
+                None if wc_cost_we is None else wc_cost_we[wc],
+                weekend,
+            )
+            for wc in workcenters
+        }
+        for weekend in ([False, True] if wc_cost_we is not None else [False])
+    }
+    objective = 0.0
+    for date in timeline:
+        weekend = (
+            wc_cost_we is not None
+            and datetime.datetime.strptime(date, "%Y/%m/%d").weekday() >= 5
+        )
+        allocation = allocate_day(needs[date], loads[weekend])
+        if allocation is None:
+            raise RuntimeError(
+                "No line allocation meets the requirement of "
+                + str(needs[date])
+                + " hours on "
+                + date
+            )
+        for wc, load in allocation.items():
+            values["Open status"][(date, wc)] = float(load.total_hours > 0)
+            values["Regular hours"][(date, wc)] = load.regular_hours
+            values["Overtime hours"][(date, wc)] = load.overtime_hours
+            values["Total hours"][(date, wc)] = load.total_hours
+            values["Labor cost"][(date, wc)] = load.cost
+            objective += load.cost
+    solve_time = time.perf_counter() - begin
+
+    solution = pd.DataFrame(
+        data={
+            "Solution": [
+                float(values[variable][(date, wc)])
+                for variable in variables
+                for date in timeline
+                for wc in workcenters
+            ]
+        },
+        index=[
+            variable + "[" + date + "," + wc + "]"
+            for variable in variables
+            for date in timeline
+            for wc in workcenters
+        ],
+    )
+    return Result(solution, objective, 0.0, solve_time)
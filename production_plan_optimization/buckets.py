@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-resolution calendar of Model4/Model5: daily buckets first, then weekly and monthly buckets
+"""
+
+# Import required packages
+import datetime
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+def bucket_calendar(
+        timeline: List[str],
+        daily_days: int = 14,
+        monthly_after: Optional[int] = 91,
+) -> Dict[str, List[str]]:
+    # Dates of each bucket, by first date of the bucket: one bucket per day for the first
+    # daily_days days, per week until monthly_after days (to the end if None), then per month.
+    # Weekdays and weekend days of a week or month are separate buckets, so that each bucket
+    # is paid at the weekday or at the weekend costs, like the date it is named after.
+    buckets = {}
+    for k, date in enumerate(timeline):
+        day = datetime.datetime.strptime(date, "%Y/%m/%d")
+        weekend = day.weekday() >= 5
+        if k < daily_days:
+            key = (date,)
+        elif monthly_after is None or k < monthly_after:
+            key = ("week",) + tuple(day.isocalendar()[:2]) + (weekend,)
+        else:
+            key = ("month", day.year, day.month, weekend)
+        buckets.setdefault(key, []).append(date)
+    return {dates[0]: dates for dates in sorted(buckets.values())}
+
+
+def bucket_days(buckets: Dict[str, List[str]]) -> Dict[str, int]:
+    # Number of days of each bucket
+    return {bucket: len(dates) for bucket, dates in buckets.items()}
+
+
+def bucket_needs(
+        buckets: Dict[str, List[str]], needs, customer_orders: List[str]
+) -> Dict[tuple, int]:
+    # Requirement of each order summed over the dates of each bucket
+    return {
+        (bucket, mo): sum(needs[(date, mo)] for date in dates)
+        for bucket, dates in buckets.items()
+        for mo in customer_orders
+    }
+
+
+def optimize_buckets(
+        optimize_planning: Callable[..., pd.DataFrame],
+        timeline: List[str],
+        needs,
+        customer_orders: List[str],
+        daily_days: int = 14,
+        monthly_after: Optional[int] = 91,
+        **model_args,
+) -> pd.DataFrame:
+    # Solve Model4/Model5 on the bucketed calendar. The variables are named after the first
+    # date of their bucket, the open status is the number of opened days of the bucket and the
+    # early/late production is held for the days of the bucket. model_args are the other
+    # arguments of optimize_planning, by name.
+    buckets = bucket_calendar(timeline, daily_days, monthly_after)
+    return optimize_planning(
+        timeline=list(buckets),
+        needs=bucket_needs(buckets, needs, customer_orders),
+        customer_orders=customer_orders,
+        bucket_days=bucket_days(buckets),
+        **model_args,
+    )
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk caches of the planning solutions and built models, keyed on a hash of the normalized
+model inputs, and of the input workbooks converted to a columnar format
+"""
+
+# Import required packages
+import hashlib
+import json
+import numbers
+import os
+import pickle
+from collections.abc import Mapping
+from typing import Optional, Tuple, Union
+
+import gurobipy
+import numpy as np
+import pandas as pd
+
+
+# Sources of the package modules the models are built with (matrix builder, symmetry breaking,
+# buckets, changeover matrix...), part of the version of a model
+PACKAGE_SOURCES = sorted(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+    if name.endswith(".py")
+)
+
+# Inputs read as sparse dicts, where a missing entry is a zero
+SPARSE_INPUTS = ("needs", "initial_gap")
+
+
+def source_version(*paths: str) -> str:
+    # Version of a model: hash of the sources of its script and of the modules it uses, so that
+    # any change of the formulation invalidates the cached solutions
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def file_hash(path: str) -> str:
+    # Hash of the content of a file, read by blocks
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize(value):
+    # JSON-serializable form of the model inputs, the same whatever the order of the dict items
+    # (or of any mapping, such as the changeover matrix) and the type of the numbers (5, 5.0,
+    # numpy.int64(5)...)
+    if isinstance(value, Mapping):
+        return sorted(
+            ([normalize(key), normalize(item)] for key, item in value.items()),
+            key=lambda pair: json.dumps(pair[0]),
+        )
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [normalize(item) for item in value]
+    if isinstance(value, (bool, np.bool_)) or value is None:
+        return None if value is None else bool(value)
+    if isinstance(value, numbers.Number):
+        return float(value)
+    return str(value)
+
+
+def input_key(**inputs) -> str:
+    # Content address of the inputs of a solve. The zero entries of the sparse inputs are left
+    # out, so that the sparse and the dense dicts of the same requirements share a key.
+    for name in SPARSE_INPUTS:
+        if isinstance(inputs.get(name), Mapping):
+            inputs[name] = {key: value for key, value in inputs[name].items() if value != 0}
+    normalized = json.dumps(normalize(inputs), separators=(",", ":"))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class DiskCache:
+    # One entry per key in a directory, made of a file per suffix. The entries of the least
+    # recently used keys are removed beyond max_entries, the use time being the modification
+    # time of the first file so that several processes can share the directory.
+    suffixes = [".pkl"]
+
+    def __init__(self, directory: str, max_entries: int = 64):
+        if max_entries < 1:
+            raise ValueError("The cache must keep at least one entry")
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, suffix: Optional[str] = None) -> str:
+        return os.path.join(self.directory, key + (suffix or self.suffixes[0]))
+
+    def replace(self, temporary: str, key: str, suffix: Optional[str] = None) -> None:
+        # Entry files are written to a temporary file first, a reader never sees a partial file
+        os.replace(temporary, self.path(key, suffix))
+
+    def temporary(self, key: str, suffix: Optional[str] = None) -> str:
+        return self.path(key, "." + str(os.getpid()) + (suffix or self.suffixes[0]))
+
+    def evict(self) -> None:
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(self.suffixes[0]) and entry.name.count(".") == 1
+        ]
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+        for entry in entries[self.max_entries:]:
+            key = entry.name[: -len(self.suffixes[0])]
+            for suffix in self.suffixes:
+                try:
+                    os.remove(self.path(key, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict:
+        return {"Hits": self.hits, "Misses": self.misses, "Entries": len(self)}
+
+    def __len__(self) -> int:
+        return sum(
+            entry.name.endswith(self.suffixes[0]) and entry.name.count(".") == 1
+            for entry in os.scandir(self.directory)
+        )
+
+
+class SolutionCache(DiskCache):
+    # Solutions and objectives of the solves, pickled
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, float]]:
+        # Solution and objective stored under the key, None on a miss
+        try:
+            with open(self.path(key), "rb") as file:
+                solution, objective = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(self.path(key))
+        self.hits += 1
+        return solution, objective
+
+    def put(self, key: str, solution: pd.DataFrame, objective: float) -> None:
+        temporary = self.temporary(key)
+        with open(temporary, "wb") as file:
+            pickle.dump((solution, objective), file)
+        self.replace(temporary, key)
+        self.evict()
+
+
+class ModelCache(DiskCache):
+    # Built models written as MPS files, with the names of their variables and constraints:
+    # MPS does not allow the spaces of the model names, Gurobi writes generic names instead
+    suffixes = [".mps", ".names"]
+
+    def __init__(self, directory: str, max_entries: int = 16):
+        super().__init__(directory, max_entries)
+
+    def get(self, key: str) -> Optional[gurobipy.Model]:
+        # Model stored under the key with its names, None on a miss
+        try:
+            with open(self.path(key, ".names"), "rb") as file:
+                variable_names, constraint_names = pickle.load(file)
+            model = gurobipy.read(self.path(key))
+        except (OSError, EOFError, pickle.UnpicklingError, gurobipy.GurobiError):
+            self.misses += 1
+            return None
+        model.setAttr("VarName", model.getVars(), variable_names)
+        model.setAttr("ConstrName", model.getConstrs(), constraint_names)
+        model.update()
+        os.utime(self.path(key))
+        self.hits += 1
+        return model
+
+    def put(self, key: str, model: gurobipy.Model) -> None:
+        model.update()
+        temporary = self.temporary(key, ".names")
+        with open(temporary, "wb") as file:
+            pickle.dump((model.VarName, model.ConstrName), file)
+        self.replace(temporary, key, ".names")
+        temporary = self.temporary(key)
+        model.write(temporary)
+        self.replace(temporary, key)
+        self.evict()
+
+
+class InputCache(DiskCache):
+    # Sheets of the input workbooks converted once to Feather files (pyarrow), with the
+    # modification time, size and content hash of the workbook they were read from. A workbook
+    # whose modification time or size changed is hashed again, and parsed again only if its
+    # content changed.
+    suffixes = [".feather", ".source"]
+
+    def source(self, key: str) -> Optional[dict]:
+        try:
+            with open(self.path(key, ".source")) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put_source(self, key: str, source: dict) -> None:
+        temporary = self.temporary(key, ".source")
+        with open(temporary, "w") as file:
+            json.dump(source, file)
+        self.replace(temporary, key, ".source")
+
+    def read_excel(self, path: str, sheet_name: Union[str, int] = 0) -> pd.DataFrame:
+        # Same frame as pd.read_excel(path, sheet_name=sheet_name), from the cache when the
+        # workbook did not change since it was converted
+        path = os.path.abspath(path)
+        key = hashlib.sha256(json.dumps([path, sheet_name]).encode()).hexdigest()
+        stat = os.stat(path)
+        source = self.source(key)
+        if source is not None and [source["mtime_ns"], source["size"]] != [
+            stat.st_mtime_ns,
+            stat.st_size,
+        ]:
+            digest = file_hash(path)
+            if digest == source["sha256"]:
+                source.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                self.put_source(key, source)
+            else:
+                source = None
+        if source is not None:
+            try:
+                frame = pd.read_feather(self.path(key))
+            except (OSError, ValueError):
+                pass
+            else:
+                os.utime(self.path(key))
+                self.hits += 1
+                return frame
+
+        self.misses += 1
+        digest = file_hash(path)
+        frame = pd.read_excel(path, sheet_name=sheet_name)
+        temporary = self.temporary(key)
+        frame.to_feather(temporary)
+        self.replace(temporary, key)
+        self.put_source(
+            key, {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        )
+        self.evict()
+        return frame
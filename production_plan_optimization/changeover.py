@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Changeover times between the product families of Model5 held as a dense array indexed by the
+codes of the families, with vectorized setup time lookups and lower bounds
+"""
+
+# Import required packages
+from collections.abc import Mapping
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.dimensions import Dimension
+
+
+class ChangeoverMatrix(Mapping):
+    # Changeover time from a family to another, times[from_code, to_code]. It reads as the former
+    # dict changeover[(change_from, change_to)], keyed by the label pairs.
+    def __init__(self, families: Dimension, times: np.ndarray):
+        times = np.asarray(times, dtype=float)
+        if times.shape != (len(families), len(families)):
+            raise ValueError("The changeover times must be a square array over the families")
+        self.families = families
+        self.times = times
+
+    @classmethod
+    def from_frame(cls, changeover_matrix: pd.DataFrame) -> "ChangeoverMatrix":
+        # Matrix of the "Changeover (min)" sheet indexed by Model: a row per family changed
+        # from, a column per family changed to, the columns put in the order of the rows
+        families = Dimension(changeover_matrix.index)
+        times = changeover_matrix.reindex(columns=changeover_matrix.index).to_numpy(dtype=float)
+        return cls(families, times)
+
+    def __getitem__(self, key: Tuple[str, str]) -> float:
+        change_from, change_to = self.families.codes(list(key))
+        if change_from < 0 or change_to < 0:
+            raise KeyError(key)
+        return float(self.times[change_from, change_to])
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        labels = self.families.labels
+        return ((change_from, change_to) for change_from in labels for change_to in labels)
+
+    def __len__(self) -> int:
+        return self.times.size
+
+    def codes(self, families) -> np.ndarray:
+        # Codes of the families, -1 for a family outside the matrix
+        return self.families.codes(families)
+
+    def setup_times(self, sequence: np.ndarray) -> np.ndarray:
+        # Changeover time before each family of sequences of family codes (the last axis), from
+        # the family before it. The first family of a sequence has no changeover.
+        sequence = np.asarray(sequence)
+        setups = np.zeros(sequence.shape, dtype=float)
+        setups[..., 1:] = self.times[sequence[..., :-1], sequence[..., 1:]]
+        return setups
+
+    def sequence_time(self, sequence: np.ndarray) -> np.ndarray:
+        # Total changeover time of sequences of family codes (the last axis)
+        return self.setup_times(sequence).sum(axis=-1)
+
+    def min_incoming(self) -> np.ndarray:
+        # Shortest changeover into each family from another one
+        times = self.times.copy()
+        np.fill_diagonal(times, np.inf)
+        return times.min(axis=0)
+
+    def min_outgoing(self) -> np.ndarray:
+        # Shortest changeover from each family to another one
+        times = self.times.copy()
+        np.fill_diagonal(times, np.inf)
+        return times.min(axis=1)
+
+    def lower_bound(self, present: np.ndarray) -> np.ndarray:
+        # Lower bound of the changeover time to produce the families present (boolean, the last
+        # axis over the family codes) in one sequence: every family present but the first is
+        # changed into once, from another family present, so at least its shortest incoming
+        # changeover from them, the first being at best the one with the longest of these.
+        present = np.asarray(present, dtype=bool)
+        times = np.where(present[..., :, None], self.times, np.inf)
+        diagonal = np.arange(len(self.families))
+        times[..., diagonal, diagonal] = np.inf
+        incoming = np.where(present, times.min(axis=-2), 0.0)
+        incoming[~np.isfinite(incoming)] = 0.0
+        return incoming.sum(axis=-1) - incoming.max(axis=-1, initial=0.0)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Day-by-day decomposition of the planning models without inventory between dates
+"""
+
+# Import required packages
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import gurobipy
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.solvers import Result, solve
+
+
+def solve_day(
+        build_model: Callable[..., gurobipy.Model],
+        date: str,
+        need: int,
+        model_args: Dict,
+        solver: str,
+) -> Result:
+    # Build and solve the model of one day, run in the worker processes
+    model = build_model(timeline=[date], needs={date: need}, **model_args)
+    return solve(model, solver)
+
+
+def solve_by_day(
+        build_model: Callable[..., gurobipy.Model],
+        timeline: List[str],
+        needs: Dict[str, int],
+        solver: str = "gurobi",
+        workers: Optional[int] = None,
+        **model_args,
+) -> Result:
+    # Solve each day of a model without coupling between dates (no inventory carried from a
+    # date to the next, as in Model1 and Model2) as its own model, in a pool of `workers`
+    # processes (one per core by default), without building the model of the whole timeline.
+    # model_args are the other arguments of build_model, by name.
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(
+            pool.map(
+                solve_day,
+                itertools.repeat(build_model),
+                timeline,
+                [needs[date] for date in timeline],
+                itertools.repeat(model_args),
+                itertools.repeat(solver),
+                chunksize=max(1, len(timeline) // (4 * (workers or multiprocessing.cpu_count()))),
+            )
+        )
+
+    # Days merged in the variable order of the model of the whole timeline: by variable, in
+    # the order of a day model, then by date
+    solution = pd.concat([result.solution for result in results])
+    position = np.concatenate([np.arange(len(result.solution)) for result in results])
+    day = np.repeat(np.arange(len(results)), [len(result.solution) for result in results])
+    variable = pd.Series(solution.index.str.split("[").str[0])
+    first = variable.groupby(variable, sort=False).ngroup().to_numpy()
+    return Result(
+        solution.iloc[np.lexsort((position, day, first))],
+        sum(result.objective for result in results),
+        sum(result.load_time for result in results),
+        sum(result.solve_time for result in results),
+        all(result.optimal for result in results),
+    )
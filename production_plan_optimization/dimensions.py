@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the dimensions of Model4/Model5 (dates, orders, lines, families and sequence slots)
+coded as dense integers, to build the models and read their solutions with integer arrays
+"""
+
+# Import required packages
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class Dimension:
+    # Labels of a dimension and their codes: the code of a label is its position
+    def __init__(self, labels: Sequence):
+        self.labels = pd.Index(list(labels))
+        if not self.labels.is_unique:
+            raise ValueError("Duplicate labels in a dimension")
+        # Labels as written in the variable names, to code the indices read from a solution
+        self.names = pd.Index([str(label) for label in self.labels])
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def codes(self, labels) -> np.ndarray:
+        # Codes of the labels, -1 for a label outside the dimension
+        return self.labels.get_indexer(labels)
+
+    def decode(self, codes) -> np.ndarray:
+        # Labels of the codes, for reporting
+        return self.labels.to_numpy()[codes]
+
+
+class Dimensions:
+    # Dimensions of a model. The dense arrays are indexed by the codes of their dimensions, in
+    # the order of the dimensions given.
+    def __init__(
+            self,
+            timeline: Sequence[str],
+            customer_orders: Sequence[str],
+            workcenters: Sequence[str],
+            families: Sequence[str] = (),
+            slots: Sequence[int] = (),
+    ):
+        self.dates = Dimension(timeline)
+        self.orders = Dimension(customer_orders)
+        self.lines = Dimension(workcenters)
+        self.families = Dimension(families)
+        self.slots = Dimension(slots)
+
+    @staticmethod
+    def dense(
+            mapping, *dimensions: Dimension, fill: float = 0.0, required: bool = False
+    ) -> np.ndarray:
+        # Array of the values of a dict keyed by label tuples, reading the keys of the dict only
+        # (the nonzero entries of sparse requirements). Keys outside the dimensions are left
+        # out, and the cells without a key are set to fill, or raise KeyError if required.
+        array = np.full([len(dimension) for dimension in dimensions], fill, dtype=float)
+        found = np.zeros(array.shape, dtype=bool)
+        if mapping:
+            columns = list(zip(*mapping.keys()))
+            codes = np.array(
+                [dimension.codes(column) for dimension, column in zip(dimensions, columns)]
+            )
+            values = np.fromiter(mapping.values(), dtype=float, count=len(mapping))
+            inside = (codes >= 0).all(axis=0)
+            array[tuple(codes[:, inside])] = values[inside]
+            found[tuple(codes[:, inside])] = True
+        if required and not found.all():
+            missing = np.argwhere(~found)[0]
+            raise KeyError(
+                tuple(dimension.decode(code) for dimension, code in zip(dimensions, missing))
+            )
+        return array
+
+    @staticmethod
+    def variable_names(
+            name: str, *dimensions: Dimension, mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # Names given by addVars/addConstrs to the cells of the grid of the dimensions,
+        # name[label,label,...]: over the whole grid, shaped as the grid, or over the cells of
+        # the mask only, in the order of the grid
+        if mask is None:
+            names = np.array([name + "["], dtype=object)
+            for k, dimension in enumerate(dimensions):
+                separator = "," if k > 0 else ""
+                names = names[..., None] + np.array(
+                    [separator + label for label in dimension.names], dtype=object
+                )
+            return (names + "]").reshape([len(dimension) for dimension in dimensions])
+        names = np.full(np.count_nonzero(mask), name + "[", dtype=object)
+        for k, (dimension, position) in enumerate(zip(dimensions, mask.nonzero())):
+            separator = "," if k > 0 else ""
+            names = names + np.array(
+                [separator + label for label in dimension.names], dtype=object
+            )[position]
+        return names + "]"
+
+    @staticmethod
+    def solution_arrays(
+            planning: pd.DataFrame, variables: Dict[str, Tuple[Dimension, ...]]
+    ) -> Dict[str, np.ndarray]:
+        # Solution of each variable as an array over its dimensions, NaN for the cells without a
+        # variable. The names of the grid are looked up in the solution with one hash pass,
+        # instead of parsing every name of the solution.
+        solution = planning["Solution"]
+        if not solution.index.is_unique:
+            solution = solution[~solution.index.duplicated()]
+        # Position -1 (a name missing from the solution) reads the NaN appended at the end
+        values = np.append(solution.to_numpy(dtype=float), np.nan)
+        arrays = {}
+        for name, dimensions in variables.items():
+            names = Dimensions.variable_names(name, *dimensions)
+            arrays[name] = values[solution.index.get_indexer(names.ravel())].reshape(names.shape)
+        return arrays
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Min-cost flow engine of Model3: hours allocation for fixed line openings, inside a local search
+over the line openings
+"""
+
+# Import required packages
+import datetime
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.allocation import allocate_day, line_loads
+from production_plan_optimization.solvers import Result
+
+# Integer costs of the flow: hourly costs are scaled and rounded to this precision
+COST_SCALE = 1000
+
+
+class OpeningFlow:
+    # Time-expanded network of Model3 for given line openings. The source supplies the hours
+    # of the opened lines to the days, an opened line always gives its 7 minimal hours and
+    # extra regular, overtime (weekdays) or weekend hours at their costs, and the hours flow
+    # from a day to the next at the storage cost. Penalized arcs from the source to each day
+    # and from the last day back to the source keep the network feasible for any openings.
+
+    def __init__(
+            self,
+            timeline: List[str],
+            workcenters: List[str],
+            needs: Dict[str, int],
+            wc_cost_reg: Dict[str, float],
+            wc_cost_ot: Dict[str, float],
+            wc_cost_we: Dict[str, float],
+            inventory_carrying_cost: float,
+            min_hours: int = 7,
+            max_reg_hours: int = 8,
+            max_ot_hours: int = 4,
+    ):
+        from ortools.graph.python import min_cost_flow
+
+        n_days, n_lines = len(timeline), len(workcenters)
+        self.need = np.array([needs[date] for date in timeline], dtype=np.int64)
+        self.weekend = np.array(
+            [datetime.datetime.strptime(date, "%Y/%m/%d").weekday() >= 5 for date in timeline]
+        )
+        reg = np.array([wc_cost_reg[wc] for wc in workcenters], dtype=float)
+        ot = np.array([wc_cost_ot[wc] for wc in workcenters], dtype=float)
+        we = np.array([wc_cost_we[wc] for wc in workcenters], dtype=float)
+        self.min_hours = min_hours
+        self.max_reg_hours = max_reg_hours
+        self.inventory_carrying_cost = inventory_carrying_cost
+
+        # Hourly cost of the minimal hours, of the extra hours and of the overtime hours
+        weekend = self.weekend[:, None]
+        self.base_cost = np.where(weekend, we, reg)
+        extra_cost = self.base_cost
+        overtime_cost = np.broadcast_to(ot, (n_days, n_lines))
+        self.extra_capacity = np.where(
+            self.weekend, max_reg_hours + max_ot_hours - min_hours, max_reg_hours - min_hours
+        )
+        self.overtime_capacity = np.where(self.weekend, 0, max_ot_hours)
+
+        # Nodes: 0 is the source, 1..n_days are the days
+        day = np.arange(1, n_days + 1)
+        line_day = np.repeat(day, n_lines)
+        big = int(self.need.sum()) + (max_reg_hours + max_ot_hours) * n_days * n_lines
+        penalty = 10 * (
+            max(reg.max(), ot.max(), we.max()) + inventory_carrying_cost * n_days
+        )
+        tails = np.concatenate(
+            [np.zeros(2 * n_days * n_lines), day[:-1], np.zeros(n_days), [n_days]]
+        )
+        heads = np.concatenate([line_day, line_day, day[1:], day, [0]])
+        costs = np.concatenate(
+            [
+                extra_cost.ravel(),
+                overtime_cost.ravel(),
+                np.full(n_days - 1, inventory_carrying_cost),
+                np.full(n_days + 1, penalty),
+            ]
+        )
+        capacities = np.concatenate(
+            [np.zeros(2 * n_days * n_lines), np.full(2 * n_days, big)]
+        )
+        self.flow = min_cost_flow.SimpleMinCostFlow()
+        self.arcs = self.flow.add_arcs_with_capacity_and_unit_cost(
+            tails.astype(np.int32),
+            heads.astype(np.int32),
+            capacities.astype(np.int64),
+            np.round(costs * COST_SCALE).astype(np.int64),
+        )
+        self.extra_arcs = self.arcs[: n_days * n_lines].reshape(n_days, n_lines)
+        self.overtime_arcs = self.arcs[n_days * n_lines: 2 * n_days * n_lines].reshape(
+            n_days, n_lines
+        )
+        self.inventory_arcs = self.arcs[2 * n_days * n_lines: 2 * n_days * n_lines + n_days - 1]
+        self.penalty_arcs = self.arcs[2 * n_days * n_lines + n_days - 1:]
+        self.costs = (reg, ot, we)
+        self.opened = np.zeros((n_days, n_lines), dtype=bool)
+        self.flow.set_nodes_supplies(
+            np.arange(n_days + 1, dtype=np.int32),
+            np.concatenate([[self.need.sum()], -self.need]).astype(np.int64),
+        )
+
+    def set_opening(self, date: int, line: int, opened: bool) -> None:
+        # Capacities of the line and minimal hours supplied to the day
+        if self.opened[date, line] == opened:
+            return
+        self.opened[date, line] = opened
+        sign = 1 if opened else -1
+        self.flow.set_arc_capacity(
+            int(self.extra_arcs[date, line]), int(opened * self.extra_capacity[date])
+        )
+        self.flow.set_arc_capacity(
+            int(self.overtime_arcs[date, line]), int(opened * self.overtime_capacity[date])
+        )
+        self.flow.set_node_supply(date + 1, self.flow.supply(date + 1) + sign * self.min_hours)
+        self.flow.set_node_supply(0, self.flow.supply(0) - sign * self.min_hours)
+
+    def evaluate(self) -> float:
+        # Scaled cost of the current openings, penalties included
+        if self.flow.solve() != self.flow.OPTIMAL:
+            raise RuntimeError("The min-cost flow of the line openings could not be solved")
+        return self.flow.optimal_cost() + int(
+            round(COST_SCALE * self.min_hours * self.base_cost[self.opened].sum())
+        )
+
+    def feasible(self) -> bool:
+        return not self.flow.flows(self.penalty_arcs).any()
+
+    def plan(self) -> Dict[str, np.ndarray]:
+        # Hours per day and line, and inventory per day, of the last evaluated openings
+        extra = self.flow.flows(self.extra_arcs.ravel()).reshape(self.opened.shape)
+        overtime = self.flow.flows(self.overtime_arcs.ravel()).reshape(self.opened.shape)
+        total = self.opened * self.min_hours + extra + overtime
+        regular = np.where(
+            self.weekend[:, None], np.minimum(total, self.max_reg_hours), total - overtime
+        )
+        reg, ot, we = self.costs
+        labor = np.where(self.weekend[:, None], total * we, regular * reg + (total - regular) * ot)
+        inventory = np.append(self.flow.flows(self.inventory_arcs), 0)
+        return {
+            "Regular hours": regular,
+            "Overtime hours": total - regular,
+            "Open status": self.opened.astype(float),
+            "Total hours": total,
+            "Labor cost": labor,
+            "early prod": inventory,
+        }
+
+
+def initial_openings(
+        timeline: List[str],
+        workcenters: List[str],
+        needs: Dict[str, int],
+        wc_cost_reg: Dict[str, float],
+        wc_cost_ot: Dict[str, float],
+        wc_cost_we: Dict[str, float],
+) -> np.ndarray:
+    # Openings of the day-by-day allocation without inventory, days that cannot be met on their
+    # own are left closed
+    loads = {
+        weekend: {
+            wc: line_loads(wc_cost_reg[wc], wc_cost_ot[wc], wc_cost_we[wc], weekend)
+            for wc in workcenters
+        }
+        for weekend in (False, True)
+    }
+    openings = np.zeros((len(timeline), len(workcenters)), dtype=bool)
+    for k, date in enumerate(timeline):
+        weekend = datetime.datetime.strptime(date, "%Y/%m/%d").weekday() >= 5
+        allocation = allocate_day(needs[date], loads[weekend])
+        if allocation is not None:
+            openings[k] = [allocation[wc].total_hours > 0 for wc in workcenters]
+    return openings
+
+
+def search_openings(network: OpeningFlow, openings: np.ndarray, max_passes: int = 20) -> int:
+    # First-improvement local search over the openings: open or close a line, swap an opened
+    # and a closed line of a day, or open a line the day before closing it. Returns the best
+    # scaled cost, the network is left with the best openings.
+    n_days, n_lines = openings.shape
+    for date, line in zip(*np.nonzero(openings)):
+        network.set_opening(date, line, True)
+    best = network.evaluate()
+
+    def moves(date, line):
+        yield [(date, line, not network.opened[date, line])]
+        if network.opened[date, line]:
+            for other in range(n_lines):
+                if not network.opened[date, other]:
+                    yield [(date, line, False), (date, other, True)]
+            if date > 0 and not network.opened[date - 1, line]:
+                yield [(date, line, False), (date - 1, line, True)]
+
+    for _ in range(max_passes):
+        improved = False
+        for date in range(n_days):
+            for line in range(n_lines):
+                for move in moves(date, line):
+                    for k, l, opened in move:
+                        network.set_opening(k, l, opened)
+                    cost = network.evaluate()
+                    if cost < best:
+                        best = cost
+                        improved = True
+                        break
+                    for k, l, opened in reversed(move):
+                        network.set_opening(k, l, not opened)
+        if not improved:
+            break
+
+    # Flows of the best openings
+    network.evaluate()
+    return best
+
+
+def solve_flow(
+        timeline: List[str],
+        workcenters: List[str],
+        needs: Dict[str, int],
+        wc_cost_reg: Dict[str, float],
+        wc_cost_ot: Dict[str, float],
+        wc_cost_we: Dict[str, float],
+        inventory_carrying_cost: float,
+        variables: List[str],
+        max_passes: int = 20,
+) -> Result:
+    # Solve Model3 with the min-cost flow engine, starting from the day-by-day allocation.
+    # The solution has the given variables of the linear line opening formulation, in the
+    # order of the model. The openings are a local optimum, not a proven optimum.
+    begin = time.perf_counter()
+    network = OpeningFlow(
+        timeline,
+        workcenters,
+        needs,
+        wc_cost_reg,
+        wc_cost_ot,
+        wc_cost_we,
+        inventory_carrying_cost,
+    )
+    openings = initial_openings(
+        timeline, workcenters, needs, wc_cost_reg, wc_cost_ot, wc_cost_we
+    )
+    load_time = time.perf_counter() - begin
+    search_openings(network, openings, max_passes)
+    if not network.feasible():
+        raise RuntimeError("The flow engine found no line openings meeting the requirements")
+    plan = network.plan()
+    solve_time = time.perf_counter() - begin - load_time
+
+    names = []
+    values = []
+    for variable in variables:
+        if variable == "early prod":
+            names += [variable + "[" + date + "]" for date in timeline]
+        else:
+            names += [
+                variable + "[" + date + "," + wc + "]" for date in timeline for wc in workcenters
+            ]
+        values.append(plan[variable].ravel().astype(float))
+    objective = plan["Labor cost"].sum() + inventory_carrying_cost * plan["early prod"].sum()
+    return Result(
+        pd.DataFrame(data={"Solution": np.concatenate(values)}, index=names),
+        objective,
+        load_time,
+        solve_time,
+    )
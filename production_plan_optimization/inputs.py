@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized construction of the model inputs of Model4/Model5 from the order book, and streamed
+ingestion of the large order exports
+"""
+
+# Import required packages
+import os
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.validation import (
+    ORDER_COLUMNS,
+    InvalidInputs,
+    problems,
+    report,
+    validate_families,
+    validate_orders,
+)
+
+
+class Requirements(dict):
+    # Daily requirements holding only the nonzero (date, order) demands: any other pair needs 0.
+    # Reading a missing pair does not insert it, iterating the items gives the demands only.
+    def __missing__(self, key: Tuple[str, str]) -> int:
+        return 0
+
+
+def order_cycle_times(
+        customer_orders: pd.DataFrame, workcenters: List[str]
+) -> Dict[Tuple[str, str], float]:
+    # Cycle time of each order on each line, from the order book merged with the cycle times
+    # of the product families (one column per line)
+    cycle_times = customer_orders.set_index("Order")[workcenters].stack()
+    return dict(zip(cycle_times.index, cycle_times.tolist()))
+
+
+def order_calendar(customer_orders: pd.DataFrame) -> List[str]:
+    # Every day from the first to the last delivery date
+    dates = pd.to_datetime(customer_orders["Delivery_Date"], format="%Y/%m/%d")
+    return pd.date_range(dates.min(), dates.max()).strftime("%Y/%m/%d").to_list()
+
+
+def order_requirements(customer_orders: pd.DataFrame) -> Requirements:
+    # Quantity due by each order on its delivery date, summed in one groupby pass
+    demand = customer_orders.groupby(["Delivery_Date", "Order"], sort=True)["Quantity"].sum()
+    demand = demand[demand != 0]
+    return Requirements(zip(demand.index, demand.tolist()))
+
+
+class OrderStream(NamedTuple):
+    timeline: List[str]
+    # Orders, or product families when the demand is aggregated per family
+    customer_orders: List[str]
+    cycle_times: Dict[Tuple[str, str], float]
+    needs: Requirements
+    rows: int
+    # Product family of the orders (or of the families), as the Order and Product_Family columns
+    # of the order book
+    families: pd.DataFrame
+
+
+class OrderHashes:
+    # Compact set of the orders already read: sorted 64-bit hashes of their names, 8 bytes per
+    # order whatever the length of the names
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def add(self, orders: pd.Series) -> np.ndarray:
+        # Add the orders, returns True for the ones already read, in an earlier chunk or earlier
+        # in this one
+        hashes = pd.util.hash_pandas_object(orders, index=False).to_numpy()
+        if len(self.hashes):
+            positions = np.searchsorted(self.hashes, hashes)
+            duplicates = self.hashes[np.minimum(positions, len(self.hashes) - 1)] == hashes
+        else:
+            duplicates = np.zeros(len(hashes), dtype=bool)
+        duplicates |= pd.Series(hashes).duplicated().to_numpy()
+        new = np.unique(hashes[~duplicates])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, new), new)
+        return duplicates
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+
+def order_chunks(path: str, chunksize: int = 100000) -> Iterator[pd.DataFrame]:
+    # Order export read by chunks of rows, CSV or Parquet (pyarrow)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        yield from pd.read_csv(
+            path,
+            usecols=ORDER_COLUMNS,
+            dtype={"Order": str, "Product_Family": str},
+            chunksize=chunksize,
+        )
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=ORDER_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        raise ValueError("Unknown order export format: " + extension)
+
+
+def stream_order_book(
+        path: str,
+        cycle_time: pd.DataFrame,
+        workcenters: List[str],
+        by: str = "Order",
+        chunksize: int = 100000,
+) -> OrderStream:
+    # Calendar, orders, cycle times and daily requirements of an order export read chunk by
+    # chunk: only a chunk of rows is in memory, with the hashes of the orders read and the
+    # demand aggregated so far per (date, order), or per (date, family) with
+    # by="Product_Family". Every chunk is validated and InvalidInputs reports the problems of the
+    # whole export once it is read (an order repeated from an earlier chunk at its later rows).
+    if by not in ["Order", "Product_Family"]:
+        raise ValueError("Unknown aggregation: " + by)
+    seen = OrderHashes()
+    customer_orders = {}
+    families = {}
+    cycle_times = {}
+    needs = Requirements()
+    first = last = None
+    rows = 0
+    checks = []
+    for chunk in order_chunks(path, chunksize):
+        # Rows numbered over the whole export
+        chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+        rows += len(chunk)
+        duplicates = seen.add(chunk["Order"]) & ~chunk["Order"].duplicated(keep=False).to_numpy()
+        chunk_problems = report(
+            validate_orders(chunk, cycle_time.index, sheet=os.path.basename(path)),
+            problems(
+                "Duplicate order",
+                os.path.basename(path),
+                chunk.index[duplicates],
+                chunk["Order"][duplicates],
+            ),
+        )
+        if not chunk_problems.empty:
+            checks.append(chunk_problems)
+        if checks:
+            # Invalid export, the next chunks are only checked
+            continue
+
+        chunk = chunk.merge(cycle_time, left_on="Product_Family", right_index=True)
+        days = pd.to_datetime(chunk["Delivery_Date"]).dt.normalize()
+        first = days.min() if first is None else min(first, days.min())
+        last = days.max() if last is None else max(last, days.max())
+
+        customer_orders.update(dict.fromkeys(chunk[by].tolist()))
+        families.update(zip(chunk[by].tolist(), chunk["Product_Family"].tolist()))
+        chunk_cycle_times = chunk.drop_duplicates(by).set_index(by)[workcenters].stack()
+        cycle_times.update(zip(chunk_cycle_times.index, chunk_cycle_times.tolist()))
+        # Demand summed per day before formatting the dates, only the distinct ones are formatted
+        demand = chunk.groupby([days, by])["Quantity"].sum()
+        demand.index = demand.index.set_levels(
+            demand.index.levels[0].strftime("%Y/%m/%d"), level=0
+        )
+        for key, qty in zip(demand.index, demand.tolist()):
+            needs[key] += qty
+
+    # Families of the export without a positive capacity on any line
+    checks.append(validate_families(list(families.values()), cycle_time.rdiv(8), workcenters))
+    problems_found = report(*checks)
+    if not problems_found.empty:
+        raise InvalidInputs(problems_found)
+    if first is None:
+        raise ValueError("No order in " + path)
+    for key in [key for key, qty in needs.items() if qty == 0]:
+        del needs[key]
+    timeline = pd.date_range(first, last).strftime("%Y/%m/%d").to_list()
+    families = pd.DataFrame(
+        {"Order": list(families.keys()), "Product_Family": list(families.values())}
+    )
+    return OrderStream(timeline, list(customer_orders), cycle_times, needs, rows, families)
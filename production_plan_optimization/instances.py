@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic planning instances used to benchmark the models on large order books
+"""
+
+# Import required packages
+import datetime
+import random
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import pandas as pd
+
+
+class Instance(NamedTuple):
+    timeline: List[str]
+    workcenters: List[str]
+    customer_orders: List[str]
+    cycle_times: Dict[Tuple[str, str], float]
+    needs: Dict[Tuple[str, str], int]
+    orders: pd.DataFrame
+
+
+def generate_instance(
+    n_orders: int,
+    horizon: int,
+    workcenters: Sequence[str] = ("Line_1", "Line_2", "Line_3"),
+    n_families: int = 11,
+    start_date: str = "2020/07/13",
+    utilization: float = 0.8,
+    seed: int = 0,
+) -> Instance:
+    rng = random.Random(seed)
+
+    # Define calendar
+    start = datetime.datetime.strptime(start_date, "%Y/%m/%d")
+    timeline = [
+        (start + datetime.timedelta(days=k)).strftime("%Y/%m/%d")
+        for k in range(horizon)
+    ]
+
+    # 8h capacity per product family and line, as in Constraints.xlsx
+    families = ["Model_" + str(k + 1) for k in range(n_families)]
+    capacity = {
+        (family, wc): rng.choice([300, 320, 330, 350])
+        for family in families
+        for wc in workcenters
+    }
+
+    # Customer orders, the last one is due on the last day of the horizon
+    customer_orders = ["O" + str(k + 1).zfill(len(str(n_orders))) for k in range(n_orders)]
+    orders = pd.DataFrame(
+        {
+            "Order": customer_orders,
+            "Product_Family": [rng.choice(families) for _ in customer_orders],
+            "Quantity": [rng.randrange(100, 650, 50) for _ in customer_orders],
+            "Delivery_Date": [rng.choice(timeline) for _ in customer_orders[:-1]]
+            + [timeline[-1]],
+        }
+    )
+
+    cycle_times = {
+        (order, wc): 8 / capacity[(family, wc)]
+        for order, family in zip(orders["Order"], orders["Product_Family"])
+        for wc in workcenters
+    }
+
+    # Scale the quantities so that the order book loads the regular hours of the lines
+    required_hours = sum(
+        qty * sum(cycle_times[(order, wc)] for wc in workcenters) / len(workcenters)
+        for order, qty in zip(orders["Order"], orders["Quantity"])
+    )
+    scale = utilization * 8 * len(workcenters) * horizon / required_hours
+    orders["Quantity"] = [max(1, round(qty * scale)) for qty in orders["Quantity"]]
+
+    needs = {(date, order): 0 for date in timeline for order in customer_orders}
+    for order, date, qty in zip(
+        orders["Order"], orders["Delivery_Date"], orders["Quantity"]
+    ):
+        needs[(date, order)] = qty
+
+    return Instance(timeline, list(workcenters), customer_orders, cycle_times, needs, orders)
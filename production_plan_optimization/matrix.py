@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""
+Matrix-API builder of Model4/Model5, shared by both scripts: production windows, model laid out
+with index arrays and sparse matrices, and auxiliaries of a lean solution
+"""
+
+# Import required packages
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import gurobipy
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from production_plan_optimization.dimensions import Dimension, Dimensions
+
+
+def production_windows(
+        timeline: List[str],
+        workcenters: List[str],
+        needs,
+        customer_orders: List[str],
+        cycle_times,
+        production_window: Optional[Tuple[int, int]] = None,
+        initial_gap: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Masks of the (date, order, line) where an order can be produced and of the (date, order)
+    # where its gap can differ from 0.
+    # An order is produced on the lines with a finite cycle time, from production_window[0] days
+    # before up to production_window[1] days after its delivery date (all days if None).
+    # Nothing is produced or required before the window, so the gap is 0 there.
+    # An order carrying a gap from the previous days (initial_gap) has a gap from the first day,
+    # and an order only carrying a backlog is produced as if it was due on the first day.
+    dims = Dimensions(timeline, customer_orders, workcenters)
+    cycle = dims.dense(cycle_times, dims.orders, dims.lines, required=True)
+    demand = dims.dense(needs, dims.dates, dims.orders)
+    if production_window is None:
+        production = np.ones(demand.shape, dtype=bool)
+        gap = production
+    else:
+        days_before, days_after = production_window
+        day = np.arange(len(timeline))[:, None]
+        initial_gap = initial_gap or {}
+        carried = np.array([initial_gap.get(mo, 0) != 0 for mo in customer_orders], dtype=bool)
+        ordered = (demand != 0).any(axis=0) | carried
+        delivery = (demand != 0).argmax(axis=0)
+        production = ordered & (day >= delivery - days_before) & (day <= delivery + days_after)
+        gap = ordered & ((day >= delivery - days_before) | carried)
+    return production[:, :, None] & np.isfinite(cycle)[None, :, :], gap
+
+
+def add_rows(
+        model: gurobipy.Model,
+        x: gurobipy.MVar,
+        terms,
+        sense: str,
+        rhs,
+        names: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+) -> None:
+    # One row per name, terms are (variable indices, coefficients) with one line per row of the grid,
+    # only the rows in the rows mask are added (all rows if None).
+    # Negative indices (variables outside the sparse index) and zero coefficients are left out
+    names = np.ravel(names)
+    n_rows = len(names)
+    if n_rows == 0:
+        return
+    n_grid = n_rows if rows is None else rows.size
+    selected = slice(None) if rows is None else rows.ravel()
+    columns = np.hstack([np.reshape(index, (n_grid, -1))[selected] for index, coef in terms])
+    values = np.hstack(
+        [
+            np.broadcast_to(np.asarray(coef, dtype=float), np.shape(index)).reshape(n_grid, -1)[selected]
+            for index, coef in terms
+        ]
+    )
+    values[columns < 0] = 0
+    columns[columns < 0] = 0
+    width = columns.shape[1]
+    matrix = sp.csr_matrix(
+        (values.ravel(), columns.ravel(), np.arange(0, n_rows * width + 1, width)),
+        shape=(n_rows, x.shape[0]),
+    )
+    matrix.eliminate_zeros()
+    rhs = np.broadcast_to(np.asarray(rhs, dtype=float), (n_grid,))[selected]
+    model.addMConstr(matrix, x, sense, rhs + 0.0, name=names)
+
+
+def build_model_matrix(
+        timeline: List[str],
+        workcenters: List[str],
+        needs,
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        customer_orders: List[str],
+        cycle_times,
+        delay_cost: int,
+        gap_formulation: str = "recursive",
+        lean: bool = False,
+        production_window: Optional[Tuple[int, int]] = None,
+        initial_gap: Optional[Dict[str, float]] = None,
+        bucket_days: Optional[Dict[str, int]] = None,
+        slots: Sequence[int] = (),
+) -> gurobipy.Model:
+    # Same model as build_model of Model4, laid out with index arrays and sparse matrices, or of
+    # Model5 with its sequence slots: the quantities and times then have a last axis over the
+    # slots, and the qty of a line is the same for every slot
+    n_days, n_orders, n_wc = len(timeline), len(customer_orders), len(workcenters)
+    weekday = np.array(
+        [datetime.datetime.strptime(date, "%Y/%m/%d").weekday() < 5 for date in timeline]
+    )
+    # Cycle times and requirements over the coded orders, lines and dates
+    dims = Dimensions(timeline, customer_orders, workcenters, slots=slots)
+    weekdays = Dimension([date for date, wd in zip(timeline, weekday) if wd])
+    weekend = Dimension([date for date, wd in zip(timeline, weekday) if not wd])
+    cycle = dims.dense(cycle_times, dims.orders, dims.lines, required=True)
+    demand = dims.dense(needs, dims.dates, dims.orders)
+    carried = np.array([(initial_gap or {}).get(mo, 0) for mo in customer_orders], dtype=float)
+    cost_reg = np.array([wc_cost_reg[wc] for wc in workcenters], dtype=float)
+    cost_ot = np.array([wc_cost_ot[wc] for wc in workcenters], dtype=float)
+    cost_we = np.array([wc_cost_we[wc] for wc in workcenters], dtype=float)
+    days = np.array(
+        [1 if bucket_days is None else bucket_days[date] for date in timeline], dtype=float
+    )
+
+    production, gap = production_windows(
+        timeline, workcenters, needs, customer_orders, cycle_times, production_window, initial_gap
+    )
+
+    # Production grid (date, order, line), with a last axis over the sequence slots if any
+    sequenced = len(dims.slots) > 0
+    grid = (dims.dates, dims.orders, dims.lines) + ((dims.slots,) if sequenced else ())
+    if sequenced:
+        production = np.repeat(production[:, :, :, None], len(dims.slots), axis=3)
+        cycle = cycle[:, :, None]
+
+    def per_slot(index):
+        # Index of a (date, line) variable repeated over the sequence slots
+        return np.repeat(index[:, :, None], len(dims.slots), axis=2) if sequenced else index
+
+    # DEFINE VARIABLES
+    # Every variable is stored in a single vector, in the same order as build_model
+    blocks = []
+
+    def add_vars(
+            name, dimensions, mask=None, lb=0.0, ub=gurobipy.GRB.INFINITY, vtype=gurobipy.GRB.CONTINUOUS
+    ):
+        # Indices of the new variables, -1 outside the mask
+        start = sum(len(block[0]) for block in blocks)
+        names = np.ravel(Dimensions.variable_names(name, *dimensions, mask=mask))
+        blocks.append((names, lb, ub, vtype))
+        index = np.full([len(dimension) for dimension in dimensions], -1)
+        index[np.ones(index.shape, dtype=bool) if mask is None else mask] = np.arange(
+            start, start + len(names)
+        )
+        return index
+
+    x_qty = add_vars("plannedQty", grid, production, vtype=gurobipy.GRB.INTEGER)
+    if not lean:
+        x_time = add_vars("plannedTime", grid, production)
+    if not lean or sequenced:
+        quantity = add_vars("qty", (dims.dates, dims.lines), vtype=gurobipy.GRB.INTEGER)
+    line_opening = add_vars(
+        "Open status",
+        (dims.dates, dims.lines),
+        ub=np.repeat(days, n_wc),
+        vtype=gurobipy.GRB.BINARY if bucket_days is None else gurobipy.GRB.INTEGER,
+    )
+    reg_hours = add_vars("Regular hours", (dims.dates, dims.lines))
+    ot_hours = add_vars("Overtime hours", (dims.dates, dims.lines))
+    total_hours = add_vars("Total hours", (dims.dates, dims.lines))
+    if not lean:
+        labor_cost = add_vars("Labor cost", (dims.dates, dims.lines))
+    # Bounds of the gap on early and late production in the lean model, without gap variable
+    gap_bound = 10000 if lean else gurobipy.GRB.INFINITY
+    early_prod = add_vars("early prod", (dims.dates, dims.orders), gap, ub=gap_bound)
+    late_prod = add_vars("late prod", (dims.dates, dims.orders), gap, ub=gap_bound)
+    if not lean:
+        gap_prod = add_vars("gapProd", (dims.dates, dims.orders), gap, lb=-10000, ub=10000)
+        inventory_costs = add_vars("inventory costs", (dims.dates, dims.orders), gap)
+        delay_costs = add_vars("delay costs", (dims.dates, dims.orders), gap)
+
+    model = gurobipy.Model("Optimize production planning")
+    x = model.addMVar(
+        sum(len(block[0]) for block in blocks),
+        lb=np.concatenate([np.full(len(names), lb, dtype=float) for names, lb, ub, vtype in blocks]),
+        ub=np.concatenate([np.full(len(names), ub, dtype=float) for names, lb, ub, vtype in blocks]),
+        vtype=np.concatenate([np.full(len(names), vtype) for names, lb, ub, vtype in blocks]),
+        name=np.concatenate([names for names, lb, ub, vtype in blocks]),
+    )
+
+    # CONSTRAINTS
+    # Production time (hours) of each order on each line, the orders on the last axis
+    if lean:
+        x_time_terms = [(np.moveaxis(x_qty, 1, -1), -np.moveaxis(cycle, 0, -1))]
+    else:
+        x_time_terms = [(np.moveaxis(x_time, 1, -1), -1)]
+        add_rows(
+            model,
+            x,
+            [(x_time, 1), (x_qty, -cycle)],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("x_time_constr", *grid, mask=production),
+            production,
+        )
+    if not lean or sequenced:
+        # Qty of each line, the same for every sequence slot
+        add_rows(
+            model,
+            x,
+            [(per_slot(quantity), 1), (np.moveaxis(x_qty, 1, -1), -1)],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("wty_time_constr", *grid[:1], *grid[2:]),
+        )
+
+    # An opened line works between 7 and 8 regular hours and up to 4 overtime hours
+    add_rows(
+        model,
+        x,
+        [(reg_hours, 1), (line_opening, -7)],
+        gurobipy.GRB.GREATER_EQUAL,
+        0,
+        Dimensions.variable_names("min_reg_hours_constr", dims.dates, dims.lines),
+    )
+    add_rows(
+        model,
+        x,
+        [(reg_hours, 1), (line_opening, -8)],
+        gurobipy.GRB.LESS_EQUAL,
+        0,
+        Dimensions.variable_names("max_reg_hours_constr", dims.dates, dims.lines),
+    )
+    add_rows(
+        model,
+        x,
+        [(ot_hours, 1), (line_opening, -4)],
+        gurobipy.GRB.LESS_EQUAL,
+        0,
+        Dimensions.variable_names("max_ot_hours_constr", dims.dates, dims.lines),
+    )
+
+    # Total load = regular + overtime = production time
+    add_rows(
+        model,
+        x,
+        [(total_hours, 1), (reg_hours, -1), (ot_hours, -1)],
+        gurobipy.GRB.EQUAL,
+        0,
+        Dimensions.variable_names("Link total hours - reg/ot hours", dims.dates, dims.lines),
+    )
+    add_rows(
+        model,
+        x,
+        [(per_slot(total_hours), 1)] + x_time_terms,
+        gurobipy.GRB.EQUAL,
+        0,
+        Dimensions.variable_names("total_hours_constr", *grid[:1], *grid[2:]),
+    )
+
+    # Labor cost (hours * hourly cost)
+    if not lean:
+        add_rows(
+            model,
+            x,
+            [
+                (labor_cost[weekday], 1),
+                (reg_hours[weekday], -cost_reg),
+                (ot_hours[weekday], -cost_ot),
+            ],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("Link labor cost - working hours - wd", weekdays, dims.lines),
+        )
+        add_rows(
+            model,
+            x,
+            [(labor_cost[~weekday], 1), (total_hours[~weekday], -cost_we)],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("Link labor cost - working hours - we", weekend, dims.lines),
+        )
+
+    # Gap early/late production
+    if lean:
+        gap_terms = [(early_prod, 1), (late_prod, -1)]
+    else:
+        gap_terms = [(gap_prod, 1)]
+        add_rows(
+            model,
+            x,
+            [(gap_prod, 1), (early_prod, -1), (late_prod, 1)],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("early late prod", dims.dates, dims.orders, mask=gap),
+            gap,
+        )
+
+    gap_names = Dimensions.variable_names("gap_prod", dims.orders)
+    if gap_formulation == "cumulative":
+        # Cumulated production minus cumulated requirement since the first day
+        for l in range(n_days):
+            add_rows(
+                model,
+                x,
+                [(index[l], coef) for index, coef in gap_terms]
+                + [(np.swapaxes(x_qty[: l + 1], 0, 1), -1)],
+                gurobipy.GRB.EQUAL,
+                carried - demand[: l + 1].sum(axis=0),
+                gap_names[gap[l]],
+                gap[l],
+            )
+    else:
+        # Gap of the previous day + production of the day - requirement of the day,
+        # all days at once with a zero coefficient on the previous gap of the first day
+        # (the previous gap is also left out before the production window of an order)
+        first_day = (np.arange(n_days) == 0)[:, None]
+        add_rows(
+            model,
+            x,
+            gap_terms
+            + [(np.roll(index, 1, axis=0), np.where(first_day, 0, -coef)) for index, coef in gap_terms]
+            + [(x_qty, -1)],
+            gurobipy.GRB.EQUAL,
+            (np.where(first_day, carried, 0) - demand).ravel(),
+            gap_names[gap.nonzero()[1]],
+            gap,
+        )
+
+    # Inventory and delay costs
+    if not lean:
+        add_rows(
+            model,
+            x,
+            [(inventory_costs, 1), (early_prod, -inventory_carrying_cost * days[:, None])],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("inventory costs", dims.dates, dims.orders, mask=gap),
+            gap,
+        )
+        add_rows(
+            model,
+            x,
+            [(delay_costs, 1), (late_prod, -delay_cost * days[:, None])],
+            gurobipy.GRB.EQUAL,
+            0,
+            Dimensions.variable_names("delay costs", dims.dates, dims.orders, mask=gap),
+            gap,
+        )
+
+    # Constraint: Total production = total requirement
+    add_rows(
+        model,
+        x,
+        [(x_qty, 1)],
+        gurobipy.GRB.EQUAL,
+        demand.sum() - carried.sum(),
+        np.array(["total_req"], dtype=object),
+    )
+
+    # DEFINE MODEL
+    # Objective : minimize a function
+    model.ModelSense = gurobipy.GRB.MINIMIZE
+    objective = np.zeros(x.shape[0])
+    if lean:
+        objective[reg_hours[weekday]] = cost_reg
+        objective[ot_hours[weekday]] = cost_ot
+        objective[total_hours[~weekday]] = cost_we
+        held = np.broadcast_to(days[:, None], gap.shape)[gap]
+        objective[early_prod[gap]] = inventory_carrying_cost * held
+        objective[late_prod[gap]] = delay_cost * held
+    else:
+        objective[labor_cost] = 1
+        objective[inventory_costs[gap]] = 1
+        objective[delay_costs[gap]] = 1
+    model.setObjective(objective @ x)
+
+    return model
+
+
+def recover_auxiliaries(
+        planning: pd.DataFrame,
+        timeline: List[str],
+        workcenters: List[str],
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        customer_orders: List[str],
+        cycle_times,
+        delay_cost: int,
+        bucket_days: Optional[Dict[str, int]] = None,
+        slots: Sequence[int] = (),
+) -> pd.DataFrame:
+    # Add the values of the definition variables dropped by the lean model, computed on the
+    # solution arrays over the coded dates, orders and lines (and sequence slots of Model5,
+    # whose lean model keeps the qty)
+    dims = Dimensions(timeline, customer_orders, workcenters, slots=slots)
+    sequenced = len(dims.slots) > 0
+    grid = (dims.dates, dims.orders, dims.lines) + ((dims.slots,) if sequenced else ())
+    weekday = np.array(
+        [datetime.datetime.strptime(date, "%Y/%m/%d").weekday() < 5 for date in timeline]
+    )
+    days = np.array(
+        [1 if bucket_days is None else bucket_days[date] for date in timeline], dtype=float
+    )
+    cycle = dims.dense(cycle_times, dims.orders, dims.lines, required=True)
+    if sequenced:
+        cycle = cycle[:, :, None]
+    cost_reg = np.array([wc_cost_reg[wc] for wc in workcenters], dtype=float)
+    cost_ot = np.array([wc_cost_ot[wc] for wc in workcenters], dtype=float)
+    cost_we = np.array([wc_cost_we[wc] for wc in workcenters], dtype=float)
+    value = dims.solution_arrays(
+        planning,
+        {
+            "plannedQty": grid,
+            "Regular hours": (dims.dates, dims.lines),
+            "Overtime hours": (dims.dates, dims.lines),
+            "Total hours": (dims.dates, dims.lines),
+            "early prod": (dims.dates, dims.orders),
+            "late prod": (dims.dates, dims.orders),
+        },
+    )
+
+    # No planned quantity or gap (NaN) outside the production window of an order
+    planned = value["plannedQty"]
+    produced = ~np.isnan(planned)
+    gap = ~np.isnan(value["early prod"])
+    early = value["early prod"][gap]
+    late = value["late prod"][gap]
+    held = np.broadcast_to(days[:, None], gap.shape)[gap]
+    labor_cost = np.where(
+        weekday[:, None],
+        value["Regular hours"] * cost_reg + value["Overtime hours"] * cost_ot,
+        value["Total hours"] * cost_we,
+    )
+    rows = [
+        (
+            Dimensions.variable_names("plannedTime", *grid, mask=produced),
+            (planned * cycle)[produced],
+        )
+    ]
+    if not sequenced:
+        rows.append(
+            (
+                Dimensions.variable_names("qty", dims.dates, dims.lines).ravel(),
+                np.nansum(planned, axis=1).ravel(),
+            )
+        )
+    rows += [
+        (Dimensions.variable_names("Labor cost", dims.dates, dims.lines).ravel(), labor_cost.ravel()),
+        (
+            Dimensions.variable_names("gapProd", dims.dates, dims.orders, mask=gap),
+            early - late,
+        ),
+        (
+            Dimensions.variable_names("inventory costs", dims.dates, dims.orders, mask=gap),
+            early * inventory_carrying_cost * held,
+        ),
+        (
+            Dimensions.variable_names("delay costs", dims.dates, dims.orders, mask=gap),
+            late * delay_cost * held,
+        ),
+    ]
+
+    recovered = pd.DataFrame(
+        data={"Solution": np.concatenate([solution for names, solution in rows])},
+        index=np.concatenate([names for names, solution in rows]),
+    )
+    return pd.concat([planning, recovered])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling-horizon solve of the planning models on long calendars
+"""
+
+# Import required packages
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+def split_names(planning: pd.DataFrame) -> pd.DataFrame:
+    # Variable, date and remaining indices of names like "Total hours[2020/07/13,Line_1]"
+    names = planning.index.to_series()
+    variable = names.str.split("[").str[0]
+    indices = names.str.split("[").str[1].str.rstrip("]")
+    return pd.DataFrame(
+        {
+            "Variable": variable,
+            "Date": indices.str.split(",").str[0],
+            "Key": indices.str.split(",", n=1).str[1],
+            "Solution": planning["Solution"],
+        }
+    )
+
+
+def plan_costs(
+        planning: pd.DataFrame,
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        delay_cost: int,
+        bucket_days: Optional[Dict[str, int]] = None,
+) -> Dict[str, float]:
+    # Hours, unit-days of inventory/backlog and costs of a planning, from its hours and
+    # early/late production, the early/late production being held for every day of its bucket
+    # on a bucketed calendar
+    df = split_names(planning)
+    weekday = pd.to_datetime(df["Date"], format="%Y/%m/%d", errors="coerce").dt.weekday < 5
+    held = df["Date"].map(bucket_days or {}).fillna(1) * df["Solution"]
+    labor_cost = 0.0
+    hours = {}
+    for variable, costs, days in (
+            ("Regular hours", wc_cost_reg, weekday),
+            ("Overtime hours", wc_cost_ot, weekday),
+            ("Total hours", wc_cost_we, ~weekday),
+    ):
+        rows = df[(df["Variable"] == variable) & days]
+        labor_cost += (rows["Solution"] * rows["Key"].map(costs)).sum()
+        hours[variable] = rows["Solution"].sum()
+    inventory = held[df["Variable"] == "early prod"].sum()
+    backlog = held[df["Variable"] == "late prod"].sum()
+    return {
+        "Labor cost": labor_cost,
+        "Inventory cost": inventory * inventory_carrying_cost,
+        "Delay cost": backlog * delay_cost,
+        "Regular hours": hours["Regular hours"],
+        "Overtime hours": hours["Overtime hours"],
+        "Weekend hours": hours["Total hours"],
+        "Inventory (unit-days)": inventory,
+        "Backlog (unit-days)": backlog,
+    }
+
+
+def plan_cost(
+        planning: pd.DataFrame,
+        wc_cost_reg: Dict[str, int],
+        wc_cost_ot: Dict[str, int],
+        wc_cost_we: Dict[str, int],
+        inventory_carrying_cost: int,
+        delay_cost: int,
+        bucket_days: Optional[Dict[str, int]] = None,
+) -> float:
+    # Labor, inventory and delay costs of a planning
+    costs = plan_costs(
+        planning,
+        wc_cost_reg,
+        wc_cost_ot,
+        wc_cost_we,
+        inventory_carrying_cost,
+        delay_cost,
+        bucket_days,
+    )
+    return costs["Labor cost"] + costs["Inventory cost"] + costs["Delay cost"]
+
+
+def rolling_horizon(
+        optimize_planning: Callable[..., pd.DataFrame],
+        timeline: List[str],
+        needs,
+        customer_orders: List[str],
+        window: int,
+        freeze: int,
+        **model_args,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Solve windows of `window` days, keep the plan of their first `freeze` days and start the
+    # next window after them with the inventory/backlog of each order as initial gap.
+    # model_args are the other arguments of optimize_planning, by name.
+    # Returns the kept planning and one report line per window.
+    if not 0 < freeze <= window:
+        raise ValueError("The frozen days must be between 1 and the window length")
+
+    initial_gap: Dict[str, float] = {}
+    planning = []
+    report = []
+    first = 0
+    while first < len(timeline):
+        days = timeline[first: first + window]
+        kept = days if first + window >= len(timeline) else days[:freeze]
+
+        # Orders required in the window or carrying inventory/backlog
+        orders = [
+            mo
+            for mo in customer_orders
+            if initial_gap.get(mo, 0) != 0 or any(needs[(date, mo)] for date in days)
+        ]
+
+        start = time.perf_counter()
+        solution = optimize_planning(
+            timeline=days,
+            needs={(date, mo): needs[(date, mo)] for date in days for mo in orders},
+            customer_orders=orders,
+            initial_gap=initial_gap,
+            **model_args,
+        )
+        wall_time = time.perf_counter() - start
+
+        # Freeze the first days and carry the gap of their last day
+        df = split_names(solution)
+        solution = solution[df["Date"].isin(kept).to_numpy()]
+        last_day = df[df["Date"] == kept[-1]]
+        initial_gap = (
+            last_day[last_day["Variable"] == "early prod"].set_index("Key")["Solution"]
+            .sub(last_day[last_day["Variable"] == "late prod"].set_index("Key")["Solution"], fill_value=0)
+            .round(6)
+            .to_dict()
+        )
+        planning.append(solution)
+
+        report.append(
+            {
+                "Window start": days[0],
+                "Window end": days[-1],
+                "Frozen until": kept[-1],
+                "Orders": len(orders),
+                "Wall time (s)": round(wall_time, 3),
+                "Frozen cost": plan_cost(
+                    solution,
+                    model_args["wc_cost_reg"],
+                    model_args["wc_cost_ot"],
+                    model_args["wc_cost_we"],
+                    model_args["inventory_carrying_cost"],
+                    model_args["delay_cost"],
+                    model_args.get("bucket_days"),
+                ),
+            }
+        )
+        first += len(kept)
+
+    return pd.concat(planning), pd.DataFrame(report)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Cost-sensitivity scenarios of the planning models, solved in a process pool or as one
+Gurobi multi-scenario model
+"""
+
+# Import required packages
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import gurobipy
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.rolling import plan_costs, split_names
+
+# Cost arguments of the models, the only ones a multi-scenario model can change
+COST_ARGS = ["wc_cost_reg", "wc_cost_ot", "wc_cost_we", "inventory_carrying_cost", "delay_cost"]
+
+
+def scenario_grid(**values: List) -> List[Dict]:
+    # Every combination of the values given per override, e.g.
+    # scenario_grid(inventory_carrying_cost=[5, 10], wc_cost_ot_factor=[1, 1.5])
+    return [dict(zip(values, combination)) for combination in itertools.product(*values.values())]
+
+
+def scenario_args(model_args: Dict, scenario: Dict) -> Dict:
+    # Arguments of a scenario: "<argument>" replaces an argument, "<argument>_factor"
+    # multiplies the costs per line of an argument
+    args = dict(model_args)
+    for key, value in scenario.items():
+        name = key[: -len("_factor")] if key.endswith("_factor") else key
+        if name not in model_args:
+            raise ValueError("Unknown scenario override: " + key)
+        if name == key:
+            args[key] = value
+        else:
+            args[name] = {wc: cost * value for wc, cost in model_args[name].items()}
+    return args
+
+
+def plan_kpis(
+        planning: pd.DataFrame,
+        wc_cost_reg: Dict[str, float],
+        wc_cost_ot: Dict[str, float],
+        wc_cost_we: Dict[str, float],
+        inventory_carrying_cost: float,
+        delay_cost: float,
+        bucket_days: Optional[Dict[str, int]] = None,
+) -> Dict[str, float]:
+    # Costs and loads of a planning (plan_costs), with its opening status
+    costs = plan_costs(
+        planning,
+        wc_cost_reg,
+        wc_cost_ot,
+        wc_cost_we,
+        inventory_carrying_cost,
+        delay_cost,
+        bucket_days,
+    )
+    opening = planning.index.str.startswith("Open status[")
+    return {
+        "Total cost": costs["Labor cost"] + costs["Inventory cost"] + costs["Delay cost"],
+        "Labor cost": costs["Labor cost"],
+        "Inventory cost": costs["Inventory cost"],
+        "Delay cost": costs["Delay cost"],
+        "Regular hours": costs["Regular hours"],
+        "Overtime hours": costs["Overtime hours"],
+        "Weekend hours": costs["Weekend hours"],
+        "Open line-days": planning.loc[opening, "Solution"].round().sum(),
+        "Inventory (unit-days)": costs["Inventory (unit-days)"],
+        "Backlog (unit-days)": costs["Backlog (unit-days)"],
+    }
+
+
+def solve_scenario(
+        optimize_planning: Callable[..., pd.DataFrame], model_args: Dict, scenario: Dict
+) -> Dict:
+    # Build and solve one scenario, run in the worker processes
+    args = scenario_args(model_args, scenario)
+    start = time.perf_counter()
+    solution = optimize_planning(**args)
+    wall_time = time.perf_counter() - start
+    return {
+        **scenario,
+        **plan_kpis(
+            solution, *(args[name] for name in COST_ARGS), bucket_days=args.get("bucket_days")
+        ),
+        "Wall time (s)": round(wall_time, 3),
+    }
+
+
+def run_scenarios(
+        optimize_planning: Callable[..., pd.DataFrame],
+        scenarios: List[Dict],
+        workers: Optional[int] = None,
+        **model_args,
+) -> pd.DataFrame:
+    # Solve each scenario with its own model in a pool of `workers` processes (one per core
+    # by default). model_args are the base arguments of optimize_planning, by name.
+    # Returns one row of overrides and KPIs per scenario.
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = pool.map(
+            solve_scenario,
+            itertools.repeat(optimize_planning),
+            itertools.repeat(model_args),
+            scenarios,
+        )
+        return pd.DataFrame(list(results))
+
+
+def objective_coefficients(
+        model: gurobipy.Model,
+        wc_cost_reg: Dict[str, float],
+        wc_cost_ot: Dict[str, float],
+        wc_cost_we: Dict[str, float],
+        inventory_carrying_cost: float,
+        delay_cost: float,
+        bucket_days: Optional[Dict[str, int]] = None,
+) -> List[float]:
+    # Objective of a lean model (costs expressed in the objective) for other costs, the
+    # early/late production being paid for every day of its bucket on a bucketed calendar
+    # Only the names of the costed variables are parsed, the dates are parsed once each
+    names = pd.Series(model.VarName)
+    variable = names.str.partition("[")[0]
+    costed = variable.isin(
+        ["Regular hours", "Overtime hours", "Total hours", "early prod", "late prod"]
+    ).to_numpy()
+    df = split_names(pd.DataFrame(index=names[costed], data={"Solution": 0.0}))
+    dates = df["Date"].unique()
+    weekday = pd.to_datetime(dates, format="%Y/%m/%d", errors="coerce").weekday < 5
+    weekday = df["Date"].map(pd.Series(weekday, index=dates))
+    held = df["Date"].map(bucket_days or {}).fillna(1).to_numpy()
+    values = pd.Series(0.0, index=df.index)
+    for name, costs, days in (
+            ("Regular hours", wc_cost_reg, weekday),
+            ("Overtime hours", wc_cost_ot, weekday),
+            ("Total hours", wc_cost_we, ~weekday),
+    ):
+        rows = (df["Variable"] == name) & days
+        values[rows.to_numpy()] = df.loc[rows, "Key"].map(costs).to_numpy()
+    early = (df["Variable"] == "early prod").to_numpy()
+    late = (df["Variable"] == "late prod").to_numpy()
+    values[early] = inventory_carrying_cost * held[early]
+    values[late] = delay_cost * held[late]
+    coefficients = np.zeros(len(names))
+    coefficients[costed] = values.to_numpy()
+    return coefficients.tolist()
+
+
+def run_multiscenario(
+        build_model: Callable[..., gurobipy.Model],
+        scenarios: List[Dict],
+        **model_args,
+) -> pd.DataFrame:
+    # Solve all the scenarios as one Gurobi multi-scenario model. The lean model puts the costs
+    # in the objective, so the scenarios only change objective coefficients and can only
+    # override the cost arguments.
+    for scenario in scenarios:
+        for key in scenario:
+            if (key[: -len("_factor")] if key.endswith("_factor") else key) not in COST_ARGS:
+                raise ValueError("A multi-scenario model can only change the costs: " + key)
+
+    start = time.perf_counter()
+    model = build_model(**model_args, lean=True)
+    model.update()
+    variables = model.getVars()
+    model.NumScenarios = len(scenarios)
+    for number, scenario in enumerate(scenarios):
+        args = scenario_args(model_args, scenario)
+        model.Params.ScenarioNumber = number
+        model.setAttr(
+            "ScenNObj",
+            variables,
+            objective_coefficients(
+                model,
+                *(args[name] for name in COST_ARGS),
+                bucket_days=model_args.get("bucket_days"),
+            ),
+        )
+    model.optimize()
+    wall_time = time.perf_counter() - start
+    if not model.SolCount:
+        raise RuntimeError("Gurobi found no feasible solution, status " + str(model.Status))
+
+    results = []
+    for number, scenario in enumerate(scenarios):
+        args = scenario_args(model_args, scenario)
+        model.Params.ScenarioNumber = number
+        solution = pd.DataFrame(data={"Solution": model.ScenNX}, index=model.VarName)
+        results.append(
+            {
+                **scenario,
+                **plan_kpis(
+                    solution,
+                    *(args[name] for name in COST_ARGS),
+                    bucket_days=model_args.get("bucket_days"),
+                ),
+                # One solve for all the scenarios
+                "Wall time (s)": round(wall_time, 3),
+            }
+        )
+    return pd.DataFrame(results)
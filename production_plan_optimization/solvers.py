@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Solver backends for the models built with gurobipy
+"""
+
+# Import required packages
+import math
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import gurobipy
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class MatrixModel(NamedTuple):
+    names: list
+    objective: np.ndarray
+    objective_constant: float
+    maximize: bool
+    lb: np.ndarray
+    ub: np.ndarray
+    integer: np.ndarray
+    matrix: sp.csr_matrix
+    row_lb: np.ndarray
+    row_ub: np.ndarray
+
+
+class Result(NamedTuple):
+    solution: pd.DataFrame
+    objective: float
+    # Time to pass the model to the solver, and time spent by the solver
+    load_time: float
+    solve_time: float
+    # False for a solution found without proving its optimality (time limit)
+    optimal: bool = True
+
+
+def export_model(model: gurobipy.Model) -> MatrixModel:
+    # Read the linear model back from gurobipy as bounds and a sparse constraint matrix
+    model.update()
+    if model.NumQConstrs or model.NumGenConstrs or model.NumSOS or model.IsQP:
+        raise ValueError(
+            "Only linear models can be solved outside Gurobi, "
+            'use opening_formulation="linear"'
+        )
+    variables = model.getVars()
+    constraints = model.getConstrs()
+    rhs = np.array(model.getAttr("RHS", constraints), dtype=float)
+    sense = np.array(model.getAttr("Sense", constraints))
+    # Gurobi stores infinite bounds as +/-1e100
+    lb = np.array(model.getAttr("LB", variables), dtype=float)
+    ub = np.array(model.getAttr("UB", variables), dtype=float)
+    lb[lb <= -gurobipy.GRB.INFINITY] = -np.inf
+    ub[ub >= gurobipy.GRB.INFINITY] = np.inf
+    return MatrixModel(
+        names=model.getAttr("VarName", variables),
+        objective=np.array(model.getAttr("Obj", variables), dtype=float),
+        objective_constant=model.ObjCon,
+        maximize=model.ModelSense == gurobipy.GRB.MAXIMIZE,
+        lb=lb,
+        ub=ub,
+        integer=np.isin(
+            model.getAttr("VType", variables), [gurobipy.GRB.BINARY, gurobipy.GRB.INTEGER]
+        ),
+        matrix=model.getA().tocsr() if constraints else sp.csr_matrix((0, len(variables))),
+        row_lb=np.where(sense == gurobipy.GRB.LESS_EQUAL, -np.inf, rhs),
+        row_ub=np.where(sense == gurobipy.GRB.GREATER_EQUAL, np.inf, rhs),
+    )
+
+
+def solve_gurobi(
+        model: gurobipy.Model,
+        time_limit: Optional[float],
+        mip_gap: Optional[float],
+        start: Dict[int, float],
+) -> Tuple[list, float, float, bool]:
+    if start:
+        variables = model.getVars()
+        model.setAttr("Start", [variables[j] for j in start], list(start.values()))
+    if time_limit is not None:
+        model.Params.TimeLimit = time_limit
+    if mip_gap is not None:
+        model.Params.MIPGap = mip_gap
+    begin = time.perf_counter()
+    model.optimize()
+    solve_time = time.perf_counter() - begin
+    if not model.SolCount:
+        raise RuntimeError("Gurobi found no feasible solution, status " + str(model.Status))
+    return model.X, model.ObjVal, solve_time, model.Status == gurobipy.GRB.OPTIMAL
+
+
+def solve_highs(
+        lp: MatrixModel,
+        time_limit: Optional[float],
+        mip_gap: Optional[float],
+        start: Dict[int, float],
+) -> Tuple[list, float, float, bool]:
+    import highspy
+
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", False)
+    if time_limit is not None:
+        highs.setOptionValue("time_limit", float(time_limit))
+    if mip_gap is not None:
+        highs.setOptionValue("mip_rel_gap", float(mip_gap))
+
+    model = highspy.HighsLp()
+    model.num_col_ = len(lp.names)
+    model.num_row_ = lp.matrix.shape[0]
+    model.col_cost_ = lp.objective
+    model.offset_ = lp.objective_constant
+    model.col_lower_ = lp.lb
+    model.col_upper_ = lp.ub
+    model.row_lower_ = lp.row_lb
+    model.row_upper_ = lp.row_ub
+    matrix = lp.matrix.tocsc()
+    model.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    model.a_matrix_.start_ = matrix.indptr
+    model.a_matrix_.index_ = matrix.indices
+    model.a_matrix_.value_ = matrix.data
+    model.integrality_ = [
+        highspy.HighsVarType.kInteger if integer else highspy.HighsVarType.kContinuous
+        for integer in lp.integer
+    ]
+    if lp.maximize:
+        model.sense_ = highspy.ObjSense.kMaximize
+    highs.passModel(model)
+    if start:
+        highs.setSolution(
+            len(start),
+            np.array(list(start.keys()), dtype=np.int32),
+            np.array(list(start.values()), dtype=float),
+        )
+
+    begin = time.perf_counter()
+    highs.run()
+    solve_time = time.perf_counter() - begin
+    if highs.getInfo().primal_solution_status != highspy.SolutionStatus.kSolutionStatusFeasible:
+        raise RuntimeError(
+            "HiGHS found no feasible solution: "
+            + highs.modelStatusToString(highs.getModelStatus())
+        )
+    return (
+        list(highs.getSolution().col_value),
+        highs.getInfo().objective_function_value,
+        solve_time,
+        highs.getModelStatus() == highspy.HighsModelStatus.kOptimal,
+    )
+
+
+def solve_cbc(
+        lp: MatrixModel,
+        time_limit: Optional[float],
+        mip_gap: Optional[float],
+        start: Dict[int, float],
+) -> Tuple[list, float, float, bool]:
+    import pulp
+
+    problem = pulp.LpProblem(
+        "Optimize_production_planning", pulp.LpMaximize if lp.maximize else pulp.LpMinimize
+    )
+    # Columns are named by position, the model names are not valid CBC names
+    variables = [
+        pulp.LpVariable(
+            "x" + str(j),
+            lowBound=None if math.isinf(lb) else lb,
+            upBound=None if math.isinf(ub) else ub,
+            cat=pulp.LpInteger if integer else pulp.LpContinuous,
+        )
+        for j, (lb, ub, integer) in enumerate(zip(lp.lb, lp.ub, lp.integer))
+    ]
+    problem += pulp.LpAffineExpression(
+        [(variables[j], lp.objective[j]) for j in np.flatnonzero(lp.objective)],
+        constant=lp.objective_constant,
+    )
+    for i, (row_lb, row_ub) in enumerate(zip(lp.row_lb, lp.row_ub)):
+        first, last = lp.matrix.indptr[i], lp.matrix.indptr[i + 1]
+        expression = pulp.LpAffineExpression(
+            zip(
+                [variables[j] for j in lp.matrix.indices[first:last]],
+                lp.matrix.data[first:last],
+            )
+        )
+        if row_lb == row_ub:
+            problem += expression == row_lb, "r" + str(i)
+        else:
+            if not math.isinf(row_lb):
+                problem += expression >= row_lb, "r" + str(i) + "_lb"
+            if not math.isinf(row_ub):
+                problem += expression <= row_ub, "r" + str(i) + "_ub"
+
+    for j, value in start.items():
+        variables[j].setInitialValue(value)
+
+    begin = time.perf_counter()
+    problem.solve(
+        pulp.PULP_CBC_CMD(
+            msg=False, timeLimit=time_limit, gapRel=mip_gap, warmStart=bool(start)
+        )
+    )
+    solve_time = time.perf_counter() - begin
+    if problem.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        raise RuntimeError("CBC found no feasible solution: " + pulp.LpStatus[problem.status])
+    return (
+        [variable.varValue for variable in variables],
+        pulp.value(problem.objective),
+        solve_time,
+        problem.sol_status == pulp.LpSolutionOptimal,
+    )
+
+
+def solve_ortools(
+        lp: MatrixModel,
+        time_limit: Optional[float],
+        mip_gap: Optional[float],
+        start: Dict[int, float],
+) -> Tuple[list, float, float, bool]:
+    from ortools.linear_solver import pywraplp
+
+    solver = pywraplp.Solver.CreateSolver("SCIP")
+    infinity = solver.infinity()
+    variables = [
+        solver.Var(
+            -infinity if math.isinf(lb) else lb,
+            infinity if math.isinf(ub) else ub,
+            bool(integer),
+            "x" + str(j),
+        )
+        for j, (lb, ub, integer) in enumerate(zip(lp.lb, lp.ub, lp.integer))
+    ]
+    for i, (row_lb, row_ub) in enumerate(zip(lp.row_lb, lp.row_ub)):
+        row = solver.Constraint(
+            -infinity if math.isinf(row_lb) else row_lb,
+            infinity if math.isinf(row_ub) else row_ub,
+        )
+        first, last = lp.matrix.indptr[i], lp.matrix.indptr[i + 1]
+        for j, coef in zip(lp.matrix.indices[first:last], lp.matrix.data[first:last]):
+            row.SetCoefficient(variables[j], coef)
+    objective = solver.Objective()
+    for j in np.flatnonzero(lp.objective):
+        objective.SetCoefficient(variables[j], lp.objective[j])
+    objective.SetOffset(lp.objective_constant)
+    if lp.maximize:
+        objective.SetMaximization()
+    else:
+        objective.SetMinimization()
+
+    if start:
+        solver.SetHint([variables[j] for j in start], list(start.values()))
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit * 1000))
+    parameters = pywraplp.MPSolverParameters()
+    if mip_gap is not None:
+        parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, mip_gap)
+    begin = time.perf_counter()
+    status = solver.Solve(parameters)
+    solve_time = time.perf_counter() - begin
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        raise RuntimeError("OR-Tools found no feasible solution, status " + str(status))
+    return (
+        [variable.solution_value() for variable in variables],
+        objective.Value(),
+        solve_time,
+        status == pywraplp.Solver.OPTIMAL,
+    )
+
+
+SOLVERS: Dict[str, Callable] = {
+    "highs": solve_highs,
+    "cbc": solve_cbc,
+    "ortools": solve_ortools,
+}
+
+
+def solve(
+        model: gurobipy.Model,
+        solver: str = "gurobi",
+        time_limit: Optional[float] = None,
+        mip_gap: Optional[float] = None,
+        start: Optional[Dict[str, float]] = None,
+) -> Result:
+    # Solve a model built with gurobipy and return its solution indexed by variable name.
+    # Other solvers get the model as a sparse matrix, so they need no Gurobi license to solve.
+    # start gives the values of a MIP start by variable name, names not in the model are ignored
+    if solver != "gurobi" and solver not in SOLVERS:
+        raise ValueError("Unknown solver: " + solver)
+
+    begin = time.perf_counter()
+    if solver == "gurobi":
+        model.update()
+        names = model.VarName
+    else:
+        lp = export_model(model)
+        names = lp.names
+    column = {name: j for j, name in enumerate(names)} if start else {}
+    start = {column[name]: value for name, value in (start or {}).items() if name in column}
+    if solver == "gurobi":
+        values, objective, solve_time, optimal = solve_gurobi(model, time_limit, mip_gap, start)
+    else:
+        values, objective, solve_time, optimal = SOLVERS[solver](lp, time_limit, mip_gap, start)
+    load_time = time.perf_counter() - begin - solve_time
+
+    return Result(
+        pd.DataFrame(data={"Solution": values}, index=names),
+        objective,
+        load_time,
+        solve_time,
+        optimal,
+    )
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Symmetry breaking between interchangeable production lines of Model4/Model5
+"""
+
+# Import required packages
+from typing import Dict, List
+
+import gurobipy
+
+# Constraints added by each symmetry breaking mode: opening order only, or opening order and
+# lexicographic load
+SYMMETRY_BREAKING = {
+    "opening": [("Open status", "opening order")],
+    "load": [("Open status", "opening order"), ("Total hours", "load order")],
+}
+
+
+def identical_lines(
+        workcenters: List[str],
+        customer_orders: List[str],
+        cycle_times,
+        *line_costs: Dict[str, float],
+) -> List[List[str]]:
+    # Groups of at least two lines with the same hourly costs and the same cycle time for every
+    # order: swapping their plans on a day gives another solution of the same cost
+    groups = {}
+    for wc in workcenters:
+        key = tuple(costs[wc] for costs in line_costs) + tuple(
+            cycle_times[(mo, wc)] for mo in customer_orders
+        )
+        groups.setdefault(key, []).append(wc)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def add_symmetry_breaking(
+        model: gurobipy.Model, timeline: List[str], groups: List[List[str]], mode: str = "opening"
+) -> None:
+    # Order the lines of each group on every day: a line is opened before the next one of its
+    # group (opening order) and, in "load" mode, works at least as many hours (lexicographic load)
+    if mode not in SYMMETRY_BREAKING:
+        raise ValueError("Unknown symmetry breaking: " + mode)
+    model.update()
+    variables = dict(zip(model.VarName, model.getVars()))
+    pairs = [(first, second) for group in groups for first, second in zip(group, group[1:])]
+    for name, label in SYMMETRY_BREAKING[mode]:
+        model.addConstrs(
+            (
+                variables[name + "[" + date + "," + first + "]"]
+                >= variables[name + "[" + date + "," + second + "]"]
+                for date in timeline
+                for first, second in pairs
+            ),
+            name=label,
+        )
+
+
+def break_line_symmetry(
+        model: gurobipy.Model,
+        mode: str,
+        timeline: List[str],
+        workcenters: List[str],
+        customer_orders: List[str],
+        cycle_times,
+        *line_costs: Dict[str, float],
+) -> List[List[str]]:
+    # Detect the interchangeable lines and order them in the model, returns their groups
+    groups = identical_lines(workcenters, customer_orders, cycle_times, *line_costs)
+    if groups:
+        add_symmetry_breaking(model, timeline, groups, mode)
+    return groups
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Validation of the order book and constraint workbook of Model4/Model5, reporting every problem
+found instead of stopping at the first one
+"""
+
+# Import required packages
+from typing import List, Optional
+
+import pandas as pd
+
+# Columns of the order book
+ORDER_COLUMNS = ["Order", "Product_Family", "Quantity", "Delivery_Date"]
+
+# Columns of the validation report: one row per problem, Row being the index of the faulty row
+# of the sheet (the position of an order, the family of a capacity), None for a whole column
+REPORT_COLUMNS = ["Check", "Sheet", "Row", "Value"]
+
+
+class InvalidInputs(ValueError):
+    # Inputs failing the validation, with the report of all their problems
+    def __init__(self, report: pd.DataFrame, examples: int = 5):
+        self.report = report
+        message = ["Invalid inputs, please check the requirements file:"]
+        for (check, sheet), problems in report.groupby(["Check", "Sheet"], sort=False):
+            values = problems["Value"].astype(str).head(examples).to_list()
+            message.append(
+                "- "
+                + check
+                + " in "
+                + sheet
+                + ": "
+                + str(len(problems))
+                + " ("
+                + ", ".join(values + (["..."] if len(problems) > examples else []))
+                + ")"
+            )
+        super().__init__("\n".join(message))
+
+
+def problems(check: str, sheet: str, rows, values) -> pd.DataFrame:
+    # Report rows of one check
+    rows = list(rows)
+    return pd.DataFrame(
+        {"Check": [check] * len(rows), "Sheet": [sheet] * len(rows), "Row": rows, "Value": list(values)},
+        columns=REPORT_COLUMNS,
+    )
+
+
+def report(*checks: pd.DataFrame) -> pd.DataFrame:
+    # Report of several checks, with a clean index
+    checks = [check for check in checks if not check.empty]
+    if not checks:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(checks, ignore_index=True)
+
+
+def validate_orders(
+        customer_orders: pd.DataFrame, families: pd.Index, sheet: str = "Customer_orders"
+) -> pd.DataFrame:
+    # Missing columns, missing or duplicate orders, unknown product families, missing or negative
+    # quantities and unparseable delivery dates, each checked over the whole frame at once
+    missing = [column for column in ORDER_COLUMNS if column not in customer_orders.columns]
+    checks = [problems("Missing column", sheet, [None] * len(missing), missing)]
+    if "Order" in customer_orders.columns:
+        orders = customer_orders["Order"]
+        absent = orders.isna()
+        duplicate = orders.duplicated(keep=False) & ~absent
+        checks.append(problems("Missing order", sheet, orders.index[absent], orders[absent]))
+        checks.append(problems("Duplicate order", sheet, orders.index[duplicate], orders[duplicate]))
+    if "Product_Family" in customer_orders.columns:
+        family = customer_orders["Product_Family"]
+        unknown = ~family.isin(families)
+        checks.append(
+            problems("Unknown product family", sheet, family.index[unknown], family[unknown])
+        )
+    if "Quantity" in customer_orders.columns:
+        quantity = customer_orders["Quantity"]
+        invalid = ~(pd.to_numeric(quantity, errors="coerce") >= 0)
+        checks.append(problems("Invalid quantity", sheet, quantity.index[invalid], quantity[invalid]))
+    if "Delivery_Date" in customer_orders.columns:
+        date = customer_orders["Delivery_Date"]
+        invalid = pd.to_datetime(date, errors="coerce").isna()
+        checks.append(
+            problems("Invalid delivery date", sheet, date.index[invalid], date[invalid])
+        )
+    return report(*checks)
+
+
+def validate_capacity(
+        capacity: pd.DataFrame, workcenters: List[str], sheet: str = "8h capacity"
+) -> pd.DataFrame:
+    # Lines missing from the capacity sheet, duplicate families, and negative or non-numeric
+    # capacities. A 0 or blank capacity is no capacity: the family is not produced on that
+    # line (infinite cycle time).
+    missing = [wc for wc in workcenters if wc not in capacity.columns]
+    duplicate = capacity.index.duplicated(keep=False)
+    present = [wc for wc in workcenters if wc in capacity.columns]
+    values = capacity[present].apply(pd.to_numeric, errors="coerce")
+    invalid = (values < 0) | (values.isna() & capacity[present].notna())
+    invalid = invalid.stack()
+    invalid = invalid[invalid]
+    return report(
+        problems("Missing line", sheet, [None] * len(missing), missing),
+        problems("Duplicate product family", sheet, capacity.index[duplicate], capacity.index[duplicate]),
+        problems(
+            "Invalid capacity",
+            sheet,
+            invalid.index.get_level_values(0),
+            invalid.index.get_level_values(1),
+        ),
+    )
+
+
+def validate_families(
+        families, capacity: pd.DataFrame, workcenters: List[str], sheet: str = "8h capacity"
+) -> pd.DataFrame:
+    # Product families of the order book without a positive capacity on any line. The families
+    # nobody orders are not checked, and the unknown ones are reported with the orders.
+    present = [wc for wc in workcenters if wc in capacity.columns]
+    values = capacity[present].apply(pd.to_numeric, errors="coerce")
+    produced = capacity.index[(values > 0).any(axis=1).to_numpy()]
+    ordered = pd.Index(families).dropna().unique()
+    no_capacity = ordered[ordered.isin(capacity.index) & ~ordered.isin(produced)]
+    return problems("No capacity", sheet, no_capacity, no_capacity)
+
+
+def validate_changeover(
+        changeover_matrix: pd.DataFrame, families: pd.Index, sheet: str = "Changeover (min)"
+) -> pd.DataFrame:
+    # Changeover matrix not square (a family in the rows but not in the columns, or the
+    # reverse), families of the capacity sheet missing from it, and missing or negative times
+    rows = changeover_matrix.index
+    columns = changeover_matrix.columns
+    missing_column = rows[~rows.isin(columns)]
+    missing_row = columns[~columns.isin(rows)]
+    missing_family = families[~families.isin(rows)]
+    invalid = ~(changeover_matrix.apply(pd.to_numeric, errors="coerce") >= 0)
+    invalid = invalid.stack()
+    invalid = invalid[invalid]
+    return report(
+        problems("Missing changeover column", sheet, missing_column, missing_column),
+        problems("Missing changeover row", sheet, [None] * len(missing_row), missing_row),
+        problems("Missing product family", sheet, [None] * len(missing_family), missing_family),
+        problems(
+            "Invalid changeover",
+            sheet,
+            invalid.index.get_level_values(0),
+            invalid.index.get_level_values(1),
+        ),
+    )
+
+
+def validate_inputs(
+        customer_orders: Optional[pd.DataFrame],
+        capacity: pd.DataFrame,
+        workcenters: List[str],
+        changeover_matrix: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    # Report of all the problems of the inputs, empty if they are valid. The orders are not
+    # checked if None (streamed order exports are checked chunk by chunk).
+    checks = [validate_capacity(capacity, workcenters)]
+    if customer_orders is not None:
+        checks.append(validate_orders(customer_orders, capacity.index))
+        if "Product_Family" in customer_orders.columns:
+            checks.append(
+                validate_families(customer_orders["Product_Family"], capacity, workcenters)
+            )
+    if changeover_matrix is not None:
+        checks.append(validate_changeover(changeover_matrix, capacity.index))
+    return report(*checks)
+
+
+def check_inputs(
+        customer_orders: Optional[pd.DataFrame],
+        capacity: pd.DataFrame,
+        workcenters: List[str],
+        changeover_matrix: Optional[pd.DataFrame] = None,
+) -> None:
+    # Raise InvalidInputs with the report of all the problems, before any model is built
+    problems_found = validate_inputs(customer_orders, capacity, workcenters, changeover_matrix)
+    if not problems_found.empty:
+        raise InvalidInputs(problems_found)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Product families and time buckets of Model4: the aggregated plans cost what their models
+optimize, and they match the order plan when every order is its own family or every bucket is a
+day
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.aggregation import optimize_families
+from production_plan_optimization.buckets import (
+    bucket_calendar,
+    bucket_days,
+    bucket_needs,
+    optimize_buckets,
+)
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.rolling import plan_cost
+from production_plan_optimization.solvers import solve
+import Model4
+
+COSTS = (
+    Model4.reg_costs_per_line,
+    Model4.ot_costs_per_line,
+    Model4.we_costs_per_line,
+    Model4.storage_cost,
+    Model4.late_prod_cost,
+)
+
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.instance = generate_instance(6, 10, list(Model4.reg_costs_per_line), n_families=3)
+        self.model_args = dict(
+            workcenters=self.instance.workcenters,
+            wc_cost_reg=Model4.reg_costs_per_line,
+            wc_cost_ot=Model4.ot_costs_per_line,
+            wc_cost_we=Model4.we_costs_per_line,
+            inventory_carrying_cost=Model4.storage_cost,
+            cycle_times=self.instance.cycle_times,
+            delay_cost=Model4.late_prod_cost,
+        )
+        self.cost = plan_cost(
+            Model4.optimize_planning(
+                timeline=self.instance.timeline,
+                needs=self.instance.needs,
+                customer_orders=self.instance.customer_orders,
+                **self.model_args,
+            ),
+            *COSTS,
+        )
+
+    def families(self, order_family):
+        return optimize_families(
+            Model4.optimize_planning,
+            timeline=self.instance.timeline,
+            needs=self.instance.needs,
+            customer_orders=self.instance.customer_orders,
+            order_family=order_family,
+            **self.model_args,
+        )
+
+    def buckets(self, **calendar):
+        return optimize_buckets(
+            Model4.optimize_planning,
+            self.instance.timeline,
+            self.instance.needs,
+            self.instance.customer_orders,
+            **calendar,
+            **self.model_args,
+        )
+
+    def test_one_family_per_order(self):
+        planning = self.families({mo: mo for mo in self.instance.customer_orders})
+        self.assertAlmostEqual(plan_cost(planning, *COSTS), self.cost, delta=1e-6 * self.cost)
+
+    def test_families(self):
+        # The split family plan is an order plan, it costs at least the order optimum
+        orders = self.instance.orders
+        order_family = dict(zip(orders["Order"], orders["Product_Family"]))
+        planning = self.families(order_family)
+        self.assertGreaterEqual(plan_cost(planning, *COSTS), self.cost - 1e-6 * self.cost)
+        self.assertEqual(
+            sorted(set(planning.filter(like="plannedQty", axis=0).index.str.split(",").str[1])),
+            sorted(self.instance.customer_orders),
+        )
+
+    def test_daily_buckets(self):
+        planning = self.buckets(daily_days=len(self.instance.timeline))
+        self.assertAlmostEqual(plan_cost(planning, *COSTS), self.cost, delta=1e-6 * self.cost)
+
+    def test_bucket_cost(self):
+        # plan_cost holds the early/late production of a bucket for each of its days, like the
+        # model
+        buckets = bucket_calendar(self.instance.timeline, daily_days=2, monthly_after=None)
+        model = Model4.build_model(
+            timeline=list(buckets),
+            needs=bucket_needs(buckets, self.instance.needs, self.instance.customer_orders),
+            customer_orders=self.instance.customer_orders,
+            bucket_days=bucket_days(buckets),
+            **self.model_args,
+        )
+        objective = solve(model, "gurobi", mip_gap=0).objective
+        planning = self.buckets(daily_days=2, monthly_after=None)
+        self.assertAlmostEqual(
+            plan_cost(planning, *COSTS, bucket_days(buckets)), objective, delta=1e-6 * objective
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Keys of the solution and model caches: the same requirements, sparse or dense, share a key, and
+the model version covers the modules of the package
+"""
+
+# Import required packages
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.cache import (
+    PACKAGE_SOURCES,
+    SolutionCache,
+    input_key,
+    source_version,
+)
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.solvers import solve
+import Model4
+
+
+class InputKeyTest(unittest.TestCase):
+    def test_sparse_and_dense_needs_share_a_key(self):
+        dense = {("d1", "o1"): 5, ("d2", "o1"): 0, ("d1", "o2"): 0, ("d2", "o2"): 3.0}
+        sparse = {("d2", "o2"): 3, ("d1", "o1"): 5.0}
+        self.assertEqual(
+            input_key(needs=dense, initial_gap={"o1": 0}),
+            input_key(needs=sparse, initial_gap={}),
+        )
+        self.assertNotEqual(input_key(needs=dense), input_key(needs={("d1", "o1"): 5}))
+
+
+class SourceVersionTest(unittest.TestCase):
+    def test_version_covers_the_package(self):
+        self.assertIn("matrix.py", [os.path.basename(path) for path in PACKAGE_SOURCES])
+        with tempfile.TemporaryDirectory() as directory:
+            script = os.path.join(directory, "model.py")
+            module = os.path.join(directory, "module.py")
+            for path in (script, module):
+                with open(path, "w") as file:
+                    file.write("x = 1\n")
+            version = source_version(script, module)
+            with open(module, "w") as file:
+                file.write("x = 2\n")
+            self.assertNotEqual(source_version(script, module), version)
+
+
+class SolutionCacheTest(unittest.TestCase):
+    def setUp(self):
+        instance = generate_instance(6, 5, list(Model4.reg_costs_per_line))
+        self.args = (
+            instance.timeline,
+            instance.workcenters,
+            instance.needs,
+            Model4.reg_costs_per_line,
+            Model4.ot_costs_per_line,
+            Model4.we_costs_per_line,
+            Model4.storage_cost,
+            instance.customer_orders,
+            instance.cycle_times,
+            Model4.late_prod_cost,
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SolutionCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_solver_and_start_are_not_in_the_key(self):
+        solution = Model4.optimize_planning(*self.args, solver="highs", cache=self.cache)
+        start_plan = {
+            tuple(name[len("plannedQty["):-1].split(",")): qty
+            for name, qty in solution.filter(like="plannedQty", axis=0)["Solution"].items()
+        }
+        Model4.optimize_planning(*self.args, solver="gurobi", cache=self.cache)
+        Model4.optimize_planning(*self.args, start_plan=start_plan, cache=self.cache)
+        self.assertEqual(self.cache.stats(), {"Hits": 2, "Misses": 1, "Entries": 1})
+
+    def test_non_optimal_solutions_are_not_stored(self):
+        def time_limited(*args, **kwargs):
+            return solve(*args, **kwargs)._replace(optimal=False)
+
+        with mock.patch.object(Model4, "solve", time_limited):
+            Model4.optimize_planning(*self.args, time_limit=60, cache=self.cache)
+        self.assertEqual(self.cache.stats()["Entries"], 0)
+        Model4.optimize_planning(*self.args, cache=self.cache)
+        self.assertEqual(self.cache.stats()["Entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Changeover matrix of Model5 against the former dict changeover[(change_from, change_to)] read
+cell by cell from the "Changeover (min)" sheet
+"""
+
+# Import required packages
+import itertools
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from production_plan_optimization.changeover import ChangeoverMatrix
+
+CONSTRAINTS = os.path.join(
+    os.path.dirname(__file__), "..", "Planning_optimization_part4", "Constraints.xlsx"
+)
+
+
+class TestChangeoverMatrix(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        families = ["Model_" + str(k + 1) for k in range(6)]
+        self.frames = [
+            pd.read_excel(CONSTRAINTS, sheet_name="Changeover (min)").set_index("Model"),
+            # Columns in another order than the rows
+            pd.DataFrame(
+                rng.integers(5, 60, size=(6, 6)), index=families, columns=families
+            ).iloc[:, ::-1],
+        ]
+
+    def changeover_dict(self, changeover_matrix):
+        return {
+            (change_from, change_to): changeover_matrix[change_to][change_from]
+            for change_from in changeover_matrix.index
+            for change_to in changeover_matrix.index
+        }
+
+    def test_mapping(self):
+        for frame in self.frames:
+            changeover = self.changeover_dict(frame)
+            matrix = ChangeoverMatrix.from_frame(frame)
+            self.assertEqual(dict(matrix), changeover)
+            with self.assertRaises(KeyError):
+                matrix[(frame.index[0], "Unknown")]
+
+    def test_setup_times(self):
+        rng = np.random.default_rng(1)
+        for frame in self.frames:
+            changeover = self.changeover_dict(frame)
+            matrix = ChangeoverMatrix.from_frame(frame)
+            families = list(frame.index)
+            sequences = rng.integers(len(families), size=(20, 8))
+            setups = matrix.setup_times(sequences)
+            for sequence, setup in zip(sequences, setups):
+                labels = [families[code] for code in sequence]
+                expected = [0.0] + [
+                    changeover[(change_from, change_to)]
+                    for change_from, change_to in zip(labels, labels[1:])
+                ]
+                self.assertEqual(setup.tolist(), expected)
+            self.assertEqual(matrix.sequence_time(sequences).tolist(), setups.sum(axis=1).tolist())
+
+    def test_minimum_changeovers(self):
+        for frame in self.frames:
+            changeover = self.changeover_dict(frame)
+            matrix = ChangeoverMatrix.from_frame(frame)
+            families = list(frame.index)
+            self.assertEqual(
+                matrix.min_incoming().tolist(),
+                [
+                    min(changeover[(other, family)] for other in families if other != family)
+                    for family in families
+                ],
+            )
+            self.assertEqual(
+                matrix.min_outgoing().tolist(),
+                [
+                    min(changeover[(family, other)] for other in families if other != family)
+                    for family in families
+                ],
+            )
+
+    def test_lower_bound(self):
+        # At most the shortest sequence of the families present, over all their orders
+        for frame in self.frames:
+            matrix = ChangeoverMatrix.from_frame(frame)
+            n_families = len(frame.index)
+            subsets = [
+                subset
+                for size in range(1, min(n_families, 5) + 1)
+                for subset in itertools.combinations(range(n_families), size)
+            ]
+            present = np.zeros((len(subsets), n_families), dtype=bool)
+            for row, subset in enumerate(subsets):
+                present[row, list(subset)] = True
+            bounds = matrix.lower_bound(present)
+            self.assertEqual(matrix.lower_bound(np.zeros(n_families, dtype=bool)), 0.0)
+            for subset, bound in zip(subsets, bounds):
+                shortest = min(
+                    matrix.sequence_time(np.array(order, dtype=int))
+                    for order in itertools.permutations(subset)
+                )
+                self.assertLessEqual(bound, shortest + 1e-9, msg=str(subset))
+                if len(subset) == 2:
+                    change_from, change_to = subset
+                    self.assertEqual(
+                        bound,
+                        min(
+                            matrix.times[change_from, change_to],
+                            matrix.times[change_to, change_from],
+                        ),
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Solvers of the models without inventory between dates (Model1/Model2) and of Model3: the day by
+day solve, the dynamic programming allocation and the min-cost flow engine against the MIP
+"""
+
+# Import required packages
+import multiprocessing
+import os
+import random
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+for part in ["Planning_optimization_part1", "Planning_optimization_part2"]:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", part))
+
+from production_plan_optimization.allocation import solve_allocation
+from production_plan_optimization.solvers import solve
+import Model1
+import Model2
+import Model3
+
+
+def labor_cost(solution):
+    return solution.filter(like="Labor cost", axis=0)["Solution"].sum()
+
+
+class TestDaySolvers(unittest.TestCase):
+    def setUp(self):
+        self.models = [
+            (Model1, (Model1.calendar, Model1.lines, Model1.daily_requirements, Model1.reg_costs_per_line)),
+            (
+                Model2,
+                (
+                    Model2.calendar,
+                    Model2.lines,
+                    Model2.daily_requirements,
+                    Model2.reg_costs_per_line,
+                    Model2.ot_costs_per_line,
+                    Model2.we_costs_per_line,
+                ),
+            ),
+        ]
+
+    def test_day_by_day_solve(self):
+        for model, args in self.models:
+            full = model.optimize_planning(*args)
+            days = model.optimize_planning(*args, decompose=True, workers=1)
+            # Lines with the same costs can swap their hours, the costs are compared
+            self.assertAlmostEqual(labor_cost(days), labor_cost(full), places=6)
+            self.assertEqual(sorted(days.index), sorted(full.index))
+
+    def test_dynamic_programming(self):
+        for model, args in self.models:
+            full = model.optimize_planning(*args)
+            allocation = model.optimize_planning(*args, solver="dp")
+            self.assertAlmostEqual(labor_cost(allocation), labor_cost(full), places=6)
+
+    def test_dynamic_programming_days(self):
+        # Every requirement from 0 to 36 hours on a weekday and a weekend day, with random line
+        # costs, infeasible for the same requirements
+        rng = random.Random(0)
+        variables = ["Regular hours", "Overtime hours", "Open status", "Total hours", "Labor cost"]
+        for _ in range(3):
+            reg_costs = {wc: rng.randrange(150, 400, 5) for wc in Model2.lines}
+            costs = (
+                reg_costs,
+                {wc: cost * rng.uniform(0.8, 2) for wc, cost in reg_costs.items()},
+                {wc: cost * rng.uniform(1, 3) for wc, cost in reg_costs.items()},
+            )
+            for date in ["2020/07/13", "2020/07/18"]:
+                for need in range(37):
+                    model = Model2.build_model([date], Model2.lines, {date: need}, *costs)
+                    model.Params.OutputFlag = 0
+                    try:
+                        objective = solve(model).objective
+                    except RuntimeError:
+                        with self.assertRaises(RuntimeError):
+                            solve_allocation([date], Model2.lines, {date: need}, variables, *costs)
+                        continue
+                    allocation = solve_allocation(
+                        [date], Model2.lines, {date: need}, variables, *costs
+                    )
+                    self.assertAlmostEqual(
+                        allocation.objective, objective, delta=1e-6 * max(1, objective)
+                    )
+
+
+def flow_and_mip_costs():
+    args = (
+        Model3.calendar,
+        Model3.lines,
+        Model3.daily_requirements,
+        Model3.reg_costs_per_line,
+        Model3.ot_costs_per_line,
+        Model3.we_costs_per_line,
+        Model3.storage_cost,
+    )
+
+    def total_cost(solution):
+        inventory = solution.filter(like="early prod", axis=0)["Solution"].sum()
+        return labor_cost(solution) + inventory * Model3.storage_cost
+
+    return (
+        total_cost(Model3.optimize_planning(*args, solver="flow")),
+        total_cost(Model3.optimize_planning(*args)),
+    )
+
+
+class TestFlow(unittest.TestCase):
+    def test_flow_against_the_mip(self):
+        # In its own process, the HiGHS and OR-Tools libraries cannot be loaded together
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            flow, mip = pool.submit(flow_and_mip_costs).result()
+        self.assertAlmostEqual(flow, mip, delta=1e-6 * mip)
+
+if __name__ == "__main__":
+    unittest.main()
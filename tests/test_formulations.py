@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Formulations and builders of Model4/Model5 giving the same optimum: recursive and cumulative
+gap, linear and bilinear line opening, lean and full model, loops and matrix builders, and the
+production windows
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+for part in ["Planning_optimization_part3", "Planning_optimization_part4"]:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", part))
+
+from production_plan_optimization.changeover import ChangeoverMatrix
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.solvers import solve
+import Model4
+import Model5
+
+
+def model_args(model, instance):
+    # Arguments of build_model of Model4 or Model5 for a synthetic instance
+    args = dict(
+        timeline=instance.timeline,
+        workcenters=instance.workcenters,
+        needs=instance.needs,
+        wc_cost_reg=model.reg_costs_per_line,
+        wc_cost_ot=model.ot_costs_per_line,
+        wc_cost_we=model.we_costs_per_line,
+        inventory_carrying_cost=model.storage_cost,
+        customer_orders=instance.customer_orders,
+        cycle_times=instance.cycle_times,
+        delay_cost=model.late_prod_cost,
+    )
+    if model is Model5:
+        changeover_matrix = pd.read_excel(
+            os.path.join(os.path.dirname(model.__file__), "Constraints.xlsx"),
+            sheet_name="Changeover (min)",
+        ).set_index("Model")
+        args["changeover"] = ChangeoverMatrix.from_frame(changeover_matrix)
+    return args
+
+
+class TestFormulations(unittest.TestCase):
+    def setUp(self):
+        self.instances = [
+            (Model4, generate_instance(6, 5, list(Model4.reg_costs_per_line))),
+            # The sequence slots of Model5 double the production variables
+            (Model5, generate_instance(4, 4, list(Model5.reg_costs_per_line), utilization=0.6)),
+        ]
+
+    def assertSameOptimum(self, model, args, reference, **options):
+        solved = solve(model.build_model(**args, **options), "gurobi", mip_gap=0)
+        self.assertAlmostEqual(solved.objective, reference, delta=1e-6 * reference, msg=str(options))
+        return solved
+
+    def test_same_optimum(self):
+        for model, instance in self.instances:
+            args = model_args(model, instance)
+            reference = solve(model.build_model(**args), "gurobi", mip_gap=0).objective
+            for options in [
+                dict(gap_formulation="cumulative"),
+                dict(lean=True),
+                dict(lean=True, gap_formulation="cumulative"),
+                dict(builder="matrix"),
+                dict(builder="matrix", lean=True),
+                # Window over the whole timeline
+                dict(production_window=(len(instance.timeline), len(instance.timeline))),
+                dict(builder="matrix", production_window=(len(instance.timeline), len(instance.timeline))),
+            ]:
+                self.assertSameOptimum(model, args, reference, **options)
+
+    def test_bilinear_opening(self):
+        # The bilinear opening is nonconvex, solved on smaller instances to fit the size-limited
+        # license
+        for model, instance in [
+            (Model4, generate_instance(3, 3, list(Model4.reg_costs_per_line))),
+            (Model5, generate_instance(2, 2, list(Model5.reg_costs_per_line), utilization=0.6)),
+        ]:
+            args = model_args(model, instance)
+            reference = solve(model.build_model(**args), "gurobi", mip_gap=0).objective
+            self.assertSameOptimum(model, args, reference, opening_formulation="bilinear")
+
+    def test_windows(self):
+        # The loops and matrix builders restrict the same (date, order, line) to the window
+        for model, instance in self.instances:
+            args = model_args(model, instance)
+            loops = solve(model.build_model(**args, production_window=(2, 1)), "gurobi", mip_gap=0)
+            matrix = self.assertSameOptimum(
+                model, args, loops.objective, builder="matrix", production_window=(2, 1)
+            )
+            self.assertEqual(sorted(loops.solution.index), sorted(matrix.solution.index))
+
+    def test_lean_solution_rows(self):
+        # The lean solution has the rows of the full model once its auxiliaries are recovered
+        model, instance = self.instances[0]
+        args = model_args(model, instance)
+        optimize_args = {name: args[name] for name in args}
+        full = model.optimize_planning(**optimize_args)
+        for builder in ["loops", "matrix"]:
+            lean = model.optimize_planning(**optimize_args, lean=True, builder=builder)
+            self.assertEqual(sorted(lean.index), sorted(full.index))
+
+
+if __name__ == "__main__":
+    unittest.main()
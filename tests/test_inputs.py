@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Inputs of Model4: the order export streamed by chunks gives the inputs of the order book read at
+once, the input cache gives the frames of the workbooks and the model cache gives the objective
+of the built model
+"""
+
+# Import required packages
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.aggregation import aggregate_families
+from production_plan_optimization.cache import InputCache, ModelCache
+from production_plan_optimization.inputs import (
+    order_calendar,
+    order_cycle_times,
+    order_requirements,
+    stream_order_book,
+)
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.scenarios import objective_coefficients
+from production_plan_optimization.solvers import solve
+import Model4
+
+
+class TestInputs(unittest.TestCase):
+    def setUp(self):
+        self.instance = generate_instance(12, 10, list(Model4.reg_costs_per_line), n_families=4)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cycle_time(self):
+        # Cycle times of the product families, one column per line
+        family = dict(zip(self.instance.orders["Order"], self.instance.orders["Product_Family"]))
+        return pd.DataFrame(
+            {
+                wc: {family[mo]: self.instance.cycle_times[(mo, wc)] for mo in family}
+                for wc in self.instance.workcenters
+            }
+        )
+
+    def test_vectorized_inputs(self):
+        # Same inputs as a lookup row by row of the order book
+        customer_orders = self.instance.orders.merge(
+            self.cycle_time(), left_on="Product_Family", right_index=True
+        )
+        workcenters = self.instance.workcenters
+        rows = customer_orders.to_dict("records")
+        self.assertEqual(
+            order_cycle_times(customer_orders, workcenters),
+            {(row["Order"], wc): row[wc] for row in rows for wc in workcenters},
+        )
+        self.assertEqual(order_calendar(customer_orders), self.instance.timeline)
+        requirements = {}
+        for row in rows:
+            key = (row["Delivery_Date"], row["Order"])
+            requirements[key] = requirements.get(key, 0) + row["Quantity"]
+        self.assertEqual(dict(order_requirements(customer_orders)), requirements)
+
+    def test_streamed_order_book(self):
+        cycle_time = self.cycle_time()
+        customer_orders = self.instance.orders.merge(
+            cycle_time, left_on="Product_Family", right_index=True
+        )
+        workcenters = self.instance.workcenters
+        for extension in [".csv", ".parquet"]:
+            path = os.path.join(self.directory.name, "orders" + extension)
+            if extension == ".csv":
+                self.instance.orders.to_csv(path, index=False)
+            else:
+                self.instance.orders.to_parquet(path, index=False)
+            # Chunks smaller than the export
+            stream = stream_order_book(path, cycle_time, workcenters, chunksize=5)
+            self.assertEqual(stream.rows, len(self.instance.orders))
+            self.assertEqual(stream.timeline, order_calendar(customer_orders))
+            self.assertEqual(sorted(stream.customer_orders), sorted(self.instance.customer_orders))
+            self.assertEqual(stream.cycle_times, order_cycle_times(customer_orders, workcenters))
+            self.assertEqual(dict(stream.needs), dict(order_requirements(customer_orders)))
+
+            # Demand per product family
+            stream = stream_order_book(
+                path, cycle_time, workcenters, by="Product_Family", chunksize=5
+            )
+            families, family_needs, family_cycle_times = aggregate_families(
+                stream.timeline,
+                workcenters,
+                order_requirements(customer_orders),
+                self.instance.customer_orders,
+                self.instance.cycle_times,
+                dict(zip(self.instance.orders["Order"], self.instance.orders["Product_Family"])),
+            )
+            self.assertEqual(sorted(stream.customer_orders), sorted(families))
+            self.assertEqual(stream.cycle_times, family_cycle_times)
+            self.assertEqual(
+                dict(stream.needs), {key: qty for key, qty in family_needs.items() if qty}
+            )
+
+    def test_input_cache(self):
+        path = os.path.join(self.directory.name, "orders.xlsx")
+        self.instance.orders.to_excel(path, index=False)
+        cache = InputCache(os.path.join(self.directory.name, "cache"))
+        workbook = pd.read_excel(path)
+        self.assertTrue(cache.read_excel(path).equals(workbook))
+        self.assertTrue(cache.read_excel(path).equals(workbook))
+        # Touched, hashed again and still read from the cache
+        os.utime(path, ns=(0, 0))
+        self.assertTrue(cache.read_excel(path).equals(workbook))
+        self.assertEqual(cache.stats(), {"Hits": 2, "Misses": 1, "Entries": 1})
+
+        # Changed, parsed again
+        self.instance.orders.head(5).to_excel(path, index=False)
+        self.assertTrue(cache.read_excel(path).equals(pd.read_excel(path)))
+        self.assertEqual(cache.stats()["Misses"], 2)
+
+    def test_model_cache(self):
+        def build_lean(storage_cost):
+            return Model4.build_model(
+                self.instance.timeline,
+                self.instance.workcenters,
+                self.instance.needs,
+                Model4.reg_costs_per_line,
+                Model4.ot_costs_per_line,
+                Model4.we_costs_per_line,
+                storage_cost,
+                self.instance.customer_orders,
+                self.instance.cycle_times,
+                Model4.late_prod_cost,
+                lean=True,
+            )
+
+        cache = ModelCache(os.path.join(self.directory.name, "cache"))
+        cache.put("lean", build_lean(Model4.storage_cost))
+        cached = cache.get("lean")
+        self.assertIsNotNone(cached)
+        # Objective patched with another storage cost
+        cached.setAttr(
+            "Obj",
+            cached.getVars(),
+            objective_coefficients(
+                cached,
+                Model4.reg_costs_per_line,
+                Model4.ot_costs_per_line,
+                Model4.we_costs_per_line,
+                2 * Model4.storage_cost,
+                Model4.late_prod_cost,
+            ),
+        )
+        cached.update()
+        built = build_lean(2 * Model4.storage_cost)
+        built.update()
+        self.assertEqual(cached.VarName, built.VarName)
+        self.assertEqual(cached.getAttr("Obj", cached.getVars()), built.Obj)
+        objective = solve(built, "gurobi", mip_gap=0).objective
+        self.assertAlmostEqual(
+            solve(cached, "gurobi", mip_gap=0).objective, objective, delta=1e-6 * objective
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent Model4 planner: an order cancelled then added again is planned as by a rebuild
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.inputs import Requirements
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.solvers import solve
+from Model4 import (
+    build_model,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    storage_cost,
+    late_prod_cost,
+)
+from Planner import Planner
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.instance = generate_instance(6, 5, list(reg_costs_per_line))
+        self.planner = Planner(
+            self.instance.timeline,
+            self.instance.workcenters,
+            self.instance.needs,
+            reg_costs_per_line,
+            ot_costs_per_line,
+            we_costs_per_line,
+            storage_cost,
+            self.instance.customer_orders,
+            self.instance.cycle_times,
+            late_prod_cost,
+        )
+
+    def rebuilt_cost(self) -> float:
+        # Cost of the order book of the planner built and solved from scratch
+        planner = self.planner
+        model = build_model(
+            planner.timeline,
+            planner.workcenters,
+            Requirements({(planner.due_date[mo], mo): qty for mo, qty in planner.quantity.items()}),
+            planner.wc_cost_reg,
+            planner.wc_cost_ot,
+            planner.wc_cost_we,
+            storage_cost,
+            list(planner.quantity),
+            planner.cycle_times,
+            late_prod_cost,
+        )
+        return solve(model, "gurobi").objective
+
+    def planned_cost(self) -> float:
+        self.planner.optimize()
+        return self.planner.model.ObjVal
+
+    def assertSameCost(self):
+        # Same optimum, up to the relative MIP gap of the solver
+        planned, rebuilt = self.planned_cost(), self.rebuilt_cost()
+        self.assertLessEqual(abs(planned - rebuilt), 1e-4 * rebuilt)
+
+    def test_cancel_then_add_again(self):
+        order = self.instance.customer_orders[0]
+        cycle_times = {wc: self.instance.cycle_times[(order, wc)] for wc in self.instance.workcenters}
+
+        self.planner.cancel_order(order)
+        self.assertNotIn(order, self.planner.customer_orders)
+        self.assertSameCost()
+
+        self.planner.add_order(order, 500, self.instance.timeline[-1], cycle_times)
+        self.assertSameCost()
+        # One variable per name of the order, none left from the cancelled one
+        names = [name for name in self.planner.model.VarName if name.startswith("plannedQty[")]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(
+            len(names), len(self.planner.timeline) * len(self.planner.workcenters) * 6
+        )
+
+    def test_cancel_unknown_order(self):
+        with self.assertRaises(ValueError):
+            self.planner.cancel_order("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling-horizon solve of Model4: plan_cost recomputes the objective of the model, a window over
+the whole timeline gives the full plan, and the stitched plan costs the sum of its frozen parts
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.rolling import plan_cost, rolling_horizon
+from production_plan_optimization.solvers import solve
+import Model4
+
+COSTS = (
+    Model4.reg_costs_per_line,
+    Model4.ot_costs_per_line,
+    Model4.we_costs_per_line,
+    Model4.storage_cost,
+    Model4.late_prod_cost,
+)
+
+
+class TestRolling(unittest.TestCase):
+    def setUp(self):
+        self.instance = generate_instance(6, 10, list(Model4.reg_costs_per_line), n_families=3)
+        self.model_args = dict(
+            workcenters=self.instance.workcenters,
+            wc_cost_reg=Model4.reg_costs_per_line,
+            wc_cost_ot=Model4.ot_costs_per_line,
+            wc_cost_we=Model4.we_costs_per_line,
+            inventory_carrying_cost=Model4.storage_cost,
+            cycle_times=self.instance.cycle_times,
+            delay_cost=Model4.late_prod_cost,
+        )
+        self.full = Model4.optimize_planning(
+            timeline=self.instance.timeline,
+            needs=self.instance.needs,
+            customer_orders=self.instance.customer_orders,
+            **self.model_args,
+        )
+
+    def rolling(self, window, freeze):
+        return rolling_horizon(
+            Model4.optimize_planning,
+            self.instance.timeline,
+            self.instance.needs,
+            self.instance.customer_orders,
+            window,
+            freeze,
+            **self.model_args,
+        )
+
+    def test_plan_cost(self):
+        model = Model4.build_model(
+            timeline=self.instance.timeline,
+            needs=self.instance.needs,
+            customer_orders=self.instance.customer_orders,
+            **self.model_args,
+        )
+        objective = solve(model, "gurobi", mip_gap=0).objective
+        self.assertAlmostEqual(plan_cost(self.full, *COSTS), objective, delta=1e-6 * objective)
+
+    def test_whole_timeline_window(self):
+        planning, windows = self.rolling(len(self.instance.timeline), 3)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(sorted(planning.index), sorted(self.full.index))
+        self.assertAlmostEqual(
+            plan_cost(planning, *COSTS), plan_cost(self.full, *COSTS), delta=1e-3
+        )
+
+    def test_stitched_cost(self):
+        planning, windows = self.rolling(5, 3)
+        cost = plan_cost(planning, *COSTS)
+        self.assertEqual(len(windows), 3)
+        self.assertAlmostEqual(cost, windows["Frozen cost"].sum(), delta=1e-6 * cost)
+        self.assertGreaterEqual(cost, plan_cost(self.full, *COSTS) - 1e-3)
+
+    def test_frozen_days(self):
+        with self.assertRaises(ValueError):
+            self.rolling(5, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Cost scenarios on a bucketed calendar: the KPIs and the multi-scenario objective count the
+inventory and backlog for every day of their bucket
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.buckets import bucket_calendar, bucket_days, bucket_needs
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.scenarios import (
+    COST_ARGS,
+    plan_kpis,
+    run_multiscenario,
+    scenario_args,
+    scenario_grid,
+)
+from production_plan_optimization.solvers import solve
+from Model4 import (
+    build_model,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    storage_cost,
+    late_prod_cost,
+)
+
+
+class TestBucketedScenarios(unittest.TestCase):
+    def setUp(self):
+        instance = generate_instance(6, 28, list(reg_costs_per_line))
+        buckets = bucket_calendar(instance.timeline, daily_days=3, monthly_after=None)
+        self.model_args = dict(
+            timeline=list(buckets),
+            workcenters=instance.workcenters,
+            needs=bucket_needs(buckets, instance.needs, instance.customer_orders),
+            wc_cost_reg=reg_costs_per_line,
+            wc_cost_ot=ot_costs_per_line,
+            wc_cost_we=we_costs_per_line,
+            inventory_carrying_cost=storage_cost,
+            customer_orders=instance.customer_orders,
+            cycle_times=instance.cycle_times,
+            delay_cost=late_prod_cost,
+            bucket_days=bucket_days(buckets),
+        )
+        self.scenarios = scenario_grid(inventory_carrying_cost=[5, 50], wc_cost_ot_factor=[1, 1.5])
+
+    def test_kpis_and_multiscenario_match_the_objective(self):
+        result = run_multiscenario(build_model, self.scenarios, **self.model_args)
+        for scenario, kpis in zip(self.scenarios, result.to_dict("records")):
+            args = scenario_args(self.model_args, scenario)
+            solved = solve(build_model(**args, lean=True), "gurobi")
+            total = plan_kpis(
+                solved.solution,
+                *(args[name] for name in COST_ARGS),
+                bucket_days=args["bucket_days"],
+            )["Total cost"]
+            self.assertAlmostEqual(total, solved.objective, delta=1e-6 * solved.objective)
+            self.assertAlmostEqual(kpis["Total cost"], solved.objective, delta=1e-3 * solved.objective)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Solver backends and MIP start of Model4: every backend reaches the Gurobi optimum, and a start
+from the optimal plan gives the same optimum
+"""
+
+# Import required packages
+import multiprocessing
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.instances import Instance, generate_instance
+from production_plan_optimization.solvers import SOLVERS, solve
+import Model4
+
+
+def build_instance(instance: Instance, **options):
+    return Model4.build_model(
+        instance.timeline,
+        instance.workcenters,
+        instance.needs,
+        Model4.reg_costs_per_line,
+        Model4.ot_costs_per_line,
+        Model4.we_costs_per_line,
+        Model4.storage_cost,
+        instance.customer_orders,
+        instance.cycle_times,
+        Model4.late_prod_cost,
+        **options,
+    )
+
+
+def solve_instance(instance: Instance, solver: str) -> float:
+    return solve(build_instance(instance), solver, mip_gap=0).objective
+
+
+class TestSolvers(unittest.TestCase):
+    def setUp(self):
+        self.instance = generate_instance(6, 5, list(Model4.reg_costs_per_line))
+        self.reference = solve_instance(self.instance, "gurobi")
+
+    def test_backends(self):
+        for solver in SOLVERS:
+            # One process per run, the HiGHS and OR-Tools libraries cannot be loaded together
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                objective = pool.submit(solve_instance, self.instance, solver).result()
+            self.assertAlmostEqual(
+                objective, self.reference, delta=1e-6 * self.reference, msg=solver
+            )
+
+    def test_warm_start(self):
+        model = build_instance(self.instance)
+        solution = solve(model, "gurobi", mip_gap=0).solution
+        start_plan = {
+            tuple(name[len("plannedQty["):-1].split(",")): qty
+            for name, qty in solution.filter(like="plannedQty", axis=0)["Solution"].items()
+        }
+        start = Model4.plan_start(
+            start_plan, self.instance.timeline, self.instance.workcenters, self.instance.cycle_times
+        )
+        self.assertLessEqual(set(start), set(solution.index))
+        warm = solve(build_instance(self.instance), "gurobi", mip_gap=0, start=start)
+        self.assertAlmostEqual(warm.objective, self.reference, delta=1e-6 * self.reference)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Symmetry breaking between identical lines: the same optimum with and without it, and the load
+order refused on the time buckets
+"""
+
+# Import required packages
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.buckets import bucket_calendar, bucket_days, bucket_needs
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.solvers import solve
+from production_plan_optimization.symmetry import identical_lines
+from Model4 import build_model, storage_cost, late_prod_cost
+
+
+class TestSymmetryBreaking(unittest.TestCase):
+    def setUp(self):
+        # Three identical lines: same costs and cycle times
+        workcenters = ["Line_1", "Line_2", "Line_3"]
+        instance = generate_instance(5, 4, workcenters, utilization=0.6)
+        self.model_args = dict(
+            timeline=instance.timeline,
+            workcenters=workcenters,
+            needs=instance.needs,
+            wc_cost_reg={wc: 245 for wc in workcenters},
+            wc_cost_ot={wc: 367.5 for wc in workcenters},
+            wc_cost_we={wc: 490 for wc in workcenters},
+            inventory_carrying_cost=storage_cost,
+            customer_orders=instance.customer_orders,
+            cycle_times={
+                (mo, wc): instance.cycle_times[(mo, "Line_1")]
+                for mo in instance.customer_orders
+                for wc in workcenters
+            },
+            delay_cost=late_prod_cost,
+        )
+
+    def objective(self, **model_args):
+        return solve(build_model(**model_args), "gurobi", mip_gap=0).objective
+
+    def test_same_optimum(self):
+        args = self.model_args
+        self.assertEqual(
+            identical_lines(
+                args["workcenters"],
+                args["customer_orders"],
+                args["cycle_times"],
+                args["wc_cost_reg"],
+                args["wc_cost_ot"],
+                args["wc_cost_we"],
+            ),
+            [args["workcenters"]],
+        )
+        objective = self.objective(**args)
+        for mode in ["opening", "load"]:
+            self.assertAlmostEqual(
+                self.objective(**args, symmetry_breaking=mode), objective, delta=1e-6 * objective
+            )
+
+    def test_buckets(self):
+        buckets = bucket_calendar(self.model_args["timeline"], daily_days=2, monthly_after=None)
+        args = dict(
+            self.model_args,
+            timeline=list(buckets),
+            needs=bucket_needs(buckets, self.model_args["needs"], self.model_args["customer_orders"]),
+            bucket_days=bucket_days(buckets),
+        )
+        objective = self.objective(**args)
+        self.assertAlmostEqual(
+            self.objective(**args, symmetry_breaking="opening"), objective, delta=1e-6 * objective
+        )
+        with self.assertRaises(ValueError):
+            build_model(**args, symmetry_breaking="load")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Capacity checks: a 0 or blank capacity is a line that does not produce the family, only
+negative or non-numeric capacities and families without any capacity are reported
+"""
+
+# Import required packages
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Planning_optimization_part3"))
+
+from production_plan_optimization.instances import generate_instance
+from production_plan_optimization.solvers import solve
+from production_plan_optimization.validation import validate_capacity, validate_inputs
+from Model4 import (
+    build_model,
+    read_inputs,
+    reg_costs_per_line,
+    ot_costs_per_line,
+    we_costs_per_line,
+    storage_cost,
+    late_prod_cost,
+)
+
+
+def capacity_sheet(workcenters) -> pd.DataFrame:
+    # 8h capacity of 11 families, Model_1 not produced on Line_2 (0) nor Model_2 on Line_3 (blank)
+    capacity = pd.DataFrame(
+        320.0,
+        index=pd.Index(["Model_" + str(k + 1) for k in range(11)], name="Line"),
+        columns=workcenters,
+    )
+    capacity.loc["Model_1", "Line_2"] = 0
+    capacity.loc["Model_2", "Line_3"] = np.nan
+    return capacity
+
+
+class TestCapacity(unittest.TestCase):
+    def test_invalid_and_missing_capacities_are_reported(self):
+        capacity = capacity_sheet(list(reg_costs_per_line)).astype(object)
+        capacity.loc["Model_3", "Line_1"] = -300
+        capacity.loc["Model_4", "Line_1"] = "n/a"
+        capacity.loc["Model_5"] = 0
+        checks = validate_capacity(capacity, list(reg_costs_per_line))
+        self.assertEqual(
+            sorted(zip(checks["Check"], checks["Row"])),
+            [("Invalid capacity", "Model_3"), ("Invalid capacity", "Model_4")],
+        )
+
+    def test_only_ordered_families_need_a_capacity(self):
+        capacity = capacity_sheet(list(reg_costs_per_line))
+        capacity.loc["Model_5"] = 0
+        capacity.loc["Model_6"] = np.nan
+        orders = generate_instance(6, 5, list(reg_costs_per_line)).orders
+        orders["Product_Family"] = "Model_1"
+        self.assertTrue(validate_inputs(orders, capacity, list(reg_costs_per_line)).empty)
+        orders.loc[:1, "Product_Family"] = ["Model_5", "Model_6"]
+        checks = validate_inputs(orders, capacity, list(reg_costs_per_line))
+        self.assertEqual(
+            sorted(zip(checks["Check"], checks["Row"])),
+            [("No capacity", "Model_5"), ("No capacity", "Model_6")],
+        )
+
+    def test_zero_capacity_passes_and_solves(self):
+        instance = generate_instance(6, 5, list(reg_costs_per_line))
+        orders = instance.orders.copy()
+        orders.loc[:1, "Product_Family"] = ["Model_1", "Model_2"]
+        with tempfile.TemporaryDirectory() as directory:
+            orders_file = os.path.join(directory, "Customer_orders.xlsx")
+            constraints_file = os.path.join(directory, "Constraints.xlsx")
+            orders.to_excel(orders_file, index=False)
+            capacity_sheet(instance.workcenters).to_excel(
+                constraints_file, sheet_name="8h capacity"
+            )
+            _, order_list, cycle_times, calendar, needs = read_inputs(
+                orders_file, constraints_file
+            )
+        self.assertTrue(math.isinf(cycle_times[(order_list[0], "Line_2")]))
+        self.assertTrue(math.isnan(cycle_times[(order_list[1], "Line_3")]))
+
+        model = build_model(
+            calendar,
+            instance.workcenters,
+            needs,
+            reg_costs_per_line,
+            ot_costs_per_line,
+            we_costs_per_line,
+            storage_cost,
+            order_list,
+            cycle_times,
+            late_prod_cost,
+        )
+        solved = solve(model, "gurobi")
+        self.assertTrue(math.isfinite(solved.objective))
+        # Nothing is planned on a line without capacity
+        planned = solved.solution.filter(like="plannedQty", axis=0).index
+        self.assertFalse(planned.str.contains(order_list[0] + ",Line_2").any())
+        self.assertFalse(planned.str.contains(order_list[1] + ",Line_3").any())
+
+
+if __name__ == "__main__":
+    unittest.main()